@@ -0,0 +1,335 @@
+# Batched positions that are used by analytics over many positions of the game of Janggi
+# N positions are held as one (N, 10, 9) int8 array with side to move, hash and move count vectors,
+# so that material counts and placement statistics are array operations rather than get_square calls.
+# Requires numpy - the rest of the game does not.
+import re
+import numpy as np
+from game_files import board as bd
+from game_files import evaluation as ev
+from game_files import game as jg
+from game_files import geometry as geo
+from game_files import pieces as pce
+
+# Square codes - the piece type code plus one, positive for red and negative for blue. Zero is an empty square.
+EMPTY = 0
+RED = 1    # Also the side to move value of red.
+BLUE = -1  # Also the side to move value of blue.
+_SIGNS = {'red': RED, 'blue': BLUE}
+_PLAYERS = {RED: 'red', BLUE: 'blue'}
+_CODE_OFFSET = len(pce.PIECE_NAMES)  # Square code + offset indexes the lookup tables below.
+_CODE_BINS = 2 * _CODE_OFFSET + 1
+
+# Lookup tables by square code + offset - position notation letters and Zobrist keys (see board.ZOBRIST_KEYS).
+_LETTER_CODES = np.zeros(256, dtype=np.int8)
+_CODE_LETTERS = np.full(_CODE_BINS, ord('.'), dtype=np.uint8)
+_ZOBRIST = np.zeros((_CODE_BINS, bd.SQUARE_COUNT), dtype=np.uint64)
+for _letter, _piece_class in bd.LETTER_PIECES.items():
+    _code = pce.PIECE_CLASSES.index(_piece_class) + 1
+    _LETTER_CODES[ord(_letter.upper())], _LETTER_CODES[ord(_letter)] = _code, -_code
+    _CODE_LETTERS[_code + _CODE_OFFSET], _CODE_LETTERS[-_code + _CODE_OFFSET] = ord(_letter.upper()), ord(_letter)
+    _ZOBRIST[_code + _CODE_OFFSET] = bd.ZOBRIST_KEYS['red'][_code - 1]
+    _ZOBRIST[-_code + _CODE_OFFSET] = bd.ZOBRIST_KEYS['blue'][_code - 1]
+_EMPTY_RUNS = re.compile(r'\.+')
+_EXPANDED_LETTERS = frozenset('.' + ''.join(bd.LETTER_PIECES).upper() + ''.join(bd.LETTER_PIECES))
+
+# Check detection tables, looked up outward from the General's square like JanggiGame.is_square_attacked.
+# Each is a square index array per target square, padded with the index of an extra always empty square.
+CHECK_CHUNK = 1 << 16  # Positions checked at once - bounds the memory of the gathered arrays.
+_OFF_BOARD = bd.SQUARE_COUNT
+
+
+def _padded(rows, width=None):
+    """ Returns a (90, width) array of square indices from per target square sequences, padded with _OFF_BOARD."""
+    width = width or max(len(each_row) for each_row in rows)
+    return np.array([list(each_row) + [_OFF_BOARD] * (width - len(each_row)) for each_row in rows], dtype=np.intp)
+
+
+def _build_beast_tables(beast_origins):
+    """ Returns the (origins, legs) arrays of a beast attack table (see geometry.HORSE_ORIGINS):
+        the origins by target square and slot, and the legs by target square, slot and leg."""
+    width = max(len(each_origins) for each_origins in beast_origins)
+    origins = _padded([[each_origin for each_origin, legs in each_origins] for each_origins in beast_origins], width)
+    legs = np.stack([_padded([legs for each_origin, legs in each_origins] + [()] * (width - len(each_origins)), 2)
+                     for each_origins in beast_origins])
+    return origins, legs
+
+
+def _build_rays():
+    """ Returns the slide rays outward from every square as a (90, rays, 9) array - both directions of every slide line
+        through the square (see geometry.SLIDE_LINES), nearest square first."""
+    rays = []
+    for each_index in range(bd.SQUARE_COUNT):
+        square_rays = []
+        for line, position, bit in geo.SQUARE_SLIDE_BITS[each_index]:
+            squares = geo.SLIDE_LINES[line]
+            square_rays += [squares[position + 1:], squares[position - 1::-1] if position else ()]
+        rays.append(square_rays)
+    width = max(len(each_rays) for each_rays in rays)
+    return np.stack([_padded(each_rays + [()] * (width - len(each_rays)), bd.COL_COUNT) for each_rays in rays])
+
+
+_SOLDIER_ORIGINS = {player: _padded(jg.SOLDIER_ORIGINS[player]) for player in ['red', 'blue']}
+_PALACE_STEPS = _padded(geo.PALACE_STEPS)
+_BEAST_TABLES = ((pce.HORSE, _build_beast_tables(geo.HORSE_ORIGINS)),
+                 (pce.ELEPHANT, _build_beast_tables(geo.ELEPHANT_ORIGINS)))
+_RAYS = _build_rays()
+
+
+class BoardBatch:
+    """ Represents N positions at once as numpy arrays. Rows and columns follow the board:
+        squares[n, row - 1, col] holds the square code of square index (row - 1) * 9 + col of position n."""
+
+    def __init__(self, squares, side_to_move, move_counts=None):
+        """ Initializes a batch from its arrays. The hashes are worked out from them.
+            Parameters:
+                squares: The square codes, shaped (N, 10, 9) or (N, 90).
+                side_to_move: The player in turn per position, RED or BLUE, shaped (N,).
+                move_counts: Optional - the red and blue move counts per position, shaped (N, 2). Defaults to zeros.
+            Data members:
+                squares: The (N, 10, 9) int8 array of square codes.
+                side_to_move: The (N,) int8 vector of the player in turn.
+                hashes: The (N,) uint64 vector of Zobrist hashes - equal to Board.get_hash of each position.
+                move_counts: The (N, 2) int32 array of the red and blue move counts."""
+        self._squares = np.asarray(squares, dtype=np.int8).reshape(-1, bd.ROW_COUNT, bd.COL_COUNT)
+        self._side_to_move = np.asarray(side_to_move, dtype=np.int8).reshape(-1)
+        if move_counts is None:
+            move_counts = np.zeros((len(self._squares), 2))
+        self._move_counts = np.asarray(move_counts, dtype=np.int32).reshape(-1, 2)
+        if not len(self._squares) == len(self._side_to_move) == len(self._move_counts):
+            raise ValueError("Every array of a batch needs one entry per position.")
+        self._hashes = self.compute_hashes()
+
+    # Bulk conversions
+    @classmethod
+    def from_positions(cls, positions):
+        """ Returns a batch of positions in position notation (see JanggiGame.load_position).
+            Raises a ValueError if a placement is not 10 rows of 9 squares of known pieces.
+            The placements are expanded as text and turned into square codes by one table lookup.
+            Parameter:
+                positions: An iterable of position notation strings.
+            """
+        expanded, sides, move_counts = [], [], []
+        for each_position in positions:
+            fields = each_position.split()
+            if len(fields) != 4 or fields[1] not in _SIGNS:
+                raise ValueError("A position is the placement, the player in turn and two move counts: "
+                                 + each_position)
+            placement = fields[0]
+            rows = placement.count('/') + 1
+            for digit in '123456789':
+                placement = placement.replace(digit, '.' * int(digit))
+            placement = placement.replace('/', '')
+            if rows != bd.ROW_COUNT or len(placement) != bd.SQUARE_COUNT \
+                    or not _EXPANDED_LETTERS.issuperset(placement):
+                raise ValueError("A placement has 10 rows of 9 squares of known pieces: " + fields[0])
+            expanded.append(placement)
+            sides.append(_SIGNS[fields[1]])
+            move_counts.append((int(fields[2]), int(fields[3])))
+
+        letters = np.frombuffer(''.join(expanded).encode('ascii'), dtype=np.uint8)
+        return cls(_LETTER_CODES[letters], sides, move_counts)
+
+    @classmethod
+    def from_boards(cls, boards, move_counts=None):
+        """ Returns a batch of Board objects' positions - the piece placement and side to move.
+            A Board does not keep the move counts, so they are given apart. Left at zero, no Cannon can give check
+            (see in_check).
+            Parameters:
+                boards: An iterable of set up Board objects.
+                move_counts: Optional - the red and blue move counts per board, shaped (N, 2). Defaults to zeros.
+            """
+        squares, sides = [], []
+        for each_board in boards:
+            codes = [EMPTY] * bd.SQUARE_COUNT
+            for player in ['red', 'blue']:
+                for each_index, each_piece in each_board.get_pieces(player).items():
+                    codes[each_index] = _SIGNS[player] * (each_piece.get_code() + 1)
+            squares.append(codes)
+            sides.append(_SIGNS[each_board.get_side_to_move()])
+        return cls(np.array(squares, dtype=np.int8).reshape(-1, bd.SQUARE_COUNT), sides, move_counts)
+
+    @classmethod
+    def from_games(cls, games):
+        """ Returns a batch of JanggiGame objects' positions, move counts included.
+            Parameter:
+                games: An iterable of JanggiGame objects.
+            """
+        games = list(games)
+        for each_game in games:
+            each_game.start_game()
+        move_counts = [(each_game.get_move_counter()['red'], each_game.get_move_counter()['blue'])
+                       for each_game in games]
+        return cls.from_boards([each_game.get_game() for each_game in games], move_counts)
+
+    def to_positions(self):
+        """ Returns the positions of the batch as a list of position notation strings."""
+        letters = _CODE_LETTERS[self._squares.reshape(-1, bd.SQUARE_COUNT).astype(np.intp) + _CODE_OFFSET]
+        text = letters.tobytes().decode('ascii')
+        positions = []
+        for each_number in range(len(self)):
+            start = each_number * bd.SQUARE_COUNT
+            rows = [text[each_start:each_start + bd.COL_COUNT]
+                    for each_start in range(start, start + bd.SQUARE_COUNT, bd.COL_COUNT)]
+            placement = _EMPTY_RUNS.sub(lambda run: str(len(run.group())), '/'.join(rows))
+            red_moves, blue_moves = self._move_counts[each_number]
+            positions.append(' '.join([placement, _PLAYERS[int(self._side_to_move[each_number])],
+                                       str(red_moves), str(blue_moves)]))
+        return positions
+
+    def to_boards(self):
+        """ Returns the positions of the batch as a list of new Board objects."""
+        boards = []
+        for each_squares, each_side in zip(self._squares.reshape(-1, bd.SQUARE_COUNT).tolist(),
+                                           self._side_to_move.tolist()):
+            each_board = bd.Board()
+            each_board.set_side_to_move(_PLAYERS[each_side])
+            each_board.load_board([None if code == EMPTY else
+                                   pce.PIECE_CLASSES[abs(code) - 1]('red' if code > 0 else 'blue')
+                                   for code in each_squares])
+            boards.append(each_board)
+        return boards
+
+    def to_games(self):
+        """ Returns the positions of the batch as a list of new JanggiGame objects.
+            Raises a ValueError for a position a game cannot be loaded from (see JanggiGame.load_position)."""
+        games = []
+        for each_position in self.to_positions():
+            each_game = jg.JanggiGame()
+            each_game.load_position(each_position)
+            games.append(each_game)
+        return games
+
+    def select(self, selection):
+        """ Returns a new batch of some of the positions.
+            Parameter:
+                selection: A boolean mask of length N, or an array of position numbers.
+            """
+        return BoardBatch(self._squares[selection], self._side_to_move[selection], self._move_counts[selection])
+
+    # Data members - getters
+    def __len__(self):
+        return len(self._squares)
+
+    def get_squares(self):
+        """ Returns the (N, 10, 9) int8 array of square codes."""
+        return self._squares
+
+    def get_side_to_move(self):
+        """ Returns the (N,) int8 vector of the player in turn, RED or BLUE."""
+        return self._side_to_move
+
+    def get_hashes(self):
+        """ Returns the (N,) uint64 vector of position hashes."""
+        return self._hashes
+
+    def get_move_counts(self):
+        """ Returns the (N, 2) int32 array of the red and blue move counts."""
+        return self._move_counts
+
+    def compute_hashes(self):
+        """ Returns the Zobrist hashes of every position worked out from the squares and side to move."""
+        flat = self._squares.reshape(-1, bd.SQUARE_COUNT).astype(np.intp) + _CODE_OFFSET
+        hashes = np.bitwise_xor.reduce(_ZOBRIST[flat, np.arange(bd.SQUARE_COUNT)], axis=1)
+        hashes = hashes.reshape(-1)  # Kept one dimensional for an empty batch too.
+        hashes[self._side_to_move == BLUE] ^= np.uint64(bd.ZOBRIST_BLUE_TO_MOVE)
+        return hashes
+
+    # Check detection
+    def in_check(self, player):
+        """ Returns whether the player's General is attacked in every position, as an (N,) boolean vector -
+            the same as JanggiGame.is_in_check of each position. False where the player has no General.
+            Worked out on CHECK_CHUNK positions at a time, each with one gather per attack table:
+                Humans - the Soldier origins and palace steps around the General.
+                Beasts - the Horse and Elephant origins, whose legs have to be empty.
+                Mechs - the slide rays outward from the General. The first piece on a ray may be a Chariot;
+                        the second may be a Cannon, behind a screen that is not a Cannon, once its owner has moved.
+            A Cannon only counts where its owner's move count is not zero - a batch made with zero move counts,
+            such as from_boards without them, never sees a Cannon check.
+            Parameter:
+                player: The player whose General is evaluated, 'red' or 'blue'.
+            """
+        checks = np.zeros(len(self), dtype=bool)
+        for start in range(0, len(self), CHECK_CHUNK):
+            stop = start + CHECK_CHUNK
+            checks[start:stop] = self.chunk_in_check(player, self._squares[start:stop], self._move_counts[start:stop])
+        return checks
+
+    def check_status(self):
+        """ Returns whether red and whether blue is in check in every position, as an (N, 2) boolean array."""
+        return np.stack([self.in_check('red'), self.in_check('blue')], axis=1)
+
+    def chunk_in_check(self, player, squares, move_counts):
+        """ Returns whether the player is in check in some positions. See in_check.
+            Parameters:
+                player: The player whose General is evaluated.
+                squares: The (n, 10, 9) square codes of the positions.
+                move_counts: The (n, 2) move counts of the positions.
+            """
+        sign = _SIGNS[player]
+        opponent = 'blue' if player == 'red' else 'red'
+        count = len(squares)
+        padded = np.zeros((count, bd.SQUARE_COUNT + 1), dtype=np.int8)  # The extra square is always empty.
+        padded[:, :bd.SQUARE_COUNT] = squares.reshape(count, bd.SQUARE_COUNT)
+        is_general = padded == sign * (pce.GENERAL + 1)
+        has_general = is_general.any(axis=1)
+        general = is_general.argmax(axis=1)
+        numbers = np.arange(count).reshape(-1, 1)
+
+        def attacker(piece_code):
+            return -sign * (piece_code + 1)
+
+        # Humans - one step away.
+        soldiers = padded[numbers, _SOLDIER_ORIGINS[opponent][general]]
+        checks = (soldiers == attacker(pce.SOLDIER)).any(axis=1)
+        steps = padded[numbers, _PALACE_STEPS[general]]
+        checks |= ((steps == attacker(pce.GUARD)) | (steps == attacker(pce.GENERAL))).any(axis=1)
+
+        # Beasts - an attacker counts as long as its legs are clear.
+        for beast_code, (origins, legs) in _BEAST_TABLES:
+            beasts = padded[numbers, origins[general]] == attacker(beast_code)
+            clear = (padded[numbers.reshape(-1, 1, 1), legs[general]] == EMPTY).all(axis=2)
+            checks |= (beasts & clear).any(axis=1)
+
+        # Mechs - the first and second piece of every ray, picked out by the running count of pieces along it.
+        rays = padded[numbers.reshape(-1, 1, 1), _RAYS[general]]
+        occupied = rays != EMPTY
+        pieces_seen = occupied.cumsum(axis=2)
+        blockers = np.where(occupied & (pieces_seen == 1), rays, 0).sum(axis=2)
+        hurdles = np.where(occupied & (pieces_seen == 2), rays, 0).sum(axis=2)
+        checks |= (blockers == attacker(pce.CHARIOT)).any(axis=1)
+        cannons_ready = move_counts[:, 0 if opponent == 'red' else 1] != 0  # Cannot be moved on the first turn.
+        cannon_checks = (hurdles == attacker(pce.CANNON)) & (np.abs(blockers) != pce.CANNON + 1)
+        checks |= cannon_checks.any(axis=1) & cannons_ready
+        return checks & has_general
+
+    # Analytics
+    def piece_counts(self):
+        """ Returns the number of pieces per position, player and piece type code as an (N, 2, 7) array.
+            Player 0 is red and player 1 is blue."""
+        flat = self._squares.reshape(-1, bd.SQUARE_COUNT).astype(np.intp) + _CODE_OFFSET
+        bins = (np.arange(len(self)).reshape(-1, 1) * _CODE_BINS + flat).reshape(-1)
+        counts = np.bincount(bins, minlength=len(self) * _CODE_BINS).reshape(-1, _CODE_BINS)
+        return np.stack([counts[:, _CODE_OFFSET + 1:], counts[:, _CODE_OFFSET - 1::-1]], axis=1)
+
+    def material(self, values=ev.PIECE_VALUES):
+        """ Returns the material balance of every position as an (N,) vector, red minus blue.
+            Parameter:
+                values: Optional - the value per piece type code, in hundredths of a point. See evaluation.PIECE_VALUES.
+            """
+        counts = self.piece_counts()
+        values = np.asarray(values, dtype=np.int64)
+        return counts[:, 0] @ values - counts[:, 1] @ values
+
+    def placement_counts(self):
+        """ Returns how often each square holds each piece over the batch, as a (2, 7, 10, 9) array
+            by player (red, blue), piece type code, row - 1 and column."""
+        flat = self._squares.reshape(-1, bd.SQUARE_COUNT).astype(np.intp) + _CODE_OFFSET
+        bins = (flat * bd.SQUARE_COUNT + np.arange(bd.SQUARE_COUNT)).reshape(-1)
+        counts = np.bincount(bins, minlength=_CODE_BINS * bd.SQUARE_COUNT).reshape(
+            _CODE_BINS, bd.ROW_COUNT, bd.COL_COUNT)
+        return np.stack([counts[_CODE_OFFSET + 1:], counts[_CODE_OFFSET - 1::-1]])
+
+    def palace_occupancy(self):
+        """ Returns the number of pieces of either player in the red and the blue palace as an (N, 2) array."""
+        occupied = self._squares != EMPTY
+        return np.stack([occupied[:, 0:3, 3:6].sum(axis=(1, 2)), occupied[:, 7:10, 3:6].sum(axis=(1, 2))], axis=1)
@@ -0,0 +1,79 @@
+# Move generation benchmark that is used in the game of Janggi
+# Run from the project root with: python -m game_files.benchmark [--depth N] [--backend array|bitboard]
+import argparse
+import time
+from game_files import game as jg
+
+# Stored positions in position notation (see JanggiGame.load_position) and their reference perft counts,
+# from depth 1 upwards. Any change to the movement code has to reproduce these counts.
+BENCHMARK_POSITIONS = {
+    'initial': (
+        'REHG1GEHR/4K4/1C5C1/S1S1S1S1S/9/9/s1s1s1s1s/1c5c1/4k4/rehg1gehr blue 0 0',
+        [31, 961, 30506]),
+    'middlegame_check': (
+        'RE1G1GE1R/4K4/4C2C1/S1H1SS2S/7H1/2s6/s2e2s1s/1c1h1rh2/4k4/r2g1ge2 blue 9 9',
+        [4, 182, 6658]),
+    'middlegame': (
+        '1ERG1G2R/3K5/1H7/4ES2S/9/2S6/ss1s3ss/1C2C4/3gg2cr/reh2keh1 blue 20 20',
+        [31, 1198, 38846]),
+    'endgame_check': (
+        '3GK4/4G4/9/2H6/4S4/9/2s3c2/5R3/4k4/3g1g3 blue 30 30',
+        [3, 92, 928, 26603]),
+    'endgame': (
+        '4K4/3G5/9/9/9/4h4/9/2R6/4k4/5g2S red 40 40',
+        [24, 319, 6965, 90930]),
+}
+
+
+def run_benchmark(max_depth=3, backend='array', positions=None):
+    """ Returns the perft results of the stored positions as a list of
+        (position name, depth, node count, reference count, seconds) tuples.
+        Parameters:
+            max_depth: Optional - the deepest perft run per position, capped by the stored reference counts.
+            backend: Optional - the JanggiGame move validation backend, 'array' or 'bitboard'.
+            positions: Optional - the position names to run. Defaults to every stored position.
+        """
+    results = []
+    for name in positions or BENCHMARK_POSITIONS:
+        position, reference_counts = BENCHMARK_POSITIONS[name]
+        game = jg.JanggiGame(backend)
+        game.load_position(position)
+
+        for depth in range(1, min(max_depth, len(reference_counts)) + 1):
+            start = time.perf_counter()
+            nodes = game.perft(depth)
+            seconds = time.perf_counter() - start
+            results.append((name, depth, nodes, reference_counts[depth - 1], seconds))
+    return results
+
+
+def main(argv=None):
+    """ Runs the benchmark and prints the node counts and nodes per second of every position.
+        Returns 1 if any count differs from its reference count, otherwise 0."""
+    parser = argparse.ArgumentParser(description='Janggi move generation benchmark (perft).')
+    parser.add_argument('--depth', type=int, default=3, help='deepest perft run per position')
+    parser.add_argument('--backend', default='array', choices=['array', 'bitboard'])
+    args = parser.parse_args(argv)
+
+    total_nodes = 0
+    total_seconds = 0.0
+    mismatches = 0
+
+    print('Position          | Depth |      Nodes |  Nodes/sec | Reference')
+    print('-' * 66)
+    for name, depth, nodes, reference, seconds in run_benchmark(args.depth, args.backend):
+        total_nodes += nodes
+        total_seconds += seconds
+        status = 'ok'
+        if nodes != reference:
+            status = 'MISMATCH ' + str(reference)
+            mismatches += 1
+        print('%-17s | %5d | %10d | %10.0f | %s' % (name, depth, nodes, nodes / max(seconds, 1e-9), status))
+    print('-' * 66)
+    print('Total: %d nodes in %.2f s, %.0f nodes/sec' % (total_nodes, total_seconds, total_nodes / max(total_seconds, 1e-9)))
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,235 @@
+# Bitboard move validation and check detection that is used in the game of Janggi
+# Every square index is one bit of a Python int: bit 0 is a1, bit 8 is i1, bit 9 is a2 ... bit 89 is i10.
+from game_files import board as bd
+from game_files import geometry as geo
+from game_files import pieces as pce
+
+BITS = tuple(1 << index for index in range(bd.SQUARE_COUNT))
+
+
+def _build_rays():
+    """ Returns the sliding rays of every square: a list of (ray mask, ascending, squares) per square.
+        Orthogonal rays run to the board edge, diagonal rays only follow the palace lines (see geometry.LINES).
+        Ascending rays run towards higher square indices, so their nearest square is their lowest bit."""
+    return [[(sum(BITS[square] for square in squares), squares[0] > index, squares) for squares in square_lines]
+            for index, square_lines in enumerate(geo.LINES)]
+
+
+def _build_slides(rays):
+    """ Returns, per origin square, a dictionary of every sliding destination to the mask of squares in between."""
+    slides = []
+    for square_rays in rays:
+        destinations = {}
+        for ray_mask, ascending, squares in square_rays:
+            between = 0
+            for square in squares:
+                destinations[square] = between
+                between |= BITS[square]
+        slides.append(destinations)
+    return slides
+
+
+def _build_beast_moves(moves):
+    """ Returns, per origin square, a dictionary of every beast destination to the mask of its leg squares.
+        Parameter:
+            moves: geometry.HORSE_MOVES or geometry.ELEPHANT_MOVES.
+        """
+    return [{destination: sum(BITS[each_leg] for each_leg in legs) for destination, legs in square_moves}
+            for square_moves in moves]
+
+
+def _build_step_masks(steps):
+    """ Returns, per square, the mask of the one-step moves listed by a geometry step table."""
+    return [sum(BITS[target] for target in targets) for targets in steps]
+
+
+def _build_beast_attackers(origins):
+    """ Returns, per target square, the (origin square, leg mask) pairs of the beast moves that land on it.
+        Parameter:
+            origins: geometry.HORSE_ORIGINS or geometry.ELEPHANT_ORIGINS.
+        """
+    return [[(origin, sum(BITS[each_leg] for each_leg in legs)) for origin, legs in target_origins]
+            for target_origins in origins]
+
+
+def _build_reverse_steps(steps):
+    """ Returns, per target square, the mask of the origin squares whose step mask contains it."""
+    reverse = [0] * bd.SQUARE_COUNT
+    for origin, targets in enumerate(steps):
+        for target in range(bd.SQUARE_COUNT):
+            if targets & BITS[target]:
+                reverse[target] |= BITS[origin]
+    return reverse
+
+
+# Precomputed attack and ray tables - built once at import.
+RAYS = _build_rays()
+SLIDES = _build_slides(RAYS)
+HORSE_MOVES = _build_beast_moves(geo.HORSE_MOVES)
+ELEPHANT_MOVES = _build_beast_moves(geo.ELEPHANT_MOVES)
+PALACE_STEPS = _build_step_masks(geo.PALACE_STEPS)
+SOLDIER_STEPS = {player: _build_step_masks(geo.SOLDIER_STEPS[player]) for player in ['red', 'blue']}
+
+HORSE_ATTACKERS = _build_beast_attackers(geo.HORSE_ORIGINS)
+ELEPHANT_ATTACKERS = _build_beast_attackers(geo.ELEPHANT_ORIGINS)
+SOLDIER_ATTACKERS = {player: _build_reverse_steps(steps) for player, steps in SOLDIER_STEPS.items()}
+
+
+def nearest_square(bits, ascending):
+    """ Returns the square index of the set bit closest to a ray origin.
+        Parameters:
+            bits: The non-empty mask of the occupied squares on the ray.
+            ascending: Whether the ray runs towards higher square indices.
+        """
+    if ascending:
+        return (bits & -bits).bit_length() - 1
+    return bits.bit_length() - 1
+
+
+class Bitboards:
+    """ Represents a Janggi position as bit masks. Handles move validation and check detection with mask operations.
+        Does not handle turn order or ownership rules - those are left to the game."""
+
+    def __init__(self):
+        """ Initializes empty bit masks.
+            Data members:
+                masks: One mask per player per piece type code.
+                sides: The occupancy mask per player.
+                occupied: The occupancy mask of both players."""
+        self.clear()
+
+    def clear(self):
+        """ Empties every mask."""
+        self._masks = {'red': [0] * len(pce.PIECE_NAMES), 'blue': [0] * len(pce.PIECE_NAMES)}
+        self._sides = {'red': 0, 'blue': 0}
+        self._occupied = 0
+
+    # Mask maintenance - called by the board for every piece placed or removed.
+    def place(self, index, piece):
+        """ Sets the bit of a piece placed on a square index."""
+        bit = BITS[index]
+        player = piece.get_player()
+        self._masks[player][piece.get_code()] |= bit
+        self._sides[player] |= bit
+        self._occupied |= bit
+
+    def remove(self, index, piece):
+        """ Clears the bit of a piece removed from a square index."""
+        bit = ~BITS[index]
+        player = piece.get_player()
+        self._masks[player][piece.get_code()] &= bit
+        self._sides[player] &= bit
+        self._occupied &= bit
+
+    def get_mask(self, player, piece_code):
+        """ Returns the mask of a player's pieces of one type code."""
+        return self._masks[player][piece_code]
+
+    def get_occupied(self):
+        """ Returns the occupancy mask of both players."""
+        return self._occupied
+
+    # Move validation
+    def is_valid_move(self, from_index, to_index, piece):
+        """ Returns the boolean of whether the piece movement is valid by its movement pattern and blockers.
+            Ownership, passing, capturing own pieces and the cannon's first turn are left to the game.
+            Parameters:
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+                piece: The piece being moved.
+            """
+        piece_code = piece.get_code()
+        occupied = self._occupied
+
+        if piece_code == pce.CHARIOT:
+            between = SLIDES[from_index].get(to_index)
+            return between is not None and not between & occupied
+
+        if piece_code == pce.CANNON:
+            between = SLIDES[from_index].get(to_index)
+            if between is None:
+                return False
+            screens = between & occupied
+            cannons = self._masks['red'][pce.CANNON] | self._masks['blue'][pce.CANNON]
+            # Exactly one screen, which may not be a cannon, and cannons do not capture cannons.
+            return screens != 0 and screens & (screens - 1) == 0 and not (screens | BITS[to_index]) & cannons
+
+        if piece_code == pce.HORSE:
+            legs = HORSE_MOVES[from_index].get(to_index)
+            return legs is not None and not legs & occupied
+
+        if piece_code == pce.ELEPHANT:
+            legs = ELEPHANT_MOVES[from_index].get(to_index)
+            return legs is not None and not legs & occupied
+
+        if piece_code == pce.SOLDIER:
+            return SOLDIER_STEPS[piece.get_player()][from_index] & BITS[to_index] != 0
+
+        # Guard and General
+        return PALACE_STEPS[from_index] & BITS[to_index] != 0
+
+    # Check detection
+    def is_attacked(self, target_index, player, cannons_ready=True, move=None):
+        """ Returns the boolean of whether any piece of the player attacks a square index.
+            The attacks are looked up outward from the target square.
+            Parameters:
+                target_index: The square index evaluated, usually a General.
+                player: The attacking player.
+                cannons_ready: Whether the attacking player's cannons may move (not on their first turn).
+                move: Optional - a (from_index, to_index, moved piece, captured piece) move. The attacks are looked up
+                        on local copies of the masks as if the move was made; the masks themselves are not changed.
+            """
+        masks = self._masks[player]
+        occupied = self._occupied
+        all_cannons = self._masks['red'][pce.CANNON] | self._masks['blue'][pce.CANNON]
+
+        if move is not None and move[0] != move[1]:
+            from_index, to_index, moved, captured = move
+            from_bit, to_bit = BITS[from_index], BITS[to_index]
+            occupied = (occupied & ~from_bit) | to_bit
+            masks = list(masks)
+            if captured is not None:
+                if captured.get_player() == player:
+                    masks[captured.get_code()] &= ~to_bit
+                if captured.get_code() == pce.CANNON:
+                    all_cannons &= ~to_bit
+            if moved.get_player() == player:
+                masks[moved.get_code()] = (masks[moved.get_code()] & ~from_bit) | to_bit
+            if moved.get_code() == pce.CANNON:
+                all_cannons = (all_cannons & ~from_bit) | to_bit
+
+        # Steppers - soldiers, guards and the general.
+        if SOLDIER_ATTACKERS[player][target_index] & masks[pce.SOLDIER]:
+            return True
+        if PALACE_STEPS[target_index] & (masks[pce.GUARD] | masks[pce.GENERAL]):
+            return True
+
+        # Beasts - an attacker counts as long as its legs are clear.
+        horses = masks[pce.HORSE]
+        if horses:
+            for origin, legs in HORSE_ATTACKERS[target_index]:
+                if horses & BITS[origin] and not legs & occupied:
+                    return True
+        elephants = masks[pce.ELEPHANT]
+        if elephants:
+            for origin, legs in ELEPHANT_ATTACKERS[target_index]:
+                if elephants & BITS[origin] and not legs & occupied:
+                    return True
+
+        # Mechs - the first blocker on each ray may be a chariot; the second may be a cannon behind a screen.
+        chariots = masks[pce.CHARIOT]
+        cannons = masks[pce.CANNON] if cannons_ready else 0
+        if chariots or cannons:
+            target_is_cannon = all_cannons & BITS[target_index]
+            for ray_mask, ascending, squares in RAYS[target_index]:
+                blockers = ray_mask & occupied
+                if not blockers:
+                    continue
+                first = nearest_square(blockers, ascending)
+                if chariots & BITS[first]:
+                    return True
+                if cannons and not target_is_cannon and not all_cannons & BITS[first]:
+                    blockers &= ~BITS[first]
+                    if blockers and cannons & BITS[nearest_square(blockers, ascending)]:
+                        return True
+        return False
@@ -1,6 +1,47 @@
 # All board logic that is used in the game of Janggi
+import random
+from game_files import evaluation as ev
 from game_files import pieces as pce
 
+# Board coordinates and the palace - see the geometry module.
+from game_files.geometry import (ROW_COUNT, COL_COUNT, SQUARE_COUNT, SQUARE_NAMES, SQUARE_INDEX,
+                                 PALACE_INDICES, INVALID_PALACE_PAIRS, IS_PALACE,
+                                 SLIDE_LINES, SQUARE_RANK_LINES, SQUARE_FILE_LINES, SQUARE_RANK_BITS,
+                                 SQUARE_FILE_BITS, SQUARE_DIAGONAL_BITS)
+
+# Position notation - one letter per piece, red in upper case and blue in lower case.
+PIECE_LETTERS = {'Chariot': 'r', 'Cannon': 'c', 'Horse': 'h', 'Elephant': 'e', 'Soldier': 's', 'Guard': 'g',
+                 'General': 'k'}
+LETTER_PIECES = {'r': pce.Chariot, 'c': pce.Cannon, 'h': pce.Horse, 'e': pce.Elephant, 's': pce.Soldier,
+                 'g': pce.Guard, 'k': pce.General}
+
+# Zobrist keys - one random 64-bit key per player, piece type code and square, plus one for blue to move.
+# The seed is fixed so that a position hashes the same in every process.
+_zobrist_random = random.Random(20210301)
+ZOBRIST_KEYS = {player: tuple(tuple(_zobrist_random.getrandbits(64) for _ in range(SQUARE_COUNT))
+                              for _ in pce.PIECE_NAMES)
+                for player in ['red', 'blue']}
+ZOBRIST_BLUE_TO_MOVE = _zobrist_random.getrandbits(64)
+
+
+def square_to_index(square_coord):
+    """ Returns the square index of a coordinate, or None if the coordinate is not on the board.
+        Parameter:
+            square_coord: The entry location assuming the following format "[col][row]"
+        """
+    try:  # In the event a non-string was entered; try-except block.
+        return SQUARE_INDEX.get(square_coord)
+    except TypeError:  # Unhashable entries are not coordinates.
+        return None
+
+
+def index_to_square(index):
+    """ Returns the "[col][row]" coordinate of a square index.
+        Parameter:
+            index: The square index, 0 to 89.
+        """
+    return SQUARE_NAMES[index]
+
 
 class Board:
     """ Represents the Janggi Chess Board  Handles game board logic. Does not handle piece/board gameplay logic."""
@@ -9,8 +50,26 @@ class Board:
         """ Initializes the Janggi Game board.
         Data members:
             board: The game board - begins as None because the game was never "set".
-                        When start_board() is invoked, then a dictionary board will be stored."""
+                        When start_board() is invoked, then a flat list of 90 squares will be stored.
+            pieces: Piece-location index per player, square index to piece. Kept up to date on every change.
+            generals: Square index of the General per player.
+            bitboards: Optional bitboard mirror of the position - None unless attach_bitboards() is invoked.
+            history: The make/unmake move stack - one record per move made with push_move.
+            side_to_move: The player in turn, as last told by the game. Part of the position hash.
+            hash: The 64-bit Zobrist hash of the piece placement and the side to move, updated by XOR on every change.
+            occupancy: The occupancy pattern of every slide line (see geometry.SLIDE_LINES), updated on every change.
+            material: The material of each player (see evaluation.PIECE_VALUES), updated on every change.
+            positional: The piece-square score of each player (see evaluation.PIECE_SQUARE_TABLES), updated alike."""
         self._board = None  # Board starts as none
+        self._pieces = {'red': {}, 'blue': {}}
+        self._generals = {'red': None, 'blue': None}
+        self._bitboards = None
+        self._history = []
+        self._side_to_move = 'red'
+        self._hash = 0
+        self._occupancy = [0] * len(SLIDE_LINES)
+        self._material = {'red': 0, 'blue': 0}
+        self._positional = {'red': 0, 'blue': 0}
 
     # Set ups for the board
     def setup_game(self):
@@ -20,21 +79,81 @@ class Board:
         self.setup_blue_initializer()
 
     def start_board(self):
-        """ Starts the game board up by the algebraic notation [letter: col][number: row].
+        """ Starts the game board up as a flat list of empty squares.
+            Squares are addressed by the algebraic notation [letter: col][number: row] at the edges
+            and by the square index (row - 1) * 9 + col internally.
             rows: 1 to 10
             cols: a to i """
-        self._board = {
-            1: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            2: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            3: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            4: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            5: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            6: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            7: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            8: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            9: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None},
-            10: {'a': None, 'b': None, 'c': None, 'd': None, 'e': None, 'f': None, 'g': None, 'h': None, 'i': None}
-        }
+        self._board = [None] * SQUARE_COUNT
+        self._pieces = {'red': {}, 'blue': {}}
+        self._generals = {'red': None, 'blue': None}
+        self._history = []
+        self._hash = ZOBRIST_BLUE_TO_MOVE if self._side_to_move == 'blue' else 0
+        self._occupancy = [0] * len(SLIDE_LINES)
+        self._material = {'red': 0, 'blue': 0}
+        self._positional = {'red': 0, 'blue': 0}
+        if self._bitboards is not None:
+            self._bitboards.clear()
+
+    def load_board(self, squares):
+        """ Loads a position from a list of 90 square contents, indexed by square index.
+            This is the only place the whole board is scanned - the piece-location index is rebuilt from it.
+            Parameter:
+                squares: The square contents - pieces or None - from a1 (index 0) to i10 (index 89).
+            """
+        self.start_board()
+        for each_index, each_sq in enumerate(squares):
+            if each_sq is not None:
+                self._place(each_index, each_sq)
+
+    def get_placement(self):
+        """ Returns the piece placement in position notation.
+            Rows 1 to 10 are separated by '/'. Each piece is a letter - upper case for red, lower case for blue -
+            and each run of empty squares is a digit. The initial set up is:
+            REHG1GEHR/4K4/1C5C1/S1S1S1S1S/9/9/s1s1s1s1s/1c5c1/4k4/rehg1gehr"""
+        rows = []
+        for each_row in range(ROW_COUNT):
+            row_text = ''
+            empty = 0
+            for each_sq in self._board[each_row * COL_COUNT:(each_row + 1) * COL_COUNT]:
+                if each_sq is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row_text += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[each_sq.get_name()]
+                row_text += letter.upper() if each_sq.get_player() == 'red' else letter
+            if empty:
+                row_text += str(empty)
+            rows.append(row_text)
+        return '/'.join(rows)
+
+    def load_placement(self, placement):
+        """ Loads a position from its piece placement notation. See get_placement for the notation.
+            Raises a ValueError if the placement is not 10 rows of 9 squares of known pieces.
+            Parameter:
+                placement: The piece placement notation."""
+        squares = []
+        rows = placement.split('/')
+        if len(rows) != ROW_COUNT:
+            raise ValueError("A placement has 10 rows: " + placement)
+
+        for each_row in rows:
+            row_squares = []
+            for each_letter in each_row:
+                if each_letter.isdigit():
+                    row_squares += [None] * int(each_letter)
+                elif each_letter.lower() in LETTER_PIECES:
+                    player = 'red' if each_letter.isupper() else 'blue'
+                    row_squares.append(LETTER_PIECES[each_letter.lower()](player))
+                else:
+                    raise ValueError("Unknown piece letter: " + each_letter)
+            if len(row_squares) != COL_COUNT:
+                raise ValueError("A placement row has 9 squares: " + each_row)
+            squares += row_squares
+
+        self.load_board(squares)
 
     # Piece initializers
     def setup_red_initializer(self):
@@ -104,8 +223,9 @@ class Board:
         """ Returns the content on a certain address.
             Parameter:
                 square_coord: The entry location assuming the following format "[col][row]"""
-        if self.is_within_board(square_coord):  # Check if this is a valid coordinate
-            return self._board[int(square_coord[1:])][square_coord[0]]  # Return the object/contents.
+        index = square_to_index(square_coord)
+        if index is not None:  # Check if this is a valid coordinate
+            return self._board[index]  # Return the object/contents.
         return None  # If a piece does not exist, then return None.
 
     def set_square(self, square_coord, content=None):
@@ -114,8 +234,9 @@ class Board:
                 square_coord: The entry location assuming the following format "[col][row]
                 content: Optional for None for no data value, otherwise, the object contents to be injected to the board.
                 """
-        if self.is_within_board(square_coord):  # As long as this is a valid coordinate
-            self._board[int(square_coord[1:])][square_coord[0]] = content       # Default None
+        index = square_to_index(square_coord)
+        if index is not None:  # As long as this is a valid coordinate
+            self.set_index(index, content)       # Default None
 
     def move_square(self, move_from, move_to):
         """ Moves the board pieces to a specific space.
@@ -127,27 +248,224 @@ class Board:
                 move_from: The entry origin location assuming the following format "[col][row]"
                 move_to: The entry destination location assuming the following format "[col][row]"
                 """
-        if self.is_within_board(move_from, move_to):
-            # Check if the move is within bounds and is a possible non-empty "from" target.
-
-            from_piece = self._board[int(move_from[1:])][move_from[0]]  # Store the from data.
-            to_piece = self._board[int(move_to[1:])][move_to[0]]
-
-            self.set_square(move_from)  # Sets the former square to None
-            self.set_square(move_to, from_piece)  # Inject the from data to new space.
+        from_index = square_to_index(move_from)
+        to_index = square_to_index(move_to)
 
-            return [move_from, move_to, from_piece, to_piece]  # A list is exported
+        if from_index is not None and to_index is not None:
+            # Check if the move is within bounds and is a possible non-empty "from" target.
+            history = self.move_index(from_index, to_index)
+            return [move_from, move_to, history[2], history[3]]  # A list is exported
 
     def undo_move_sq(self, moved_from, moved_to, from_piece, to_piece):  # explicit arguments to pass.
         """ Undo the board move pieces."""
-        if self.is_within_board(moved_from, moved_to):
+        from_index = square_to_index(moved_from)
+        to_index = square_to_index(moved_to)
+
+        if from_index is not None and to_index is not None:
             # Check if the move is within bounds and is a possible non-empty "from" target.
-            self.set_square(moved_from, from_piece)
-            self.set_square(moved_to, to_piece)
+            self.undo_move_index(from_index, to_index, from_piece, to_piece)
+
+    # Square index manipulators - the game logic works on these, the coordinate methods above are the adapters.
+    def get_index(self, index):
+        """ Returns the content of a square index.
+            Parameter:
+                index: The square index, 0 to 89."""
+        return self._board[index]
+
+    def set_index(self, index, content=None):
+        """ Sets the content of a square index.
+            Parameters:
+                index: The square index, 0 to 89.
+                content: Optional for None for no data value, otherwise, the object contents to be injected to the board.
+                """
+        if self._board[index] is not None:
+            self._remove(index)
+        if content is not None:
+            self._place(index, content)
+
+    def move_index(self, from_index, to_index):
+        """ Moves the board piece between square indices. Does not check for game logic.
+            Returns the movement history list [from_index, to_index, from_piece, to_piece] for move-undo.
+            Parameters:
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+                """
+        from_piece = self._board[from_index]  # Store the from data.
+        to_piece = self._board[to_index]
+
+        if from_index != to_index:  # Passing in place leaves the board as is.
+            self.set_index(from_index)  # Sets the former square to None
+            self.set_index(to_index, from_piece)  # Inject the from data to new space.
+
+        return [from_index, to_index, from_piece, to_piece]
+
+    def undo_move_index(self, moved_from, moved_to, from_piece, to_piece):
+        """ Undo the board move between square indices.
+            Parameters are the movement history list entries returned by move_index."""
+        if moved_from != moved_to:
+            self.set_index(moved_from, from_piece)
+            self.set_index(moved_to, to_piece)
+
+    # Make/unmake move stack
+    def push_move(self, from_index, to_index):
+        """ Makes a move and records it on the move stack so that pop_move can take it back in O(1).
+            The record holds the moved piece, the captured piece, the position hash and the check status of both generals.
+            Does not check for game logic. Returns the captured piece, or None.
+            Parameters:
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+                """
+        board = self._board
+        moved = board[from_index]
+        captured = board[to_index]
+        checks = [(board[each_index], board[each_index].get_check_status())
+                  for each_index in self._generals.values() if each_index is not None]
+        self._history.append((from_index, to_index, moved, captured, self._hash, checks))
+
+        if from_index != to_index:  # Passing in place leaves the board as is.
+            if captured is not None:
+                self._remove(to_index)
+            self._remove(from_index)
+            self._place(to_index, moved)
+        return captured
+
+    def pop_move(self):
+        """ Takes back the last move made with push_move, restoring the captured piece, the position hash
+            and the generals' check status."""
+        from_index, to_index, moved, captured, position_hash, checks = self._history.pop()
+
+        if from_index != to_index:
+            self._remove(to_index)
+            self._place(from_index, moved)
+            if captured is not None:
+                self._place(to_index, captured)
+        self._hash = position_hash
+        for each_general, each_status in checks:
+            each_general.set_check_status(each_status)
+
+    def get_history(self):
+        """ Returns the move stack records, oldest first:
+            (from_index, to_index, moved piece, captured piece, position hash before the move, checks).
+            The list is live and must not be modified by the caller."""
+        return self._history
+
+    # Piece-location index - every board change goes through these two, so the index never needs a rescan.
+    def _place(self, index, piece):
+        """ Puts a piece on an empty square index and records it in the piece-location index."""
+        self._board[index] = piece
+        player = piece.get_player()
+        piece_code = piece.get_code()
+        self._pieces[player][index] = piece
+        self._hash ^= ZOBRIST_KEYS[player][piece_code][index]
+        self._material[player] += ev.PIECE_VALUES[piece_code]
+        self._positional[player] += ev.PIECE_SQUARE_TABLES[player][piece_code][index]
+        occupancy = self._occupancy
+        occupancy[SQUARE_RANK_LINES[index]] |= SQUARE_RANK_BITS[index]
+        occupancy[SQUARE_FILE_LINES[index]] |= SQUARE_FILE_BITS[index]
+        for line, bit in SQUARE_DIAGONAL_BITS[index]:
+            occupancy[line] |= bit
+        if piece_code == pce.GENERAL:
+            self._generals[player] = index
+        if self._bitboards is not None:
+            self._bitboards.place(index, piece)
+
+    def _remove(self, index):
+        """ Takes the piece off a square index and drops it from the piece-location index."""
+        piece = self._board[index]
+        self._board[index] = None
+        player = piece.get_player()
+        piece_code = piece.get_code()
+        del self._pieces[player][index]
+        self._hash ^= ZOBRIST_KEYS[player][piece_code][index]
+        self._material[player] -= ev.PIECE_VALUES[piece_code]
+        self._positional[player] -= ev.PIECE_SQUARE_TABLES[player][piece_code][index]
+        occupancy = self._occupancy
+        occupancy[SQUARE_RANK_LINES[index]] ^= SQUARE_RANK_BITS[index]
+        occupancy[SQUARE_FILE_LINES[index]] ^= SQUARE_FILE_BITS[index]
+        for line, bit in SQUARE_DIAGONAL_BITS[index]:
+            occupancy[line] ^= bit
+        if self._generals[player] == index:
+            self._generals[player] = None
+        if self._bitboards is not None:
+            self._bitboards.remove(index, piece)
+
+    def get_pieces(self, player):
+        """ Returns the piece-location index of a player: a dictionary of square index to piece.
+            The dictionary is live and must not be modified by the caller.
+            Parameter:
+                player: The player whose pieces are looked up."""
+        return self._pieces[player]
+
+    def get_material(self, player):
+        """ Returns the material of a player's pieces on the board, in hundredths of a point.
+            Parameter:
+                player: The player whose material is looked up."""
+        return self._material[player]
+
+    def get_positional_score(self, player):
+        """ Returns the sum of the piece-square scores of a player's pieces on the board, in hundredths of a point.
+            Parameter:
+                player: The player whose score is looked up."""
+        return self._positional[player]
+
+    def get_line_occupancy(self, line):
+        """ Returns the occupancy pattern of a slide line: bit n is set when the square at position n holds a piece.
+            Parameter:
+                line: The slide line, an index of geometry.SLIDE_LINES."""
+        return self._occupancy[line]
+
+    def get_occupancy(self):
+        """ Returns the occupancy patterns of every slide line, by line.
+            The list is live and must not be modified by the caller."""
+        return self._occupancy
+
+    def attach_bitboards(self, bitboards):
+        """ Starts mirroring the position into bit masks, kept up to date alongside the piece-location index.
+            Parameter:
+                bitboards: An empty Bitboards object from the bitboard module."""
+        self._bitboards = bitboards
+        for player in ['red', 'blue']:
+            for each_index, each_piece in self._pieces[player].items():
+                self._bitboards.place(each_index, each_piece)
+
+    def get_bitboards(self):
+        """ Returns the bitboard mirror of the position, or None if it was not enabled."""
+        return self._bitboards
+
+    # Position hash
+    def get_hash(self):
+        """ Returns the 64-bit Zobrist hash of the position: the piece placement and the side to move."""
+        return self._hash
+
+    def compute_hash(self):
+        """ Returns the Zobrist hash of the position worked out from scratch. Used to verify the incremental hash."""
+        position_hash = ZOBRIST_BLUE_TO_MOVE if self._side_to_move == 'blue' else 0
+        for player in ['red', 'blue']:
+            for each_index, each_piece in self._pieces[player].items():
+                position_hash ^= ZOBRIST_KEYS[player][each_piece.get_code()][each_index]
+        return position_hash
+
+    def get_side_to_move(self):
+        """ Returns the player in turn of the position hash, 'red' or 'blue'."""
+        return self._side_to_move
+
+    def set_side_to_move(self, player):
+        """ Sets the player in turn for the position hash.
+            Parameter:
+                player: The player in turn, 'red' or 'blue'."""
+        if player != self._side_to_move:
+            self._hash ^= ZOBRIST_BLUE_TO_MOVE
+            self._side_to_move = player
+
+    def get_general_index(self, player):
+        """ Returns the square index of the player's General, or None if it is not on the board.
+            Parameter:
+                player: The player whose General is looked up."""
+        return self._generals[player]
 
     # Board methods
     def get_board(self):
-        """ Returns the board as an object."""
+        """ Returns the board list of squares as an object."""
         return self._board
 
     # Human friendly board view
@@ -174,14 +492,15 @@ class Board:
         print(dividers_a)
 
         # Print the board contents
-        for each_row, each_row_dat in self._board.items():
+        for each_row in range(1, ROW_COUNT + 1):
             row_num = str(each_row)
+            each_row_dat = self._board[(each_row - 1) * COL_COUNT:each_row * COL_COUNT]
             if each_row < 10:
                 row_num = '_' + row_num
 
             print(row_num + '| ', end='')
 
-            for each_col, each_sq in each_row_dat.items():
+            for each_sq in each_row_dat:
                 if each_sq is None:
                     contents = '     '
                 else:
@@ -204,19 +523,8 @@ class Board:
                 move_from: The entry origin location assuming the following format "[col][row]"
                 move_to: The entry destination location assuming the following format "[col][row]"
                     Optional entry is within the board: 'a1'."""
-        rows = [str(num) for num in range(1,11)]  # The move is a string entry - so convert number to string.
-        columns = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']
-
-        try:  # In the event a non-string was entered; try-except block.
-            # Check if the entry are within the string element logic: integer range from 2 to 3.
-            if 1 < len(move_from) < 4 and 1 < len(move_to) < 4:
-
-                # Check each individual entry is within the boundary
-                if move_from[0] in columns and move_to[0] in columns and move_from[1:] in rows and move_to[1:] in rows:
-                    return True
-            return False  # Any criteria failures will return false.
-        except:  # All exception errors will return false. No messages necessary.
-            return False
+        # Any entry that is not a board coordinate (including non-strings) is not within the board.
+        return square_to_index(move_from) is not None and square_to_index(move_to) is not None
 
     def is_palace(self, selected_square):
         """ Returns a boolean true or false if the squares are considered a palace.
@@ -224,28 +532,20 @@ class Board:
             Parameter:
                 selected_square: The entry location assuming the following format "[col][row]"
             """
-        palace_columns = ['d', 'e', 'f']
-        palace_rows = ['1', '2', '3', '8', '9', '10']  # Strings as this check is only to verify if it is palace or not.
+        return square_to_index(selected_square) in PALACE_INDICES
 
-        if self.is_within_board(selected_square):
-            # As long as the movement is valid, proceed
-            if selected_square[0] in palace_columns and selected_square[1:] in palace_rows:
-                return True
-        return False  # All other cases, then the piece is not in the palace.
+    def is_palace_index(self, index):
+        """ Returns a boolean true or false if the square index is considered a palace.
+            Parameter:
+                index: The square index, 0 to 89.
+            """
+        return IS_PALACE[index]
 
     def invalid_palace_movement(self, move_from, move_to):
         """ Returns a boolean of true or false if the movement in the palace is allowed."""
-        invalid_pairs = [
-            ['e1', 'd2'], ['e1', 'f2'], ['e3', 'd2'], ['e3', 'f2'],     # Red palace pairs
-            ['d2', 'e1'], ['f2', 'e1'], ['d2', 'e3'], ['f2', 'e3'],
-            ['e8', 'd9'], ['e8', 'f9'], ['e10', 'd9'], ['e10', 'f9'],    # Blue palace pairs
-            ['d9', 'e8'], ['f9', 'e8'], ['d9', 'e10'], ['f9', 'e10']
-        ]
-        move_pair = [move_from, move_to]
-
-        if self.is_palace(move_from) and self.is_palace(move_to):
-            # All squares in palace scenario
-            for each_pair in invalid_pairs:  # Cycle through each pairing.
-                if move_pair == each_pair:
-                    return True  # Invalid movement
-        return False  # Movement has passed the check
+        return self.invalid_palace_index(square_to_index(move_from), square_to_index(move_to))
+
+    def invalid_palace_index(self, from_index, to_index):
+        """ Returns a boolean of true or false if the movement between palace square indices is not allowed.
+            The disallowed pairs are the diagonal steps that do not follow a palace line."""
+        return (from_index, to_index) in INVALID_PALACE_PAIRS
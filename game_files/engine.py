@@ -0,0 +1,401 @@
+# Game tree search that is used to pick moves in the game of Janggi
+# Negamax alpha-beta with iterative deepening, principal variation search and aspiration windows,
+# stopped by a node budget or a wall-clock deadline. The leaves are resolved by a quiescence search
+# over the captures that do not lose material by static exchange evaluation, and the check evasions.
+import time
+from game_files import board as bd
+from game_files import evaluation as ev
+from game_files import ordering as mo
+from game_files import pieces as pce
+from game_files import transposition as tt
+
+PIECE_VALUES = ev.PIECE_VALUES  # Material values in hundredths of a point, by piece type code.
+
+MATE_SCORE = 100000      # The score of a checkmate at the root - shortened by one per ply.
+MATE_BOUND = MATE_SCORE - 1000  # Scores beyond this are checkmates.
+INFINITY = MATE_SCORE + 1
+ASPIRATION_WINDOW = 50   # The half width of the first window around the previous iteration's score.
+MAX_DEPTH = 64
+CHECK_INTERVAL = 256     # Nodes searched between looks at the clock.
+
+
+class Engine:
+    """ Represents a move searcher for a JanggiGame position. Keeps its transposition table between searches."""
+
+    def __init__(self, table_size_mb=16, table=None):
+        """ Initializes the searcher.
+            Parameters:
+                table_size_mb: Optional - the transposition table size in megabytes.
+                table: Optional - a transposition table to search with instead of a new one, such as a shared table.
+            Data members:
+                table: The transposition table, shared by every search of this engine.
+                orderer: The killer moves and history table of the move ordering.
+                nodes: The number of nodes searched by the last search.
+                depth: The last fully searched depth of the last search.
+                node_limit: The node budget of the running search, or None.
+                deadline: The perf_counter time the running search stops at, or None.
+                stopped: Whether the running search ran out of budget."""
+        self._table = tt.TranspositionTable(table_size_mb) if table is None else table
+        self._orderer = mo.MoveOrderer()
+        self._nodes = 0
+        self._depth = 0
+        self._node_limit = None
+        self._deadline = None
+        self._stopped = False
+
+    def get_table(self):
+        """ Returns the transposition table of the engine."""
+        return self._table
+
+    def get_orderer(self):
+        """ Returns the move orderer of the engine."""
+        return self._orderer
+
+    def get_nodes(self):
+        """ Returns the number of nodes searched by the last search."""
+        return self._nodes
+
+    def get_depth(self):
+        """ Returns the last fully searched depth of the last search."""
+        return self._depth
+
+    def search(self, game, max_depth=MAX_DEPTH, node_limit=None, time_limit=None):
+        """ Returns the best move of the player in turn and its score as ((move_from, move_to), score).
+            The score is in hundredths of a point for the player in turn. The move is None if there is no legal move.
+            The game is left as it was found.
+            Parameters:
+                game: The JanggiGame position searched.
+                max_depth: Optional - the deepest iteration searched.
+                node_limit: Optional - stop after searching this many nodes.
+                time_limit: Optional - stop after this many seconds.
+            """
+        move, score = self.search_index(game, max_depth, node_limit, time_limit)
+        if move is None:
+            return None, score
+        return (bd.index_to_square(move[0]), bd.index_to_square(move[1])), score
+
+    def search_index(self, game, max_depth=MAX_DEPTH, node_limit=None, time_limit=None, first_depth=1):
+        """ Returns the best move as a (from_index, to_index) tuple and its score. See search.
+            Parameter:
+                first_depth: Optional - the depth the iterative deepening starts at.
+            """
+        game.start_game()
+        start = time.perf_counter()
+        self._nodes = 0
+        self._depth = 0
+        self._node_limit = node_limit
+        self._deadline = None if time_limit is None else start + time_limit
+        self._stopped = False
+        self._table.new_search()
+        self._orderer.new_search()
+
+        if game.get_game_state() != 'UNFINISHED':
+            return None, 0
+        root_moves = game.generate_legal_moves()
+        if not root_moves:
+            return None, self.no_move_score(game, 0)
+
+        best_move, best_score = root_moves[0], 0
+        for depth in range(first_depth, max_depth + 1):
+            # Aspiration window - a narrow window around the last score, widened on a fail.
+            if depth > first_depth and abs(best_score) < MATE_BOUND:
+                alpha, beta = best_score - ASPIRATION_WINDOW, best_score + ASPIRATION_WINDOW
+            else:
+                alpha, beta = -INFINITY, INFINITY
+
+            while True:
+                move, score = self.search_root(game, root_moves, depth, alpha, beta)
+                if self._stopped:
+                    break
+                if score <= alpha:
+                    alpha = -INFINITY
+                elif score >= beta:
+                    beta = INFINITY
+                else:
+                    break
+
+            if self._stopped:
+                break  # The unfinished iteration is not trusted.
+            best_move, best_score = move, score
+            self._depth = depth
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)  # The best move is searched first next iteration.
+
+            if abs(best_score) >= MATE_BOUND:
+                break  # A forced checkmate was found - deeper searches will not change it.
+            if self._deadline is not None and time.perf_counter() - start > (self._deadline - start) / 2:
+                break  # The next iteration takes longer than this one - it would not finish in time.
+        return best_move, best_score
+
+    def search_root(self, game, root_moves, depth, alpha, beta):
+        """ Returns the best root move and its score for one iteration, searched in the given order.
+            Parameters:
+                game: The JanggiGame position searched.
+                root_moves: The legal moves of the root, best guess first.
+                depth: The depth of the iteration.
+                alpha: The lower bound of the window.
+                beta: The upper bound of the window.
+            """
+        best_move, best_score = root_moves[0], -INFINITY
+        original_alpha = alpha
+        for move_number, (from_index, to_index) in enumerate(root_moves):
+            game.push_move(from_index, to_index)
+            score = self.principal_variation(game, depth - 1, alpha, beta, 1, move_number == 0)
+            game.pop_move()
+            if self._stopped:
+                break
+            if score > best_score:
+                best_move, best_score = (from_index, to_index), score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if not self._stopped:
+            bound = tt.LOWER if best_score >= beta else tt.UPPER if best_score <= original_alpha else tt.EXACT
+            self._table.store(game.get_game().get_hash(), best_move, best_score, depth, bound)
+        return best_move, best_score
+
+    def principal_variation(self, game, depth, alpha, beta, ply, first):
+        """ Returns the score of a child node for the player who moved into it.
+            The first move of a node gets the full window. The others get a null window and are searched again
+            with the full window only if they beat alpha."""
+        if first:
+            return -self.negamax(game, depth, -beta, -alpha, ply)
+        score = -self.negamax(game, depth, -alpha - 1, -alpha, ply)
+        if alpha < score < beta and not self._stopped:
+            score = -self.negamax(game, depth, -beta, -alpha, ply)
+        return score
+
+    def negamax(self, game, depth, alpha, beta, ply):
+        """ Returns the score of the position for the player in turn, searched to a given depth.
+            Parameters:
+                game: The JanggiGame position searched.
+                depth: The remaining depth.
+                alpha: The score the player in turn is already sure of.
+                beta: The score the opponent is already sure of.
+                ply: The distance from the root, used to prefer the shortest checkmate.
+            """
+        if depth <= 0:
+            return self.quiescence(game, alpha, beta, ply)
+        self._nodes += 1
+        if self._nodes % CHECK_INTERVAL == 0 or self._nodes == self._node_limit:
+            self.check_limits()
+        if self._stopped:
+            return 0
+
+        board = game.get_game()
+        key = board.get_hash()
+        original_alpha = alpha
+        table_move = None
+
+        entry = self._table.probe(key)
+        if entry is not None:
+            table_move, table_score, table_depth, bound = entry
+            table_score = score_from_table(table_score, ply)
+            if table_depth >= depth:
+                if bound == tt.EXACT:
+                    return table_score
+                if bound == tt.LOWER and table_score >= beta:
+                    return table_score
+                if bound == tt.UPPER and table_score <= alpha:
+                    return table_score
+
+        player = game.get_player_turn()
+        best_move, best_score = None, -INFINITY
+        legal_count = 0
+        for from_index, to_index in self.ordered_moves(game, table_move, ply):
+            game.push_move(from_index, to_index)
+            if game.is_general_attacked(player):  # The move leaves the own general in check.
+                game.pop_move()
+                continue
+            score = self.principal_variation(game, depth - 1, alpha, beta, ply + 1, legal_count == 0)
+            game.pop_move()
+            legal_count += 1
+            if self._stopped:
+                return 0
+            if score > best_score:
+                best_move, best_score = (from_index, to_index), score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self._orderer.record_cutoff(board.get_board(), best_move, ply, depth)
+                        break
+
+        if legal_count == 0:
+            if game.is_general_attacked(player):
+                return -MATE_SCORE + ply
+            # Not in check and no move - the player passes the turn.
+            general_index = board.get_general_index(player)
+            game.push_move(general_index, general_index)
+            best_score = -self.negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            game.pop_move()
+            if self._stopped:
+                return 0
+
+        bound = tt.LOWER if best_score >= beta else tt.UPPER if best_score <= original_alpha else tt.EXACT
+        self._table.store(key, best_move, score_to_table(best_score, ply), depth, bound)
+        return best_score
+
+    def quiescence(self, game, alpha, beta, ply):
+        """ Returns the score of a leaf position for the player in turn once the tactics on the board have settled.
+            In check, every legal evasion is searched - a check cannot be ignored by standing pat.
+            Otherwise the player may stand pat on the evaluation or play on with a capture, searched by MVV-LVA.
+            Captures that lose material by static exchange evaluation are not searched.
+            Parameters:
+                game: The JanggiGame position searched.
+                alpha: The score the player in turn is already sure of.
+                beta: The score the opponent is already sure of.
+                ply: The distance from the root.
+            """
+        self._nodes += 1
+        if self._nodes % CHECK_INTERVAL == 0 or self._nodes == self._node_limit:
+            self.check_limits()
+        if self._stopped:
+            return 0
+        if ply >= mo.MAX_PLY:
+            return self.evaluate(game)
+
+        player = game.get_player_turn()
+        if game.is_general_attacked(player):
+            best_score = -MATE_SCORE + ply  # Checkmated unless an evasion is found.
+            for from_index, to_index in list(game.generate_evasions()):
+                game.push_move(from_index, to_index)
+                score = -self.quiescence(game, -beta, -alpha, ply + 1)
+                game.pop_move()
+                if self._stopped:
+                    return 0
+                if score > best_score:
+                    best_score = score
+                    if score > alpha:
+                        alpha = score
+                        if alpha >= beta:
+                            break
+            return best_score
+
+        best_score = self.evaluate(game)  # Standing pat - the player does not have to capture.
+        if best_score >= beta:
+            return best_score
+        alpha = max(alpha, best_score)
+
+        for from_index, to_index in self.ordered_captures(game):
+            if self.static_exchange(game, from_index, to_index) < 0:
+                continue
+            game.push_move(from_index, to_index)
+            if game.is_general_attacked(player):  # The capture leaves the own general in check.
+                game.pop_move()
+                continue
+            score = -self.quiescence(game, -beta, -alpha, ply + 1)
+            game.pop_move()
+            if self._stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def ordered_captures(self, game):
+        """ Returns the captures of the player in turn by movement pattern, by MVV-LVA.
+            Captures that leave the own general in check are not filtered here."""
+        board = game.get_game()
+        squares = board.get_board()
+        captures = [(from_index, to_index) for from_index in list(board.get_pieces(game.get_player_turn()))
+                    for to_index in game.generate_piece_moves(from_index) if squares[to_index] is not None]
+        captures.sort(key=lambda move: mo.mvv_lva(squares[move[1]].get_code(), squares[move[0]].get_code()),
+                      reverse=True)
+        return captures
+
+    def static_exchange(self, game, from_index, to_index):
+        """ Returns the material won by a capture once every recapture on its square has been played out,
+            in hundredths of a point for the capturing player. Each side recaptures with its least valuable attacker,
+            the General last and only onto a square the opponent no longer attacks, and may stop when that is better.
+            The exchange is played on the board's move stack and taken back, so that the attackers are looked up anew
+            after every capture: a piece leaving a line can take away a cannon's screen or become one,
+            and a piece leaving a horse or elephant leg frees the beast behind it.
+            Parameters:
+                game: The JanggiGame position evaluated.
+                from_index: The square index of the capturing piece.
+                to_index: The square index of the captured piece.
+            """
+        squares = game.get_game().get_board()
+        gains = [PIECE_VALUES[squares[to_index].get_code()]]
+        at_stake = PIECE_VALUES[squares[from_index].get_code()]  # Lost if the capturing piece is taken back.
+        game.push_move(from_index, to_index)
+        pushed = 1
+        while True:
+            player = game.get_player_turn()
+            attackers = game.attackers_of_index(to_index, player)
+            if not attackers:
+                break
+            attacker = min(attackers, key=lambda index: exchange_order(squares[index].get_code()))
+            if squares[attacker].get_code() == pce.GENERAL and \
+                    game.is_square_attacked(to_index, game.get_opponent_turn(player), (attacker, to_index)):
+                break  # The General cannot recapture onto an attacked square.
+            gains.append(at_stake - gains[-1])
+            at_stake = PIECE_VALUES[squares[attacker].get_code()]
+            game.push_move(attacker, to_index)
+            pushed += 1
+        for _ in range(pushed):
+            game.pop_move()
+
+        # Played backwards - each side takes the better of recapturing or stopping.
+        while len(gains) > 1:
+            gains[-2] = -max(-gains[-2], gains[-1])
+            gains.pop()
+        return gains[0]
+
+    def ordered_moves(self, game, table_move, ply):
+        """ Returns the moves of the player in turn by movement pattern, in search order (see ordering.MoveOrderer):
+            the transposition table move, captures by MVV-LVA, killer moves, then the other moves by history.
+            Moves that leave the own general in check are not filtered here."""
+        board = game.get_game()
+        moves = [(from_index, to_index) for from_index in list(board.get_pieces(game.get_player_turn()))
+                 for to_index in game.generate_piece_moves(from_index)]
+        return self._orderer.order_moves(board.get_board(), moves, ply, table_move)
+
+    def evaluate(self, game):
+        """ Returns the evaluation of the position for the player in turn, in hundredths of a point:
+            material, komi and piece-square scores, read from the board's tallies (see evaluation.evaluate)."""
+        return ev.evaluate(game.get_game(), game.get_player_turn())
+
+    def no_move_score(self, game, ply):
+        """ Returns the score of a position without a legal move: checkmated if in check, otherwise the evaluation."""
+        if game.is_general_attacked(game.get_player_turn()):
+            return -MATE_SCORE + ply
+        return self.evaluate(game)
+
+    def check_limits(self):
+        """ Stops the running search once its node budget or its deadline is used up."""
+        if self._node_limit is not None and self._nodes >= self._node_limit:
+            self._stopped = True
+        elif self._deadline is not None and time.perf_counter() >= self._deadline:
+            self._stopped = True
+
+
+def exchange_order(piece_code):
+    """ Returns the sort key of a recapturing piece for static exchange evaluation - the least valuable first,
+        the General last."""
+    if piece_code == pce.GENERAL:
+        return INFINITY
+    return PIECE_VALUES[piece_code]
+
+
+def score_to_table(score, ply):
+    """ Returns a score to be stored - checkmate scores are made relative to the node rather than the root."""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """ Returns a stored score relative to the root again. See score_to_table."""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
@@ -0,0 +1,79 @@
+# Position evaluation that is used by the search and the score display in the game of Janggi
+# Material at the standard point values, the komi of the player who moves second, and piece-square scores.
+# The Board keeps each player's tally up to date as pieces are placed and removed (see Board._place),
+# so that a position is evaluated in constant time rather than by re-summing the board.
+from game_files import geometry as geo
+from game_files import pieces as pce
+
+# Material values in hundredths of a point, by piece type code.
+PIECE_VALUES = (1300, 700, 500, 300, 200, 300, 0)  # Chariot, Cannon, Horse, Elephant, Soldier, Guard, General
+KOMI = 150               # 1.5 points to the player who moves second.
+SECOND_PLAYER = 'red'    # Blue opens the game (see JanggiGame).
+
+
+def _red_view_score(piece_code, row, col):
+    """ Returns the piece-square score of a piece on a square as seen from red's side of the board.
+        Parameters:
+            piece_code: The piece type code.
+            row: The row counted from red's back rank, 1 to 10.
+            col: The column, 0 (a) to 8 (i).
+        """
+    in_own_palace = row <= 3 and 3 <= col <= 5
+    in_enemy_palace = row >= 8 and 3 <= col <= 5
+    centre = 4 - abs(col - 4)  # 0 on the edge files, 4 on the palace file.
+
+    if piece_code == pce.CHARIOT:
+        return 15 if in_enemy_palace else 5 if row >= 6 else 0
+    if piece_code == pce.CANNON:
+        return 10 if in_own_palace else 0  # Cannons guard the palace from behind a screen.
+    if piece_code == pce.HORSE:
+        return 3 * centre + (10 if 4 <= row <= 7 else 0)
+    if piece_code == pce.ELEPHANT:
+        return 2 * centre
+    if piece_code == pce.SOLDIER:
+        advance = 8 * (min(row, 9) - 4) if row > 4 else 0  # Stuck on the last rank, a soldier only moves sideways.
+        return advance + (20 if in_enemy_palace else 0)
+    # Guard and General - the palace centre covers every palace square.
+    return 10 if (row, col) == (2, 4) else 0
+
+
+def _build_piece_square_tables(player):
+    """ Returns the piece-square scores of a player by piece type code and square index.
+        Blue's tables are red's mirrored from rank to rank."""
+    tables = []
+    for piece_code in range(len(pce.PIECE_NAMES)):
+        scores = []
+        for index in range(geo.SQUARE_COUNT):
+            row, col = divmod(index, geo.COL_COUNT)
+            row = row + 1 if player == 'red' else geo.ROW_COUNT - row
+            scores.append(_red_view_score(piece_code, row, col))
+        tables.append(tuple(scores))
+    return tuple(tables)
+
+
+# Piece-square scores in hundredths of a point - built once at import.
+PIECE_SQUARE_TABLES = {'red': _build_piece_square_tables('red'), 'blue': _build_piece_square_tables('blue')}
+
+
+def evaluate(board, player):
+    """ Returns the evaluation of a Board for a player in hundredths of a point - positive is better for the player.
+        Read from the tallies the board keeps, in constant time.
+        Parameters:
+            board: The Board evaluated.
+            player: The player the score is for, 'red' or 'blue'.
+        """
+    opponent = 'blue' if player == 'red' else 'red'
+    score = (board.get_material(player) - board.get_material(opponent)
+             + board.get_positional_score(player) - board.get_positional_score(opponent))
+    return score + KOMI if player == SECOND_PLAYER else score - KOMI
+
+
+def evaluate_from_scratch(board, player):
+    """ Returns the evaluation of a Board worked out by re-summing every piece. Used to verify the tallies."""
+    score = KOMI if player == SECOND_PLAYER else -KOMI
+    for each_player in ['red', 'blue']:
+        sign = 1 if each_player == player else -1
+        for each_index, each_piece in board.get_pieces(each_player).items():
+            piece_code = each_piece.get_code()
+            score += sign * (PIECE_VALUES[piece_code] + PIECE_SQUARE_TABLES[each_player][piece_code][each_index])
+    return score
@@ -1,12 +1,32 @@
 # All gameplay logic that is used in the game of Janggi
 from game_files import board as bd
+from game_files import bitboard as bb
+from game_files import evaluation as ev
+from game_files import geometry as geo
+from game_files import pieces as pce
+
+def _build_soldier_origins(player):
+    """ Returns, per target square index, the squares a Soldier of the player attacks it from."""
+    origins = [[] for _ in range(bd.SQUARE_COUNT)]
+    for index, targets in enumerate(geo.SOLDIER_STEPS[player]):
+        for each_target in targets:
+            origins[each_target].append(index)
+    return tuple(tuple(each_origins) for each_origins in origins)
+
+
+# Attack table looked up outward from a target square - built once at import.
+# The beast attack tables are geometry.HORSE_ORIGINS and geometry.ELEPHANT_ORIGINS.
+SOLDIER_ORIGINS = {'red': _build_soldier_origins('red'), 'blue': _build_soldier_origins('blue')}
 
 
 class JanggiGame:
     """ Represents the Korean Chess game called Janggi. Handles game play logic."""
 
-    def __init__(self):
+    def __init__(self, backend='array'):
         """ Initializes the Janggi Game Logic.
+            Parameter:
+                backend: Optional - 'array' (default) validates moves square by square on the board list.
+                            'bitboard' validates moves and detects checks with the bit masks of the position.
             Data members:
                 game_state: Determines the state of the game.
                 player_turn: Determines the turn of the player - begins with blue. Should alternative with red.
@@ -15,15 +35,22 @@ class JanggiGame:
                                     Otherwise, the Janggi class brings both the classes together alongside its
                                     own logic similar to a web page.
                 move_counter: Stores the history of the move counter per player. Used to determine the first turn.
-                pieces_loc: Coordinate location of all pieces for check status purposes.
-                gen_coords: Used as an absolute determinate of a General piece location per player.
+                backend: The move validation backend, 'array' or 'bitboard'.
+                attack_maps: The last attack map of each player with the position it belongs to - see attack_map.
+            Piece and General locations are looked up from the board's piece-location index.
             """
         self._game_state = 'UNFINISHED'  # Starts with unfinished. Possible states: 'RED_WON', 'BLUE_WON', 'UNFINISHED'
         self._player_turn = 'blue'        # Initializes to blue. Possible players: 'red', 'blue'
         self._game_board = bd.Board()       # This game has a board
         self._move_counter = {'red': 0, 'blue': 0}  # Tracks the move history.
-        self._pieces_loc = {'red': [], 'blue': []}  # Coordinate list
-        self._gen_coords = {'red': None, 'blue': None}  # General Coordinates for check "destination" purposes.
+        self._backend = backend
+        self._attack_maps = {'red': None, 'blue': None}
+        self._game_board.set_side_to_move(self._player_turn)  # The position hash covers the player in turn.
+
+        if backend == 'bitboard':
+            self._game_board.attach_bitboards(bb.Bitboards())  # The board keeps the masks up to date.
+        elif backend != 'array':
+            raise ValueError("Unknown backend: " + str(backend))
 
     # Movement
     def make_move(self, move_from, move_to):
@@ -39,8 +66,9 @@ class JanggiGame:
                 Main Phase 1 - Moves to be conducted are checked if they are valid - returns to turn phase if invalid.
                         Returns False and restarts to the Turn Phase
                 Battle Phase - The move is made - a player may directly take out a piece or get a general into check.
-                Main Phase 2 - Game status is re-evaluated and applies any necessary conditions of the game.
-                Close Phase - Per the events of main phase 2 - the game turn is switched to the opposing player.
+                        A move that leaves the player's own general in check is taken back - returns False.
+                Close Phase - The game turn is switched to the opposing player.
+                Main Phase 2 - Game status is re-evaluated: the opponent in check without a legal evasion is checkmated.
                         Returns True and restarts to the Turn Phase of the opponent.
             (* Each move does not guarantee a trap card per the general to be in check status.)
         """
@@ -54,49 +82,38 @@ class JanggiGame:
         if self._game_state != 'UNFINISHED':
             return False
 
-        # Check Status - Note that thte general's location is dynamic.
-        self.gather_active_pieces()  # Update the records
-        self.check_moves_in_check()
-
-        # Is this move even in the game board?
-        if not self._game_board.is_within_board(move_from, move_to):
+        # Is this move even in the game board? The coordinates are translated to square indices once, here.
+        from_index = bd.square_to_index(move_from)
+        to_index = bd.square_to_index(move_to)
+        if from_index is None or to_index is None:
             return False
 
         # Main Phase 1
         # Checks for move legality and if the piece is owned by the player.
         #  Is the piece owned by the player?
         #   If the move is valid, then proceed to piece selector if tree.
-        if not self.piece_to_board_selector(move_from, move_to):
+        if not self.index_to_board_selector(from_index, to_index):
             return False
 
         # Battle Phase
-        history = self._game_board.move_square(move_from, move_to)
+        self._game_board.push_move(from_index, to_index)
 
-        self.gather_active_pieces()  # Update the records
-        self.check_moves_in_check()
-
-        # If the general is in check and the move did not remove the check status, undo move.
-        # Unless the piece is the general - in this case, the player is electing to forfeit.
-        if self.is_in_check(self.get_player_turn()) and self._game_board.get_square(move_from).get_name() != 'General':
-            self._game_board.undo_move_sq(history[0], history[1], history[2], history[3])
-            self.gather_active_pieces()  # Retract to previous records.
-            self.check_moves_in_check()
+        # Check Status - one outward probe from each general. Note that the general's location is dynamic.
+        # If the general is in check after the move - passing included - the move is not allowed, undo move.
+        if self.is_general_attacked(self.get_player_turn()):
+            self._game_board.pop_move()  # Retract to previous records, check status included.
             return False
-
-        # Main Phase 2
-        self.check_gen_mod()  # General positions check "check" status
-
-        # Change game state - check counter increments on a change turn or after a move is made.
-        # Since the counter is called on the opponents turn, the 2nd count or more equates to the win condition.
-        if self.get_general_dat(self.get_player_turn()).get_chk_count() >= 2:
-            self.toggle_game_state(opponent)
-        elif self.get_general_dat(opponent).get_chk_count() >= 2:
-            self.toggle_game_state(self.get_player_turn())
-        else:  # Defaults to UNFINISHED
-            self.toggle_game_state()
+        opponent_in_check = self.is_general_attacked(opponent)
+        self.set_general_check(self.get_player_turn(), False)
+        self.set_general_check(opponent, opponent_in_check)
 
         # Close Phase
         self.change_player_turn()  # Change player turn
+
+        # Main Phase 2
+        # The game is won once the opponent is in check without any legal move out of it.
+        if opponent_in_check and self.is_checkmated():
+            self.toggle_game_state(self.get_opponent_turn())
         return True  # Yes, based on that card game.
 
     # Validity check
@@ -106,7 +123,6 @@ class JanggiGame:
             Parameter:
                 Requires a player to be passed to check whether their general is currently in Check."""
         self.start_game()
-        self.gather_active_pieces()
 
         # Get the general's coordinates of a certain player.
         gen_piece = self.get_general_dat(player.lower())  # Not none square, then do the get square data method.
@@ -122,122 +138,117 @@ class JanggiGame:
                 move_from: The entry origin location assuming the following format "[col][row]"
                 move_to: The entry destination location assuming the following format "[col][row]"
         """
-        square_data = self._game_board.get_square(move_from)
-        in_board = self._game_board.is_within_board(move_from, move_to)
-        destination_data = self._game_board.get_square(move_to)
+        from_index = bd.square_to_index(move_from)
+        to_index = bd.square_to_index(move_to)
 
-        try:
-            landing_area = destination_data.get_player()  # In case this is None, then still proceed
-        except:
-            landing_area = None
+        if from_index is None or to_index is None:
+            return False  # Not in board
+        return self.index_to_board_selector(from_index, to_index)
 
-        if square_data is not None and in_board:
-            # Check if the square is has a piece and movements are within the game board.
+    def index_to_board_selector(self, from_index, to_index):
+        """ Returns the appropriate movement boolean of a selected piece between two square indices.
+            Parameters:
+                from_index: The square index of the origin, 0 to 89.
+                to_index: The square index of the destination, 0 to 89.
+        """
+        square_data = self._game_board.get_index(from_index)
+        destination_data = self._game_board.get_index(to_index)
+
+        landing_area = None  # In case this is None, then still proceed
+        if destination_data is not None:
+            landing_area = destination_data.get_player()
+
+        if square_data is not None:
+            # Check if the square is has a piece.
 
             # Player cannot move opposing player's pieces.
             if square_data.get_player() != self._player_turn:
                 return False
 
             # If from and To are the same, the player passes up their turn.
-            if move_from == move_to:  # Acts as a forfeit move if the player is already in check.
-                return True            # As long as the piece is not the general
+            if from_index == to_index:  # Not allowed while in check - make_move takes the pass back.
+                return True
 
             # Player cannot eliminate own pieces
-            if square_data.get_player() == self._player_turn and landing_area == self._player_turn:
+            if landing_area == self._player_turn:
                 return False
 
-            piece_name = square_data.get_name()
-            # We have a piece, then route to the individual movements
+            if self._backend == 'bitboard':
+                return self.bitboard_movement(from_index, to_index, square_data)
+
+            # We have a piece, then route to the individual movements through the dispatch table.
             # Each checks if the moves can be made.
             # Moves will be checked if it's restricted after the distance check.
-            if piece_name == 'Soldier':
-                return self.soldier_movement(move_from, move_to, square_data)
-            elif piece_name == 'Cannon':
-                return self.cannon_movement(move_from, move_to, square_data)
-            elif piece_name == 'Chariot':
-                return self.chariot_movement(move_from, move_to, square_data)
-            elif piece_name == 'Horse':
-                return self.horse_movement(move_from, move_to, square_data)
-            elif piece_name == 'Elephant':
-                return self.elephant_movement(move_from, move_to, square_data)
-            elif piece_name == 'Guard':
-                return self.guard_movement(move_from, move_to, square_data)
-            elif piece_name == 'General':
-                return self.general_movement(move_from, move_to, square_data)
-
-        return False  # None or not in board
+            return MOVEMENT_HANDLERS[square_data.get_code()](self, from_index, to_index, square_data)
 
-    # Game piece/board/game movement logic
-    def move_dist_data(self, move_from, move_to):
-        """ Returns the movement distance data list of the piece.
-            Assumes that the movement check is valid prior this method.
+        return False  # Empty square
+
+    # Legality queries - read only
+    def is_legal(self, move_from, move_to):
+        """ Returns the boolean of whether make_move would accept a move, without making it.
+            Nothing is changed - not the player turn, the board or the generals' check status - so read only
+            analysis may query a shared game.
             Parameters:
                 move_from: The entry origin location assuming the following format "[col][row]"
                 move_to: The entry destination location assuming the following format "[col][row]"
             """
-        column_to_number = {'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5,'f': 6, 'g': 7, 'h': 8, 'i': 9}
+        from_index = bd.square_to_index(move_from)
+        to_index = bd.square_to_index(move_to)
+        if from_index is None or to_index is None:
+            return False
+        return self.is_legal_index(from_index, to_index)
 
-        fcol = move_from[0]         # from column
-        tcol = move_to[0]           # to column
-        frow = int(move_from[1:])   # from row
-        trow = int(move_to[1:])     # to row
+    def are_legal(self, moves):
+        """ Returns a list of booleans, one per (move_from, move_to) move, of whether each move is legal.
+            See is_legal."""
+        return [self.is_legal(move_from, move_to) for move_from, move_to in moves]
 
-        col_dif = column_to_number[tcol] - column_to_number[fcol]  # Take the difference per the translated col
-        row_dif = trow - frow  # Take the difference per the row
+    def is_legal_index(self, from_index, to_index):
+        """ Returns the boolean of whether a move between two square indices is legal. See is_legal."""
+        self.start_game()
+        if self._game_state != 'UNFINISHED':
+            return False
+        if not self.index_to_board_selector(from_index, to_index):
+            return False
 
-        if self._player_turn == 'red':
-            if row_dif < 0:
-                forward_direction = 'backward'
-            elif row_dif == 0:
-                forward_direction = 'stay'
-            else:
-                forward_direction = 'forward'
-            if col_dif < 0:
-                side_direction = 'right'  # This is from a top down perspective where RED starts from A1 to I4
-            elif col_dif == 0:
-                side_direction = 'stay'
-            else:
-                side_direction = 'left'
-        else:
-            if row_dif < 0:
-                forward_direction = 'forward'
-            elif row_dif == 0:
-                forward_direction = 'stay'
-            else:
-                forward_direction = 'backward'
-            if col_dif < 0:
-                side_direction = 'left'  # This is from a top down perspective where RED starts from A1 to I4
-            elif col_dif == 0:
-                side_direction = 'stay'
-            else:
-                side_direction = 'right'
+        board = self._game_board
+        player = self._player_turn
+        if from_index == to_index:
+            return not self.is_general_attacked(player)  # Passing - not while in check.
 
-        diag_direction = 'normal'  # Can be just a pure stay-stay or a normal non-diagonal movement.
-        if 'stay' not in [forward_direction, side_direction]:
-            diag_direction = 'diagonal'
+        general_index = board.get_general_index(player)
+        if general_index == from_index:
+            return True  # The general's own moves were probed by general_trial_move already.
+        return not self.is_square_attacked(general_index, self.get_opponent_turn(player), (from_index, to_index))
 
-        return [abs(col_dif), abs(row_dif), forward_direction, side_direction, diag_direction]  # Returns move details
+    # Game piece/board/game movement logic
+    def move_dist_data(self, from_index, to_index):
+        """ Returns the movement distance data of the piece, from the current player's point of view:
+            (column distance, row distance, forward direction, side direction, diagonal direction).
+            Assumes that the movement check is valid prior this method. Looked up from the geometry tables.
+            Parameters:
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+            """
+        return geo.MOVE_DATA[self._player_turn][from_index * bd.SQUARE_COUNT + to_index]
 
     # Mechs
-    def cannon_movement(self, move_from, move_to, square_data):
+    def cannon_movement(self, from_index, to_index, square_data):
         """ Handles the movements of the cannon to game board.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 square_data: The square data object contents usually with a piece data.
             """
         # Move check
-        move_data = self.move_dist_data(move_from, move_to)
-        piece_name = square_data.get_name()
-
-        if self.mech_move_inval_checker(move_from, move_to, move_data, piece_name):
+        if self.mech_move_inval_checker(from_index, to_index, square_data.get_code()):
             return False
 
         # Restriction check
         # Cannons cannot take out/land on/eat any cannons
-        landing_sq = self._game_board.get_square(move_to)
+        landing_sq = self._game_board.get_index(to_index)
         if landing_sq is not None:
-            if landing_sq.get_name() == 'Cannon':
+            if landing_sq.get_code() == pce.CANNON:
                 return False
 
         # Cannot be moved on player's first turn.
@@ -245,73 +256,56 @@ class JanggiGame:
             return False
         return True
 
-    def chariot_movement(self, move_from, move_to, square_data):
+    def chariot_movement(self, from_index, to_index, square_data):
         """ Handles the movements of the chariot to game board.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 square_data: The square data object contents usually with a piece data.
             """
         # Move check
-        move_data = self.move_dist_data(move_from, move_to)
-        piece_name = square_data.get_name()
-
-        if self.mech_move_inval_checker(move_from, move_to, move_data, piece_name):
+        if self.mech_move_inval_checker(from_index, to_index, square_data.get_code()):
             return False
         return True
 
     # Beasts
-    def elephant_movement(self, move_from, move_to, square_data):
+    def elephant_movement(self, from_index, to_index, square_data):
         """ Handles the movements of the elephant to game board.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 square_data: The square data object contents usually with a piece data.
             """
-        # Move check
-        move_data = self.move_dist_data(move_from, move_to)
-        max_movement = square_data.get_move()
-        beast_num = self._game_board.get_square(move_from).get_beast_num()
-
-        valid_move = True
-
-        if self.beast_move_inval_checker(move_from, move_to, move_data, max_movement, beast_num):
-            valid_move = False
-
-        return valid_move
+        # Move check - the leg squares of the move have to be empty.
+        if self.beast_move_inval_checker(from_index, to_index, square_data.get_beast_num()):
+            return False
+        return True
 
-    def horse_movement(self, move_from, move_to, square_data):
+    def horse_movement(self, from_index, to_index, square_data):
         """ Handles the movements of the horse to game board.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 square_data: The square data object contents usually with a piece data.
             """
-        # Move check
-        move_data = self.move_dist_data(move_from, move_to)
-        max_movement = square_data.get_move()
-        beast_num = self._game_board.get_square(move_from).get_beast_num()
-
-        valid_move = True
-
-        if self.beast_move_inval_checker(move_from, move_to, move_data, max_movement, beast_num):
-            valid_move = False
-
-        return valid_move
+        # Move check - the leg squares of the move have to be empty.
+        if self.beast_move_inval_checker(from_index, to_index, square_data.get_beast_num()):
+            return False
+        return True
 
     # Humans
-    def soldier_movement(self, move_from, move_to, square_data):
+    def soldier_movement(self, from_index, to_index, square_data):
         """ Handles the movements of the soldier to game board.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 square_data: The square data object contents usually with a piece data.
             """
         # Move check
-        move_data = self.move_dist_data(move_from, move_to)
+        move_data = self.move_dist_data(from_index, to_index)
         max_movement = square_data.get_move()
 
-        if self.human_move_inval_checker(move_from, move_to, move_data, max_movement):
+        if self.human_move_inval_checker(from_index, to_index, move_data, max_movement):
             return False
 
         # Restriction check
@@ -320,354 +314,476 @@ class JanggiGame:
             return False
         return True  # Movement is valid.
 
-    def guard_movement(self, move_from, move_to, square_data):
+    def guard_movement(self, from_index, to_index, square_data):
         """ Handles the movements of the guard to game board.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 square_data: The square data object contents usually with a piece data.
             """
         # Move check
-        move_data = self.move_dist_data(move_from, move_to)
+        move_data = self.move_dist_data(from_index, to_index)
         max_movement = square_data.get_move()
 
-        if self.human_move_inval_checker(move_from, move_to, move_data, max_movement):
+        if self.human_move_inval_checker(from_index, to_index, move_data, max_movement):
             return False
 
         # Restriction check - All movements are confined in the palace
-        if not (self._game_board.is_palace(move_from) and self._game_board.is_palace(move_to)):
+        if not (self._game_board.is_palace_index(from_index) and self._game_board.is_palace_index(to_index)):
             return False
 
         return True
 
-    def general_movement(self, move_from, move_to, square_data):
+    def general_movement(self, from_index, to_index, square_data):
         """ Handles the movements of the general to game board.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 square_data: The square data object contents usually with a piece data.
             """
         # Move check
-        move_data = self.move_dist_data(move_from, move_to)
+        move_data = self.move_dist_data(from_index, to_index)
         max_movement = square_data.get_move()
 
-        if self.human_move_inval_checker(move_from, move_to, move_data, max_movement):
+        if self.human_move_inval_checker(from_index, to_index, move_data, max_movement):
             return False
 
         # Restriction check - All movements are confined in the palace
-        if not self._game_board.is_palace(move_from) or not self._game_board.is_palace(move_to):
+        if not self._game_board.is_palace_index(from_index) or not self._game_board.is_palace_index(to_index):
             return False
 
-        # Check state restrictions
-        self.check_moves_in_check()
+        return self.general_trial_move(from_index, to_index)
 
-        # Temporary movement to check if the movement is valid.
-        history = self._game_board.move_square(move_from, move_to)
-        self.gather_active_pieces()
-        self.check_moves_in_check()
+    def general_trial_move(self, from_index, to_index):
+        """ Returns the boolean of whether the general can move without being put into check.
+            The destination is probed as if the move was made - nothing is moved.
+            Parameters:
+                from_index: The square index of the general.
+                to_index: The square index of the destination.
+            """
+        player = self._game_board.get_index(from_index).get_player()
 
-        # IF the general became checked, then this move cannot be done.
-        if self.is_in_check(self.get_player_turn()):
-            self._game_board.undo_move_sq(history[0], history[1], history[2], history[3])
-            self.gather_active_pieces()  # Retract to previous records.
-            self.check_moves_in_check()
-            return False
+        # IF the general would become checked, then this move cannot be done.
+        return not self.is_square_attacked(to_index, self.get_opponent_turn(player), (from_index, to_index))
 
-        # When things are moved, you have to put them back! Otherwise, Nonetype error for 3 hours.
-        # So this has to appear twice.
-        self._game_board.undo_move_sq(history[0], history[1], history[2], history[3])
+    def bitboard_movement(self, from_index, to_index, square_data):
+        """ Handles the movements of any piece to game board with the bitboard backend.
+            Parameters:
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+                square_data: The square data object contents usually with a piece data.
+            """
+        if not self._game_board.get_bitboards().is_valid_move(from_index, to_index, square_data):
+            return False
 
+        piece_code = square_data.get_code()
+        # Cannot be moved on player's first turn.
+        if piece_code == pce.CANNON and self._move_counter[self._player_turn] == 0:
+            return False
+        if piece_code == pce.GENERAL:
+            return self.general_trial_move(from_index, to_index)
         return True
 
     # Invalid Move Group Checkers
-    def mech_move_inval_checker(self, move_from, move_to, move_data, piece_name):
+    def mech_move_inval_checker(self, from_index, to_index, piece_code):
         """ Returns the boolean of the mechanical piece movement check if it is invalid.
             Mechanical pieces are: Chariot (Mechanical Wagon) and Cannon. These both operate similarly.
+            Both squares have to share a slide line - a rank, a file or a palace diagonal - and the reach of the piece
+            along it is one lookup by the line's occupancy pattern.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
-                move_data: The data list values used to evaluate the move.
-                piece_name: The name of the piece, only used for differentiating movements.
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+                piece_code: The type code of the piece, only used for differentiating movements.
             """
-        # No diagonal movement allowed unless in palace
-        if move_data[4] == 'diagonal' and not self._game_board.is_palace(move_from):
+        slide_line = geo.PAIR_SLIDE_LINES[from_index * bd.SQUARE_COUNT + to_index]
+        if slide_line is None:  # No shared line - diagonal moves only run along the palace lines.
             return True
 
-        # Col to num translation
-        column_to_number = {'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5, 'f': 6, 'g': 7, 'h': 8, 'i': 9}
-        number_to_column = {1: 'a', 2: 'b', 3: 'c', 4: 'd', 5: 'e', 6: 'f', 7: 'g', 8: 'h', 9: 'i'}
-
-        # Columns and Rows
-        from_col = move_from[0]
-        to_col = move_to[0]
-        from_row = int(move_from[1:])
-        to_row = int(move_to[1:])
-
-        blockade = False
-        blockade_count = 0      # For cannon
-        cannon_jump_check = 0   # For cannon
-
-        # Movement checks
-        if move_data[2] != 'stay' and move_data[4] == 'normal':  # Forward/Backwards is extracted, not diagonal
-            # THe column must be the same - otherwise move_data[4] indicates diagonal
-
-            step_type = 1
-            if from_row > to_row:  # Shift the step type due to where the coordinates are located.
-                step_type = -1
-
-            for each_movement in range(from_row, to_row, step_type):  # Step up or Step down.
-                if each_movement == from_row:  # Skip the origin square because that's where the piece is.
-                    continue
-
-                path_dat = self._game_board.get_square(from_col + str(each_movement))
-
-                if path_dat is not None:  # Path data not None will be checked.
-                    blockade = True
-                    blockade_count += 1
-                    if path_dat.get_name() == 'Cannon':
-                        cannon_jump_check += 1
-
-        elif move_data[3] != 'stay' and move_data[4] == 'normal':  # Move data indicates a sideways direction.
-            # The row must be the same - otherwise move_data[4] indicates diagonal
-
-            from_col_num = column_to_number[from_col]
-            to_col_num = column_to_number[to_col]
-
-            step_type = 1
-            if from_col_num > to_col_num:  # Shift the step type due to where the coordinates are located.
-                step_type = -1
-
-            for each_movement in range(from_col_num, to_col_num, step_type):  # Step up or Step down.
-                if each_movement == from_col_num:  # Skip the origin square because that's where the piece is.
-                    continue
-
-                path_dat = self._game_board.get_square(number_to_column[each_movement] + move_from[1:])
-
-                if path_dat is not None:  # Path data not None will be checked.
-                    blockade = True
-                    blockade_count += 1
-                    if path_dat.get_name() == 'Cannon':
-                        cannon_jump_check += 1
-
-        else:  # Diagonal direction - palace conditions apply.
-            if not self._game_board.is_palace(move_from):
-                return True  # Diagonal movement is only allowed in the palace - Must start at palace
-
-            if move_data[0] != move_data[1]:
-                return True  # Diagonal movement have to be a 45 degree movement
-
-            col_step_num = 1
-            if move_data[3] == 'left':
-                col_step_num = -1
-            col_num = column_to_number[from_col]
-
-            step_type = 1
-            if from_row > to_row:  # Shift the step type due to where the coordinates are located.
-                step_type = -1
-
-            for each_movement in range(from_row, to_row, step_type):  # Step up or Step down.
-                if each_movement == from_row:  # Skip the origin square because that's where the piece is.
-                    col_num += col_step_num
-                    continue
-
-                path_dat = self._game_board.get_square(number_to_column[col_num] + str(each_movement))
-
-                if path_dat is not None:  # Path data not None will be checked.
-                    blockade = True
-                    blockade_count += 1
-                    if path_dat.get_name() == 'Cannon':
-                        cannon_jump_check += 1
+        line, from_position, to_position = slide_line
+        occupancy = self._game_board.get_line_occupancy(line)
 
-                col_num += col_step_num  # Add constant to mutable to "increment" to the respective direction
-
-            if piece_name == 'Chariot':
-                # Chariot has to have all movements within the palace to move diagonal.
-                if not self._game_board.is_palace(move_to):
-                    return True
-
-                if self._game_board.invalid_palace_movement(move_from, move_to):  # All moves have to be valid
-                    return True                                                   # per the diagonal of the palace
-
-        if piece_name == 'Cannon':
-            # No "screen" to jump over and 2 or more pieces are in the way - can hop only 1. Cannot hop over cannons.
-            if not blockade or blockade_count > 1 or cannon_jump_check != 0:
+        if piece_code == pce.CANNON:
+            # Exactly one "screen" to jump over - the lookup holds the squares past the first piece only.
+            if not geo.CANNON_REACH[line][from_position][occupancy] >> to_position & 1:
+                return True
+            # Cannot hop over cannons.
+            screen = (occupancy & geo.BETWEEN_MASKS[from_position][to_position]).bit_length() - 1
+            if self._game_board.get_index(geo.SLIDE_LINES[line][screen]).get_code() == pce.CANNON:
                 return True
 
-        else:  # Chariot
-            if blockade:  # Chariots cannot "jump" so a blockade is a not allowed.
+        else:  # Chariot - cannot "jump", so the lookup holds the squares up to the first piece only.
+            if not geo.CHARIOT_REACH[line][from_position][occupancy] >> to_position & 1:
                 return True
 
         return False  # Movement is valid
 
-    def beast_move_inval_checker(self, move_from, move_to, move_data, max_movement, beast_num):
+    def beast_move_inval_checker(self, from_index, to_index, beast_num):
         """ Returns the boolean of the beast piece movement check if it is invalid.
-            Beasts are: Elephant (3) and Horse (2).
-            Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
-                move_data: The data list values used to evaluate the move.
-                max_movement: The maximum movement distance of the piece
-                beast_num: Used to find the maximum diagonal move difference.
-            """
-        # Col to num translation
-        column_to_number = {'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5, 'f': 6, 'g': 7, 'h': 8, 'i': 9}
-        number_to_column = {1: 'a', 2: 'b', 3: 'c', 4: 'd', 5: 'e', 6: 'f', 7: 'g', 8: 'h', 9: 'i'}
-
-        # Index short keys
-        from_col = move_from[0]
-        to_col = move_to[0]
-        from_row = int(move_from[1:])
-        to_row = int(move_to[1:])
-
-        # Differentials of index
-        col_delta = column_to_number[from_col] - column_to_number[to_col]
-        row_delta = from_row - to_row
-
-        # Diagonal direction of the beast
-        if col_delta < 0:  # Right
-            if row_delta < 0:  # Down
-                diagonalization = 'downright'  # Quadrant 4
-            else:  # Up
-                diagonalization = 'upright'  # Quadrant 1
-        else:  # Left
-            if row_delta < 0:  # Down
-                diagonalization = 'downleft'  # Quad 3
-            else:  # Up
-                diagonalization = 'upleft'  # Quad 2
-
-        # Of the board perspective - Cross - block initialized
-        block_left = False
-        block_right = False
-        block_up = False
-        block_down = False
-
-        if (move_data[0] + move_data[1]) in [max_movement, 0] and beast_num in [move_data[0], move_data[1]]:
-            # Value has to be of the beast's movement max and must have the maximum movement differential of the beast.
-            # 3 for Elephant, 2 for Horse.
-
-            # From epicenter (From the piece)
-            left_col = column_to_number[from_col] - 1
-            right_col = column_to_number[from_col] + 1
-            up_row = from_row - 1       # Assuming the coordinate system is up decreasing, down is increasing.
-            down_row = from_row + 1     # Like a spreadsheet - A1 is top left
-
-            # Border check of beast piece
-            if left_col <= 0:
-                block_left = True
-            if right_col >= 10:
-                block_right = True
-            if up_row <= 0:
-                block_up = True
-            if down_row >= 11:
-                block_down = True
-
-            # Check the directions if they have pieces. The current blocks are based on the above "board" limit.
-            if not block_left:
-                left_sq = number_to_column[left_col] + move_from[1:]  # Address
-                left_dat = self._game_board.get_square(left_sq)       # Data
-                if left_dat is not None:
-                    block_left = True
-            if not block_right:
-                right_sq = number_to_column[right_col] + move_from[1:]
-                right_dat = self._game_board.get_square(right_sq)
-                if right_dat is not None:
-                    block_right = True
-            if not block_up:
-                up_sq = from_col + str(up_row)
-                up_dat = self._game_board.get_square(up_sq)
-                if up_dat is not None:
-                    block_up = True
-            if not block_down:
-                down_sq = from_col + str(down_row)
-                down_dat = self._game_board.get_square(down_sq)
-                if down_dat is not None:
-                    block_down = True
-
-            # All directions are blocked
-            if block_left and block_right and block_up and block_down:
-                return True
-
-            # Diagonal direction check
-            # Return the appropriate boolean from the diagonal.
-            if move_data[0] > move_data[1]:  # Column is larger - Restricted to Right or Left moves
-                # As long as the direction is not blocked, then the restriction check will go into the diagonal check.
-                # For the horse or if the direction is blocked for the elephant, the move wil lbe sent to True.
-
-                if diagonalization == 'upleft':
-                    if not block_left:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, -2, -1)
-                if diagonalization == 'downleft':
-                    if not block_left:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, -2, 1)
-                if diagonalization == 'upright':
-                    if not block_right:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, 2, -1)
-                if diagonalization == 'downright':
-                    if not block_right:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, 2, 1)
-
-            else:  # Row is larger - restricted to up or down moves.
-                if diagonalization == 'upleft':
-                    if not block_up:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, -1, -2)
-                if diagonalization == 'downleft':
-                    if not block_down:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, -1, 2)
-                if diagonalization == 'upright':
-                    if not block_up:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, 1, -2)
-                if diagonalization == 'downright':
-                    if not block_down:
-                        return self.beast_diag_helper(beast_num, number_to_column, column_to_number, from_col, from_row, 1, 2)
-
-        return True  # Move is out of bounds or blocked
-
-    def beast_diag_helper(self, beast_num, number_to_column, column_to_number, from_col, from_row, col_delta, row_delta):
-        """ Returns the boolean for the diagonal movement of a beast piece.
-            The affected piece used in this evaluation will be the Elephant.
-            Otherwise, as long as the horse was not blocked, then invalid is false.
+            Beasts are: Elephant (3) and Horse (2). The leg squares of every beast move are looked up
+            from the geometry tables, so the check is a lookup per leg square.
             Parameters:
-                beast_num: The number indicating which piece it is by movement terms.
-                number_to_column: The translation of the number to a column letter
-                column_to_number: The translation of the column letter to a number
-                from_col: The origin column that the move is being made
-                from_row: The origin row that the move is being made
-                col_delta: The directional change of the column to be evaluated
-                row_delta:The directional change of the row to be evaluated
-            """
-        if beast_num == 3:  # Only the elephant will do the additional diagonal check.
-            new_col = number_to_column[column_to_number[from_col] + col_delta]
-            new_row = str(from_row + row_delta)
-            new_sq = new_col + new_row
-            new_dat = self._game_board.get_square(new_sq)
-
-            if new_dat is not None:
-                return True
-
-        return False  # Horse is not blocked perpendicularly! Or the Elephant doesn't have any obstruction!
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+                beast_num: Used to find the movement pattern - 3 for the Elephant, 2 for the Horse.
+            """
+        beast_legs = geo.ELEPHANT_LEGS if beast_num == 3 else geo.HORSE_LEGS
+        legs = beast_legs[from_index * bd.SQUARE_COUNT + to_index]
+        if legs is None:
+            return True  # Not a move of the beast's pattern, or out of bounds.
+
+        board = self._game_board.get_board()
+        for each_leg in legs:
+            if board[each_leg] is not None:
+                return True  # Blocked
+        return False
 
-    def human_move_inval_checker(self, move_from, move_to, move_data, max_movement):
+    def human_move_inval_checker(self, from_index, to_index, move_data, max_movement):
         """ Returns the boolean of the human piece movement check if it is invalid.
             Humans are: Soldier, Guard, and General.
             Parameters:
-                move_from: The entry origin location assuming the following format "[col][row]"
-                move_to: The entry destination location assuming the following format "[col][row]"
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
                 move_data: The data list values used to evaluate the move.
                 max_movement: The maximum movement distance of the piece allowed.
             """
         if (move_data[0] + move_data[1]) > max_movement:
             # If the move sum is greater than 1, then this move could be in the palace.
-            if (move_data[0] + move_data[1]) == 2 and move_data[4] == 'diagonal' and self._game_board.is_palace(move_from):
+            if (move_data[0] + move_data[1]) == 2 and move_data[4] == 'diagonal' and self._game_board.is_palace_index(from_index):
                 # Palace movement check
-                if self._game_board.invalid_palace_movement(move_from, move_to):
+                if self._game_board.invalid_palace_index(from_index, to_index):
                     # The move is in the palace
                     return True  # Invalid movement choices
-                if not self._game_board.is_palace(move_to):
+                if not self._game_board.is_palace_index(to_index):
                     return True  # Is from the palace but moving to outside diagonally - not valid.
             else:
                 return True  # Diagonal movement and is not from the palace - invalid
         return False  # All movements are valid
 
+    # Move generation
+    def legal_moves(self):
+        """ Returns every legal move of the current player as a list of (move_from, move_to) coordinate tuples.
+            Passing the turn (a move onto the piece's own square) is not listed. Empty once the game is over."""
+        return [(bd.index_to_square(from_index), bd.index_to_square(to_index))
+                for from_index, to_index in self.generate_legal_moves()]
+
+    def legal_moves_from(self, square):
+        """ Returns the destination coordinates of every legal move of the piece on a square.
+            Empty if the square does not hold a piece of the current player.
+            Parameter:
+                square: The entry location assuming the following format "[col][row]"
+            """
+        from_index = bd.square_to_index(square)
+        if from_index is None:
+            return []
+        return [bd.index_to_square(to_index) for _, to_index in self.generate_legal_moves(from_index)]
+
+    def generate_legal_moves(self, from_index=None):
+        """ Returns the legal moves of the current player as (from_index, to_index) tuples.
+            The checking and pinned pieces are worked out once per position. In check, only the evasions are
+            generated (see generate_evasions). Otherwise a move is legal by its movement pattern alone, unless it is
+            the general's or it starts or lands on a square found by find_pins - only those are probed.
+            Parameter:
+                from_index: Optional - only generate the moves of the piece on this square index.
+            """
+        self.start_game()
+        if self._game_state != 'UNFINISHED':
+            return []
+
+        player = self._player_turn
+        board = self._game_board
+        own_pieces = board.get_pieces(player)
+
+        if from_index is None:
+            origins = list(own_pieces)
+        elif from_index in own_pieces:
+            origins = [from_index]
+        else:
+            return []
+
+        general_index = board.get_general_index(player)
+        opponent = self.get_opponent_turn(player)
+        checkers = self.attackers_of_index(general_index, opponent)
+        if checkers:  # In check - only the moves out of it.
+            return [move for move in self.generate_evasions(checkers) if from_index is None or move[0] == from_index]
+
+        pinned, screens = self.find_pins(player)
+        legal = []
+        for each_from in origins:
+            if each_from == general_index:
+                legal += [(each_from, each_to) for each_to in self.generate_piece_moves(each_from)
+                          if self.general_trial_move(each_from, each_to)]
+                continue
+            probe_all = each_from in pinned
+            for each_to in self.generate_piece_moves(each_from):
+                if (probe_all or each_to in screens) \
+                        and self.is_square_attacked(general_index, opponent, (each_from, each_to)):
+                    continue  # The move uncovers an attack on the own general.
+                legal.append((each_from, each_to))
+        return legal
+
+    def find_pins(self, player):
+        """ Returns the squares where a move of the player may uncover an attack on their own general, as a tuple:
+                pinned: The square indices of the player's pieces that may not be free to leave - in front of an enemy
+                        chariot or cannon on a line to the general, or on the leg of an enemy beast aiming at it.
+                screens: The square indices between the general and an enemy cannon where a piece landing may become
+                        the cannon's screen - the cannon's own square included, as a piece capturing it may become
+                        the screen of an enemy cannon behind it.
+            Found outward from the general, once per position. A move that neither starts on a pinned square nor lands
+            on a screen square - and is not the general's - cannot put the own general in check.
+            Parameter:
+                player: The player whose general is evaluated.
+            """
+        board = self._game_board.get_board()
+        general_index = self._game_board.get_general_index(player)
+        pinned = set()
+        screens = set()
+
+        # Mechs - the first three pieces on each line. A chariot behind one piece pins it; a cannon behind up to two
+        # pieces makes each of them a possible screen, and every square up to its own a possible screen square.
+        for each_ray in geo.LINES[general_index]:
+            in_front = []
+            for each_index in each_ray:
+                piece = board[each_index]
+                if piece is None:
+                    continue
+                if piece.get_player() != player and piece.get_code() <= pce.CANNON:
+                    if piece.get_code() == pce.CANNON:
+                        screens.update(each_ray[:each_ray.index(each_index) + 1])
+                        pinned.update(in_front)
+                        break
+                    if len(in_front) == 1:  # Chariot
+                        pinned.update(in_front)
+                in_front.append(each_index)
+                if len(in_front) == 3:
+                    break
+
+        # Beasts - a piece on the leg of an enemy beast that aims at the general.
+        for beast_code, beast_origins in ((pce.HORSE, geo.HORSE_ORIGINS), (pce.ELEPHANT, geo.ELEPHANT_ORIGINS)):
+            for each_origin, legs in beast_origins[general_index]:
+                beast = board[each_origin]
+                if beast is not None and beast.get_player() != player and beast.get_code() == beast_code:
+                    pinned.update(legs)
+
+        pinned &= set(self._game_board.get_pieces(player))
+        return pinned, screens
+
+    def is_checkmated(self):
+        """ Returns the boolean of whether the player in turn is checkmated: in check without a legal evasion.
+            Stops at the first legal evasion found."""
+        self.start_game()
+        player = self._player_turn
+        checkers = self.attack_map(self.get_opponent_turn(player))[self._game_board.get_general_index(player)]
+        if not checkers:
+            return False
+        for _ in self.generate_evasions(checkers):
+            return False
+        return True
+
+    def generate_evasions(self, checkers=None):
+        """ Yields the legal moves of the player in turn out of check as (from_index, to_index) tuples, one at a time,
+            so that a caller may stop at the first. Tried cheapest first:
+                General moves - the general steps out of the attacks.
+                Captures - a piece takes a checking piece.
+                Blocks - a piece steps onto a checking piece's path (a line square or a beast's leg),
+                        or a cannon's screen steps off the line.
+            Against a single checker, a capture or block that neither starts on a pinned square nor lands on a screen
+            square (see find_pins) is legal as it is - only the others are probed.
+            Passing is not an evasion. Assumes the player in turn is in check.
+            Parameter:
+                checkers: Optional - the square indices of the checking pieces, if already known.
+            """
+        player = self._player_turn
+        opponent = self.get_opponent_turn(player)
+        board = self._game_board
+        general_index = board.get_general_index(player)
+        pieces = [each_index for each_index in board.get_pieces(player) if each_index != general_index]
+        if checkers is None:
+            checkers = self.attackers_of_index(general_index, opponent)
+        pinned, screens = self.find_pins(player)
+        tried = set()
+
+        def candidates():
+            for each_to in self.generate_piece_moves(general_index):
+                yield general_index, each_to
+            for each_checker in checkers:
+                for each_from in pieces:
+                    yield each_from, each_checker
+            for each_checker in checkers:
+                path = self.check_path_index(each_checker, general_index)
+                for each_from in pieces:
+                    if each_from in path:  # A screen - any of its moves leaves the line.
+                        for each_to in self.generate_piece_moves(each_from):
+                            yield each_from, each_to
+                    else:
+                        for each_to in path:
+                            yield each_from, each_to
+
+        for move in candidates():
+            if move in tried:
+                continue
+            tried.add(move)
+            if move[0] == general_index:  # General moves come from its movement pattern already.
+                if not self.general_trial_move(*move):
+                    continue
+            elif not self.index_to_board_selector(*move):
+                continue
+            elif len(checkers) > 1 or move[0] in pinned or move[1] in screens:
+                if self.is_square_attacked(general_index, opponent, move):
+                    continue  # Still in check.
+            yield move
+
+    def perft(self, depth):
+        """ Returns the number of move sequences of a given depth from the current position (a perft count).
+            Compared against reference counts, this is the correctness check of the move generator.
+            Parameter:
+                depth: The number of moves - each player's move counts as one.
+            """
+        if depth <= 0:
+            return 1
+
+        moves = self.generate_legal_moves()
+        if depth == 1:
+            return len(moves)  # The leaves are counted without playing them.
+
+        nodes = 0
+        for from_index, to_index in moves:
+            self.push_move(from_index, to_index)
+            nodes += self.perft(depth - 1)
+            self.pop_move()
+        return nodes
+
+    def divide(self, depth):
+        """ Returns the perft count of a given depth split per first move, as a dictionary of
+            (move_from, move_to) coordinate tuples to the count of move sequences after that move.
+            Parameter:
+                depth: The number of moves, including the first move.
+            """
+        counts = {}
+        for from_index, to_index in self.generate_legal_moves():
+            self.push_move(from_index, to_index)
+            counts[(bd.index_to_square(from_index), bd.index_to_square(to_index))] = self.perft(depth - 1)
+            self.pop_move()
+        return counts
+
+    # Trial moves
+    def push_move(self, from_index, to_index):
+        """ Makes a move on the board's move stack and passes the turn, without any legality checks.
+            Used to look ahead - the check status and game state are not re-evaluated.
+            Returns the captured piece, or None.
+            Parameters:
+                from_index: The square index of the origin.
+                to_index: The square index of the destination.
+            """
+        captured = self._game_board.push_move(from_index, to_index)
+        self.change_player_turn()
+        return captured
+
+    def pop_move(self):
+        """ Takes back the last move made with push_move and gives the turn back."""
+        self.revert_player_turn()
+        self._game_board.pop_move()
+
+    def generate_piece_moves(self, from_index):
+        """ Returns the destination square indices of a piece by its movement pattern.
+            Own pieces are never captured. Moves that leave the own general in check are not filtered here.
+            Parameter:
+                from_index: The square index of the piece.
+            """
+        board = self._game_board.get_board()
+        piece = board[from_index]
+        player = piece.get_player()
+        piece_code = piece.get_code()
+
+        if piece_code == pce.CHARIOT or piece_code == pce.CANNON:
+            if piece_code == pce.CANNON and self._move_counter[player] == 0:
+                return []  # Cannot be moved on player's first turn.
+            targets = []
+            for line, position, bit in geo.SQUARE_SLIDE_BITS[from_index]:
+                if piece_code == pce.CHARIOT:
+                    self.chariot_line_targets(line, position, player, targets)
+                else:
+                    self.cannon_line_targets(line, position, player, targets)
+            return targets
+
+        if piece_code == pce.HORSE or piece_code == pce.ELEPHANT:
+            beast_moves = geo.HORSE_MOVES if piece_code == pce.HORSE else geo.ELEPHANT_MOVES
+            targets = []
+            for destination, legs in beast_moves[from_index]:
+                # The legs have to be empty; the destination empty or an opponent's piece.
+                if all(board[each_leg] is None for each_leg in legs):
+                    landing = board[destination]
+                    if landing is None or landing.get_player() != player:
+                        targets.append(destination)
+            return targets
+
+        # Humans - one step moves.
+        if piece_code == pce.SOLDIER:  # Forward, sideways and forward palace diagonals.
+            candidates = geo.SOLDIER_STEPS[player][from_index]
+        else:  # Guard and General are confined in the palace.
+            candidates = geo.PALACE_STEPS[from_index]
+
+        return [each_to for each_to in candidates if board[each_to] is None or board[each_to].get_player() != player]
+
+    def generate_piece_attacks(self, from_index):
+        """ Returns the square indices a piece attacks: the squares it could capture on, were they held by an opponent.
+            Unlike generate_piece_moves, squares held by the piece's own side are included.
+            Cannons attack nothing on their owner's first turn and never attack a square held by a cannon.
+            Parameter:
+                from_index: The square index of the piece.
+            """
+        board = self._game_board.get_board()
+        piece = board[from_index]
+        piece_code = piece.get_code()
+
+        if piece_code == pce.CHARIOT or piece_code == pce.CANNON:
+            if piece_code == pce.CANNON and self._move_counter[piece.get_player()] == 0:
+                return []
+            targets = []
+            for line, position, bit in geo.SQUARE_SLIDE_BITS[from_index]:
+                for slides, blocker, jumps, hurdle in \
+                        geo.SLIDE_RAYS[line][position][self._game_board.get_line_occupancy(line)]:
+                    if piece_code == pce.CHARIOT:
+                        targets.extend(slides)
+                        if blocker >= 0:
+                            targets.append(blocker)
+                    elif blocker >= 0 and board[blocker].get_code() != pce.CANNON:
+                        targets.extend(jumps)
+                        if hurdle >= 0 and board[hurdle].get_code() != pce.CANNON:
+                            targets.append(hurdle)
+            return targets
+
+        if piece_code == pce.HORSE or piece_code == pce.ELEPHANT:
+            beast_moves = geo.HORSE_MOVES if piece_code == pce.HORSE else geo.ELEPHANT_MOVES
+            return [destination for destination, legs in beast_moves[from_index]
+                    if all(board[each_leg] is None for each_leg in legs)]
+
+        if piece_code == pce.SOLDIER:
+            return list(geo.SOLDIER_STEPS[piece.get_player()][from_index])
+        return list(geo.PALACE_STEPS[from_index])
+
+    def chariot_line_targets(self, line, position, player, targets):
+        """ Appends the chariot destinations along a slide line, looked up by the line's occupancy pattern:
+            every empty square up to the first piece, and that piece if it belongs to the opponent."""
+        board = self._game_board.get_board()
+        for slides, blocker, jumps, hurdle in geo.SLIDE_RAYS[line][position][self._game_board.get_line_occupancy(line)]:
+            targets.extend(slides)
+            if blocker >= 0 and board[blocker].get_player() != player:
+                targets.append(blocker)
+
+    def cannon_line_targets(self, line, position, player, targets):
+        """ Appends the cannon destinations along a slide line, looked up by the line's occupancy pattern:
+            past exactly one screen that is not a cannon, every empty square up to the next piece,
+            and that piece if it is an opponent's non-cannon piece."""
+        board = self._game_board.get_board()
+        for slides, blocker, jumps, hurdle in geo.SLIDE_RAYS[line][position][self._game_board.get_line_occupancy(line)]:
+            if blocker < 0 or board[blocker].get_code() == pce.CANNON:
+                continue  # No screen, or a cannon - cannot hop over cannons.
+            targets.extend(jumps)
+            if hurdle >= 0:
+                landing = board[hurdle]
+                if landing.get_player() != player and landing.get_code() != pce.CANNON:
+                    targets.append(hurdle)
+
     # Game Status Data - getters
     def get_game_state(self):
         """ Returns the current state of the game.
@@ -704,19 +820,27 @@ class JanggiGame:
         else:
             self._player_turn = 'red'
             self._move_counter['blue'] += 1  # Blue has moved
+        self._game_board.set_side_to_move(self._player_turn)
+
+    def revert_player_turn(self):
+        """ Changes the player turn back and takes back the move counted by change_player_turn."""
+        self._player_turn = self.get_opponent_turn()
+        self._move_counter[self._player_turn] -= 1
+        self._game_board.set_side_to_move(self._player_turn)
 
     def set_player_turn(self, player):
         """ Sets the player turn explicitly.
             Parameter:
                 player: The player's turn to be set to."""
         self._player_turn = player
+        self._game_board.set_side_to_move(player)
 
     def get_general_dat(self, player):
         """ Returns the general's data of the player.
             Parameter:
                 player: The player evaluated to get their general's square data."""
         self.start_game()
-        return self._game_board.get_square(self._gen_coords[player])
+        return self._game_board.get_index(self._game_board.get_general_index(player))
 
     def set_general_check(self, player, boolean):
         """ Sets the general of a certain player to the check status.
@@ -727,80 +851,201 @@ class JanggiGame:
         self.start_game()
         self.get_general_dat(player).set_check_status(boolean)
 
-    def gather_active_pieces(self):
-        """ Gathers all the coordinate pieces of the players and store into their respective list.
-            This is used to evaluate the condition of the current board pieces."""
-        red_list = []  # Initiate the lists
-        blue_list = []
-
-        # Gather the items on the board: each_row is the row number key, row data are the values.
-        for each_row, each_row_dat in self._game_board.get_board().items():
-
-            # Each col is column key, sq is the value.
-            for each_col, each_sq in each_row_dat.items():
-
-                coordinate = each_col + str(each_row)  # Coordinates are created each iteration
-
-                if each_sq is None:
-                    continue  # Skip the square
-
-                if each_sq.get_player() == 'red':  # If it is owned by red
-                    red_list.append(coordinate)
-                    if each_sq.get_name() == 'General':
-                        self._gen_coords['red'] = coordinate
-                else:                              # else blue
-                    blue_list.append(coordinate)
-                    if each_sq.get_name() == 'General':
-                        self._gen_coords['blue'] = coordinate
-
-            # Inject the coordinate list.
-            self._pieces_loc['red'] = red_list
-            self._pieces_loc['blue'] = blue_list
-
     def check_moves_in_check(self):
         """ Returns a boolean after applying the appropriate check status to a general.
             From all the gathered pieces, check if the pieces would "check" the opposing generals.
                 If so, then a check status will be applied to the player's piece.
             Attacker are all pieces of the player evaluated.
             Defender is the opposing player's general."""
-        self.gather_active_pieces()
-        current_turn = self._player_turn  # Save the current turn
-        sides = ['red', 'blue']
-
-        for a_side in sides:  # Check all sides to exhaust the list
-
-            self.set_player_turn(a_side)  # Temporarily change the turn
-            opponent = self.get_opponent_turn(a_side)
-            was_checked = False
-
-            atk_pieces = self._pieces_loc[a_side]  # The pieces used to evaluate
-            gen_coord = self._gen_coords[opponent]  # The general evaluated
+        for a_side in ['red', 'blue']:  # Check all sides to exhaust the list
+            self.set_general_check(a_side, self.is_general_attacked(a_side))
 
-            for each_piece in atk_pieces:
-
-                if self.piece_to_board_selector(each_piece, gen_coord):
-                    # Apply the status and then prevent the status to be removed until further gameplay.
-                    self.set_general_check(opponent, True)  # Apply the check status
-                    was_checked = True
+    def is_general_attacked(self, player):
+        """ Returns the boolean of whether any opposing piece can currently move onto the player's general.
+            Unlike is_in_check, this is worked out from the board rather than the general's stored check status.
+            Parameter:
+                player: The player whose general is evaluated.
+            """
+        return self.is_square_attacked(self._game_board.get_general_index(player), self.get_opponent_turn(player))
 
-                if not was_checked:
-                    self.set_general_check(opponent, False)  # No check status were found
+    def is_square_attacked(self, target_index, player, move=None):
+        """ Returns the boolean of whether any piece of the player attacks a square index.
+            The attacks are looked up outward from the target square - lines for the chariots and cannons,
+            fixed offsets for the horses, elephants, soldiers, guards and the general. Nothing is moved.
+            Parameters:
+                target_index: The square index evaluated, usually a General.
+                player: The attacking player.
+                move: Optional - a (from_index, to_index) move. The attacks are looked up as if it was made,
+                        on a private copy of the squares - the game board is never changed.
+            """
+        cannons_ready = self._move_counter[player] != 0  # Cannot be moved on player's first turn.
+        board = self._game_board.get_board()
+
+        if self._backend == 'bitboard':
+            # Looked up outward from the target with mask operations.
+            if move is not None:
+                move = (move[0], move[1], board[move[0]], board[move[1]])
+            return self._game_board.get_bitboards().is_attacked(target_index, player, cannons_ready, move)
+
+        if move is not None and move[0] != move[1]:
+            board = board[:]
+            board[move[1]] = board[move[0]]
+            board[move[0]] = None
+
+        # Humans - one step away.
+        for each_origin in SOLDIER_ORIGINS[player][target_index]:
+            attacker = board[each_origin]
+            if attacker is not None and attacker.get_player() == player and attacker.get_code() == pce.SOLDIER:
+                return True
+        for each_origin in geo.PALACE_STEPS[target_index]:
+            attacker = board[each_origin]
+            if attacker is not None and attacker.get_player() == player and attacker.get_code() >= pce.GUARD:
+                return True
 
-        self.set_player_turn(current_turn)  # Return to the original state
+        # Beasts - an attacker counts as long as its legs are clear.
+        for beast_code, beast_origins in ((pce.HORSE, geo.HORSE_ORIGINS), (pce.ELEPHANT, geo.ELEPHANT_ORIGINS)):
+            for each_origin, legs in beast_origins[target_index]:
+                attacker = board[each_origin]
+                if attacker is not None and attacker.get_player() == player and attacker.get_code() == beast_code:
+                    if all(board[each_leg] is None for each_leg in legs):
+                        return True
+
+        # Mechs - the first piece on each line may be a chariot; the second may be a cannon behind a screen.
+        # Both are looked up by the occupancy pattern of the slide lines through the target.
+        target = board[target_index]
+        cannon_target = target is not None and target.get_code() == pce.CANNON  # Cannons do not capture cannons.
+        occupancy = self._game_board.get_occupancy()
+        moved = move is not None and move[0] != move[1]
+        for line, position, bit in geo.SQUARE_SLIDE_BITS[target_index]:
+            line_occupancy = self.moved_occupancy(line, occupancy[line], move) if moved else occupancy[line]
+            for blocker, hurdle in geo.SLIDE_BLOCKERS[line][position][line_occupancy]:
+                attacker = board[blocker]
+                if attacker.get_player() == player and attacker.get_code() == pce.CHARIOT:
+                    return True
+                if hurdle < 0 or not cannons_ready or cannon_target or attacker.get_code() == pce.CANNON:
+                    continue  # No cannon attack along this ray - cannons neither jump nor capture cannons.
+                attacker = board[hurdle]
+                if attacker.get_player() == player and attacker.get_code() == pce.CANNON:
+                    return True
+        return False
 
-    def check_gen_mod(self):
-        """ Applies a check counter per the Generals accordingly when invoked."""
-        player = self.get_player_turn()
-        opponent = self.get_opponent_turn(player)
+    def attackers_of_index(self, target_index, player):
+        """ Returns the square indices of every piece of the player that attacks a square index.
+            Looked up outward from the target like is_square_attacked, without stopping at the first attacker.
+            Parameters:
+                target_index: The square index evaluated, usually a General.
+                player: The attacking player.
+            """
+        cannons_ready = self._move_counter[player] != 0  # Cannot be moved on player's first turn.
+        board = self._game_board.get_board()
+        attackers = []
+
+        # Humans - one step away.
+        for each_origin in SOLDIER_ORIGINS[player][target_index]:
+            attacker = board[each_origin]
+            if attacker is not None and attacker.get_player() == player and attacker.get_code() == pce.SOLDIER:
+                attackers.append(each_origin)
+        for each_origin in geo.PALACE_STEPS[target_index]:
+            attacker = board[each_origin]
+            if attacker is not None and attacker.get_player() == player and attacker.get_code() >= pce.GUARD:
+                attackers.append(each_origin)
+
+        # Beasts - an attacker counts as long as its legs are clear.
+        for beast_code, beast_origins in ((pce.HORSE, geo.HORSE_ORIGINS), (pce.ELEPHANT, geo.ELEPHANT_ORIGINS)):
+            for each_origin, legs in beast_origins[target_index]:
+                attacker = board[each_origin]
+                if attacker is not None and attacker.get_player() == player and attacker.get_code() == beast_code:
+                    if all(board[each_leg] is None for each_leg in legs):
+                        attackers.append(each_origin)
+
+        # Mechs - the first piece on each line may be a chariot; the second may be a cannon behind a screen.
+        target = board[target_index]
+        cannon_target = target is not None and target.get_code() == pce.CANNON  # Cannons do not capture cannons.
+        occupancy = self._game_board.get_occupancy()
+        for line, position, bit in geo.SQUARE_SLIDE_BITS[target_index]:
+            for blocker, hurdle in geo.SLIDE_BLOCKERS[line][position][occupancy[line]]:
+                attacker = board[blocker]
+                if attacker.get_player() == player and attacker.get_code() == pce.CHARIOT:
+                    attackers.append(blocker)
+                if hurdle >= 0 and cannons_ready and not cannon_target and attacker.get_code() != pce.CANNON:
+                    attacker = board[hurdle]
+                    if attacker.get_player() == player and attacker.get_code() == pce.CANNON:
+                        attackers.append(hurdle)
+        return attackers
+
+    # Attack maps - cached per position
+    def attack_map(self, player):
+        """ Returns the attack map of a player: per square index, the tuple of the square indices of the player's
+            pieces attacking it - the same attacks is_square_attacked looks up, cannon screens and palace lines included.
+            Worked out once per position and cached until the position changes, so that threat displays, the checkmate
+            detector and analysis code share it.
+            Parameter:
+                player: The attacking player.
+            """
+        self.start_game()
+        key = (self._game_board.get_hash(), self._move_counter[player] != 0)  # Cannons wait for their first turn.
+        cached = self._attack_maps[player]
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        attackers = [[] for _ in range(bd.SQUARE_COUNT)]
+        for each_from in self._game_board.get_pieces(player):
+            for each_to in self.generate_piece_attacks(each_from):
+                attackers[each_to].append(each_from)
+        attack_map = tuple(tuple(each_attackers) for each_attackers in attackers)
+        self._attack_maps[player] = (key, attack_map)
+        return attack_map
+
+    def attacked_squares(self, player):
+        """ Returns the squares a player attacks as a dictionary of square coordinates to the number of attackers.
+            Squares held by the player's own pieces count too - they are defended. See attack_map.
+            Parameter:
+                player: The attacking player.
+            """
+        return {bd.index_to_square(each_index): len(each_attackers)
+                for each_index, each_attackers in enumerate(self.attack_map(player.lower())) if each_attackers}
 
-        if self.is_in_check(player):
-            self.get_general_dat(player).add_chk_count()
-        else:
-            self.get_general_dat(player).sub_chk_count()
-        if self.is_in_check(opponent):
-            self.get_general_dat(opponent).add_chk_count()
-        else:
-            self.get_general_dat(opponent).sub_chk_count()
+    def attackers_of(self, square, player):
+        """ Returns the square coordinates of a player's pieces attacking a square, read from the cached attack map.
+            Parameters:
+                square: The entry location assuming the following format "[col][row]"
+                player: The attacking player.
+            """
+        index = bd.square_to_index(square)
+        if index is None:
+            return []
+        return [bd.index_to_square(each_index) for each_index in self.attack_map(player.lower())[index]]
+
+    def check_path_index(self, attacker_index, target_index):
+        """ Returns the square indices an attacking piece passes over to reach a target square index:
+            the squares between them along a slide line - a cannon's screen included - or the legs of a beast.
+            Empty for the one step attacks of the humans.
+            Parameters:
+                attacker_index: The square index of the attacking piece.
+                target_index: The square index of the attacked square.
+            """
+        piece_code = self._game_board.get_index(attacker_index).get_code()
+        pair = attacker_index * bd.SQUARE_COUNT + target_index
+        if piece_code == pce.CHARIOT or piece_code == pce.CANNON:
+            line, from_position, to_position = geo.PAIR_SLIDE_LINES[pair]
+            between = geo.BETWEEN_MASKS[from_position][to_position]
+            return [each_index for each_position, each_index in enumerate(geo.SLIDE_LINES[line])
+                    if between >> each_position & 1]
+        if piece_code == pce.HORSE:
+            return list(geo.HORSE_LEGS[pair])
+        if piece_code == pce.ELEPHANT:
+            return list(geo.ELEPHANT_LEGS[pair])
+        return []
+
+    def moved_occupancy(self, line, line_occupancy, move):
+        """ Returns the occupancy pattern of a slide line as if a (from_index, to_index) move was made."""
+        for each_line, position, bit in geo.SQUARE_SLIDE_BITS[move[0]]:
+            if each_line == line:
+                line_occupancy &= ~bit
+        for each_line, position, bit in geo.SQUARE_SLIDE_BITS[move[1]]:
+            if each_line == line:
+                line_occupancy |= bit
+        return line_occupancy
 
     # Game Operations
     def start_game(self):
@@ -808,18 +1053,49 @@ class JanggiGame:
         # if the game board is None, then run the board setup method.
         if self._game_board.get_board() is None:
             self._game_board.setup_game()
-            self.gather_active_pieces()
             self.check_moves_in_check()
-            self.check_gen_mod()
 
     def restart_game(self):
         """ Restarts the entire game of Janggi."""
         self._game_board.setup_game()    # The board is flipped back to the beginning set up.
         self._game_state = 'UNFINISHED'  # Starts with unfinished. Possible states: 'RED_WON', 'BLUE_WON', 'UNFINISHED'
-        self._player_turn = 'red'        # Initializes to red. Possible players: 'red', 'blue'
+        self.set_player_turn('red')      # Initializes to red. Possible players: 'red', 'blue'
         self._move_counter = {'red': 0, 'blue': 0}  # Tracks the move history.
-        self._pieces_loc = {'red': [], 'blue': []}  # Coordinate location of all pieces for check status purposes.
-        self._gen_coords = {'red': None, 'blue': None}  # General's location
+
+    def load_position(self, position):
+        """ Loads a position to continue the game from - the game state is set to unfinished,
+            or won by the player who just moved if the player in turn is checkmated.
+            Raises a ValueError if the position is not in position notation, a general is missing
+            or the player who just moved is left in check.
+            Parameter:
+                position: The position notation - the piece placement (see Board.get_placement),
+                            the player in turn and each player's move count, separated by spaces.
+                            EG: the initial set up is
+                            'REHG1GEHR/4K4/1C5C1/S1S1S1S1S/9/9/s1s1s1s1s/1c5c1/4k4/rehg1gehr blue 0 0'
+            """
+        fields = position.split()
+        if len(fields) != 4 or fields[1] not in ['red', 'blue'] or not (fields[2].isdigit() and fields[3].isdigit()):
+            raise ValueError("A position is the placement, the player in turn and two move counts: " + position)
+
+        self._game_board.load_placement(fields[0])
+        self._game_state = 'UNFINISHED'
+        self.set_player_turn(fields[1])
+        self._move_counter = {'red': int(fields[2]), 'blue': int(fields[3])}
+
+        for player in ['red', 'blue']:
+            if self._game_board.get_general_index(player) is None:
+                raise ValueError("Both players need a general: " + position)
+        self.check_moves_in_check()
+        if self.is_in_check(self.get_opponent_turn()):
+            raise ValueError("The player who just moved cannot be in check: " + position)
+        if self.is_in_check(self._player_turn) and self.is_checkmated():
+            self.toggle_game_state(self.get_opponent_turn())
+
+    def get_position(self):
+        """ Returns the current position in position notation. See load_position for the notation."""
+        self.start_game()
+        return ' '.join([self._game_board.get_placement(), self._player_turn,
+                         str(self._move_counter['red']), str(self._move_counter['blue'])])
 
     def gen_game_turn_details(self):
         """ Generates and returns the game details as a tuple."""
@@ -839,6 +1115,22 @@ class JanggiGame:
         print('Current Player:', current, '| Turn:', move_num, '| Previous Board Move:', opponent)
         self._game_board.show_board()
 
+    def position_hash(self):
+        """ Returns the 64-bit Zobrist hash of the current position - the piece placement and the player in turn.
+            Equal positions reached by different move orders share the same hash."""
+        self.start_game()
+        return self._game_board.get_hash()
+
+    def get_evaluation(self, player='red'):
+        """ Returns the evaluation of the current position in points for a player - positive is better for the player.
+            Material, the komi of the player who moves second and piece-square scores, kept up to date on every move,
+            so that a score display can read it after every move in constant time.
+            Parameter:
+                player: Optional - the player the score is for. Defaults to red.
+            """
+        self.start_game()
+        return ev.evaluate(self._game_board, player.lower()) / 100
+
     def get_move_counter(self):
         """ Returns the move counter of the current game."""
         return self._move_counter
@@ -897,3 +1189,15 @@ class JanggiGame:
                     # Square check
                     return True
         return False
+
+
+# Movement handlers by piece type code - see JanggiGame.index_to_board_selector.
+MOVEMENT_HANDLERS = (
+    JanggiGame.chariot_movement,   # pce.CHARIOT
+    JanggiGame.cannon_movement,    # pce.CANNON
+    JanggiGame.horse_movement,     # pce.HORSE
+    JanggiGame.elephant_movement,  # pce.ELEPHANT
+    JanggiGame.soldier_movement,   # pce.SOLDIER
+    JanggiGame.guard_movement,     # pce.GUARD
+    JanggiGame.general_movement,   # pce.GENERAL
+)
@@ -0,0 +1,389 @@
+# Board geometry that is used in the game of Janggi
+# Square coordinates, the palace and per square pair tables - built once at import, read by every validator.
+# A square pair is looked up at index from_index * SQUARE_COUNT + to_index (see pair_index).
+
+# The board is stored as a flat list of 90 squares, row by row: a1 is index 0, i1 is 8, a2 is 9 ... i10 is 89.
+COLUMNS = 'abcdefghi'
+ROW_COUNT = 10
+COL_COUNT = 9
+SQUARE_COUNT = ROW_COUNT * COL_COUNT
+SQUARE_NAMES = tuple(col + str(row) for row in range(1, ROW_COUNT + 1) for col in COLUMNS)
+SQUARE_INDEX = {name: index for index, name in enumerate(SQUARE_NAMES)}
+SQUARE_ROWS = tuple(index // COL_COUNT for index in range(SQUARE_COUNT))  # 0-based
+SQUARE_COLS = tuple(index % COL_COUNT for index in range(SQUARE_COUNT))   # 0-based
+
+# Palace squares (cols d - f, rows 1 - 3 and 8 - 10) and the palace moves that do not follow a palace line.
+PALACE_INDICES = frozenset(SQUARE_INDEX[col + row] for col in 'def' for row in ['1', '2', '3', '8', '9', '10'])
+INVALID_PALACE_PAIRS = frozenset((SQUARE_INDEX[pair[0]], SQUARE_INDEX[pair[1]]) for pair in [
+    ['e1', 'd2'], ['e1', 'f2'], ['e3', 'd2'], ['e3', 'f2'],     # Red palace pairs
+    ['d2', 'e1'], ['f2', 'e1'], ['d2', 'e3'], ['f2', 'e3'],
+    ['e8', 'd9'], ['e8', 'f9'], ['e10', 'd9'], ['e10', 'f9'],    # Blue palace pairs
+    ['d9', 'e8'], ['f9', 'e8'], ['d9', 'e10'], ['f9', 'e10']
+])
+# Palace lines the diagonal moves follow - corner to center to corner.
+PALACE_DIAGONALS = tuple(tuple(SQUARE_INDEX[square] for square in line) for line in [
+    ['d1', 'e2', 'f3'], ['f1', 'e2', 'd3'],      # Red palace
+    ['d8', 'e9', 'f10'], ['f8', 'e9', 'd10']     # Blue palace
+])
+IS_PALACE = tuple(index in PALACE_INDICES for index in range(SQUARE_COUNT))
+
+# Movement patterns, as (row step, col step) offsets from the piece.
+ORTHOGONAL_STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+HORSE_PATHS = (  # The leg square, then the destination.
+    ((1, 0), (2, 1)), ((1, 0), (2, -1)), ((-1, 0), (-2, 1)), ((-1, 0), (-2, -1)),
+    ((0, 1), (1, 2)), ((0, 1), (-1, 2)), ((0, -1), (1, -2)), ((0, -1), (-1, -2))
+)
+ELEPHANT_PATHS = (  # The two leg squares, then the destination.
+    ((1, 0), (2, 1), (3, 2)), ((1, 0), (2, -1), (3, -2)), ((-1, 0), (-2, 1), (-3, 2)), ((-1, 0), (-2, -1), (-3, -2)),
+    ((0, 1), (1, 2), (2, 3)), ((0, 1), (-1, 2), (-2, 3)), ((0, -1), (1, -2), (2, -3)), ((0, -1), (-1, -2), (-2, -3))
+)
+
+
+def pair_index(from_index, to_index):
+    """ Returns the index of a square pair in the pair tables."""
+    return from_index * SQUARE_COUNT + to_index
+
+
+def _build_palace_diagonal_steps():
+    """ Returns, per square index, the square indices one diagonal step away along the palace lines."""
+    steps = []
+    for index in range(SQUARE_COUNT):
+        neighbours = []
+        for each_diagonal in PALACE_DIAGONALS:
+            if index in each_diagonal:
+                position = each_diagonal.index(index)
+                if position > 0:
+                    neighbours.append(each_diagonal[position - 1])
+                if position < 2:
+                    neighbours.append(each_diagonal[position + 1])
+        steps.append(tuple(neighbours))
+    return tuple(steps)
+
+
+def _build_lines():
+    """ Returns, per square index, the lines leading outward from it as tuples of square indices, nearest first:
+        the four orthogonal lines and, in the palace, the palace diagonals. Chariots and cannons move along these."""
+    lines = []
+    for index in range(SQUARE_COUNT):
+        row, col = divmod(index, COL_COUNT)
+        square_lines = []
+        for row_step, col_step in ORTHOGONAL_STEPS:
+            line = []
+            next_row, next_col = row + row_step, col + col_step
+            while 0 <= next_row < ROW_COUNT and 0 <= next_col < COL_COUNT:
+                line.append(next_row * COL_COUNT + next_col)
+                next_row, next_col = next_row + row_step, next_col + col_step
+            if line:
+                square_lines.append(tuple(line))
+        for each_diagonal in PALACE_DIAGONALS:
+            if index in each_diagonal:
+                position = each_diagonal.index(index)
+                if position < 2:
+                    square_lines.append(each_diagonal[position + 1:])
+                if position > 0:
+                    square_lines.append(tuple(reversed(each_diagonal[:position])))
+        lines.append(tuple(square_lines))
+    return tuple(lines)
+
+
+def _build_palace_steps(palace_diagonal_steps):
+    """ Returns, per square index, the palace squares a Guard or General there steps to, or an empty tuple."""
+    steps = []
+    for index in range(SQUARE_COUNT):
+        if not IS_PALACE[index]:
+            steps.append(())
+            continue
+        row, col = divmod(index, COL_COUNT)
+        orthogonal = [(row + row_step) * COL_COUNT + col + col_step for row_step, col_step in ORTHOGONAL_STEPS
+                      if 0 <= col + col_step < COL_COUNT
+                      and (row + row_step) * COL_COUNT + col + col_step in PALACE_INDICES]
+        steps.append(tuple(orthogonal) + palace_diagonal_steps[index])
+    return tuple(steps)
+
+
+def _build_soldier_steps(player, palace_diagonal_steps):
+    """ Returns, per square index, the squares a Soldier of the player there steps to:
+        forward, sideways and forward along a palace diagonal. Red moves forward towards row 10, blue towards row 1."""
+    forward = 1 if player == 'red' else -1
+    steps = []
+    for index in range(SQUARE_COUNT):
+        row, col = divmod(index, COL_COUNT)
+        targets = [next_row * COL_COUNT + next_col for next_row, next_col in
+                   [(row + forward, col), (row, col + 1), (row, col - 1)]
+                   if 0 <= next_row < ROW_COUNT and 0 <= next_col < COL_COUNT]
+        targets += [each_to for each_to in palace_diagonal_steps[index] if (each_to - index) * forward > 0]
+        steps.append(tuple(targets))
+    return tuple(steps)
+
+
+def _build_beast_moves(paths):
+    """ Returns, per origin square index, the (destination, leg squares) pairs of every beast move on the board.
+        A move is blocked when any of its leg squares is occupied.
+        Parameter:
+            paths: HORSE_PATHS or ELEPHANT_PATHS.
+        """
+    moves = []
+    for index in range(SQUARE_COUNT):
+        row, col = divmod(index, COL_COUNT)
+        square_moves = []
+        for each_path in paths:
+            path_squares = []
+            for row_step, col_step in each_path:
+                if not (0 <= row + row_step < ROW_COUNT and 0 <= col + col_step < COL_COUNT):
+                    break
+                path_squares.append((row + row_step) * COL_COUNT + col + col_step)
+            else:
+                *legs, destination = path_squares
+                square_moves.append((destination, tuple(legs)))
+        moves.append(tuple(square_moves))
+    return tuple(moves)
+
+
+def _build_beast_legs(moves):
+    """ Returns, per square pair, the leg squares of the beast move between them, or None if there is no such move."""
+    legs = [None] * (SQUARE_COUNT * SQUARE_COUNT)
+    for origin, square_moves in enumerate(moves):
+        for destination, move_legs in square_moves:
+            legs[pair_index(origin, destination)] = move_legs
+    return tuple(legs)
+
+
+def _build_beast_origins(moves):
+    """ Returns, per target square index, the (origin, leg squares) pairs of the beast moves landing on it."""
+    origins = [[] for _ in range(SQUARE_COUNT)]
+    for origin, square_moves in enumerate(moves):
+        for destination, move_legs in square_moves:
+            origins[destination].append((origin, move_legs))
+    return tuple(tuple(each_origins) for each_origins in origins)
+
+
+def _build_slide_lines():
+    """ Returns the lines the chariots and cannons slide along, as tuples of square indices in ascending order:
+        the 10 ranks, then the 9 files, then the 4 palace diagonals. A square's place on a line is its position."""
+    ranks = [tuple(range(row * COL_COUNT, (row + 1) * COL_COUNT)) for row in range(ROW_COUNT)]
+    files = [tuple(range(col, SQUARE_COUNT, COL_COUNT)) for col in range(COL_COUNT)]
+    diagonals = [tuple(sorted(each_diagonal)) for each_diagonal in PALACE_DIAGONALS]
+    return tuple(ranks + files + diagonals)
+
+
+def _build_square_slide_bits(slide_lines):
+    """ Returns, per square index, the (line, position, position bit) of every slide line through it."""
+    bits = [[] for _ in range(SQUARE_COUNT)]
+    for line, squares in enumerate(slide_lines):
+        for position, index in enumerate(squares):
+            bits[index].append((line, position, 1 << position))
+    return tuple(tuple(each_bits) for each_bits in bits)
+
+
+def _build_diagonal_slide_bits(square_slide_bits):
+    """ Returns, per square index, the (line, position bit) pairs of the palace diagonal slide lines through it.
+        Every square is also on one rank (line row) and one file (line ROW_COUNT + col) - those are not listed."""
+    return tuple(tuple((line, bit) for line, position, bit in each_bits if line >= ROW_COUNT + COL_COUNT)
+                 for each_bits in square_slide_bits)
+
+
+def _build_pair_slide_lines(slide_lines):
+    """ Returns, per square pair, the (line, from position, to position) of the slide line through both squares,
+        or None if a chariot or cannon can never move between them."""
+    pairs = [None] * (SQUARE_COUNT * SQUARE_COUNT)
+    for line, squares in enumerate(slide_lines):
+        for from_position, from_index in enumerate(squares):
+            for to_position, to_index in enumerate(squares):
+                if from_position != to_position:
+                    pairs[pair_index(from_index, to_index)] = (line, from_position, to_position)
+    return tuple(pairs)
+
+
+def _build_outward_rays(outward, shift):
+    """ Returns the rays leading outward from a position in one direction as (entries, numbers):
+            entries: The distinct entries, each a one tuple ((slides, blocker, jumps, hurdle),) - see _build_slide_rays.
+                An empty tuple if there is no position that way.
+            numbers: Per occupancy pattern of the positions in the direction, the number of its entry.
+        Parameters:
+            outward: The positions of the direction, nearest first.
+            shift: The lowest position of the direction - position n is bit n - shift of the pattern.
+        """
+    if not outward:
+        return ((),), (0,)
+    entry_numbers = {}
+    numbers = []
+    for occupancy in range(1 << len(outward)):
+        found = [[], -1, [], -1]
+        stage = 0  # 0 - sliding, 2 - jumping past the screen.
+        for each_position in outward:
+            if occupancy >> (each_position - shift) & 1:
+                found[stage + 1] = each_position
+                if stage == 2:
+                    break
+                stage = 2
+            else:
+                found[stage].append(each_position)
+        entry = ((tuple(found[0]), found[1], tuple(found[2]), found[3]),)
+        numbers.append(entry_numbers.setdefault(entry, len(entry_numbers)))
+    return tuple(entry_numbers), tuple(numbers)
+
+
+def _build_slide_rays(length):
+    """ Returns, per position of a line of the given length, the rays leading outward from the position
+        as (upward, downward, pairs, numbers):
+            upward, downward: The distinct entries of each direction - see _build_outward_rays.
+            pairs: The distinct (upward number, downward number) pairings of the entries.
+            numbers: Per occupancy pattern of the line, the number of its pairing.
+        The rays are (slides, blocker, jumps, hurdle) tuples:
+            slides: The empty positions before the first piece, nearest first.
+            blocker: The position of the first piece - a chariot's capture, a cannon's screen - or -1.
+            jumps: The empty positions between the screen and the next piece, nearest first.
+            hurdle: The position of the next piece past the screen - a cannon's capture - or -1.
+        The occupancy pattern has bit n set when position n holds a piece. The bit of the position itself is ignored.
+        Each direction only depends on the bits on its side, so the tables of a line are built from the
+        few distinct pairings (see _pair_directions) rather than ray by ray."""
+    slide_rays = []
+    for position in range(length):
+        upward, upward_numbers = _build_outward_rays(range(position + 1, length), position + 1)
+        downward, downward_numbers = _build_outward_rays(range(position - 1, -1, -1), 0)
+        pair_numbers = {}
+        numbers = []
+        for each_upward in upward_numbers:
+            chunk = [pair_numbers.setdefault((each_upward, each_downward), len(pair_numbers))
+                     for each_downward in downward_numbers]
+            numbers += chunk
+            numbers += chunk  # With and without a piece on the position itself.
+        slide_rays.append((upward, downward, tuple(pair_numbers), tuple(numbers)))
+    return tuple(slide_rays)
+
+
+def _pair_directions(slide_rays, convert):
+    """ Returns a slide table looked up at [position][occupancy pattern]: the entries of both directions,
+        each turned by a function, paired up per occupancy pattern. Equal pairings are shared.
+        Parameters:
+            slide_rays: The _build_slide_rays of a line length.
+            convert: The function turning an entry of _build_outward_rays - its result for the two directions is added.
+        """
+    table = []
+    for upward, downward, pairs, numbers in slide_rays:
+        upward = [convert(entry) for entry in upward]
+        downward = [convert(entry) for entry in downward]
+        paired = [upward[each_upward] + downward[each_downward] for each_upward, each_downward in pairs]
+        table.append(tuple(map(paired.__getitem__, numbers)))
+    return tuple(table)
+
+
+def _build_line_table(squares, slide_rays, kind):
+    """ Returns a slide table of one slide line, looked up at [position][occupancy pattern], in square indices:
+            'rays': The rays leading outward from the position as (slides, blocker, jumps, hurdle) tuples.
+            'blockers': The (blocker, hurdle) squares of the rays that hit a piece, hurdle -1 if there is none.
+                Looked up outward from a target square: the blocker may be a chariot, the hurdle a cannon behind a screen.
+        Parameters:
+            squares: The square indices of the slide line.
+            slide_rays: The _build_slide_rays of the line's length.
+            kind: 'rays' or 'blockers'.
+        """
+    line_squares = squares + (-1,)  # Position -1, no piece, stays -1.
+    to_squares = line_squares.__getitem__
+
+    def convert(entry):
+        if not entry:
+            return ()
+        slides, blocker, jumps, hurdle = entry[0]
+        if kind == 'rays':
+            return (tuple(map(to_squares, slides)), line_squares[blocker], tuple(map(to_squares, jumps)),
+                    line_squares[hurdle]),
+        return ((line_squares[blocker], line_squares[hurdle]),) if blocker >= 0 else ()
+
+    return _pair_directions(slide_rays, convert)
+
+
+def _build_reach_masks(slide_rays, mech):
+    """ Returns, per position and occupancy pattern, the mask of the positions a mechanical piece reaches,
+        captures included. Own pieces and cannon-on-cannon captures are not filtered.
+        Parameters:
+            slide_rays: The _build_slide_rays of a line length.
+            mech: 'chariot' for the slides and blockers, 'cannon' for the jumps and hurdles.
+        """
+    def convert(entry):
+        if not entry:
+            return 0
+        slides, blocker, jumps, hurdle = entry[0]
+        reached = slides + (blocker,) if mech == 'chariot' else jumps + (hurdle,)
+        return sum(1 << each_position for each_position in reached if each_position >= 0)
+
+    return _pair_directions(slide_rays, convert)  # The directions never overlap, so their masks add up.
+
+
+def _build_between_masks(length):
+    """ Returns, per pair of positions on a line, the mask of the positions strictly between them."""
+    return tuple(tuple(sum(1 << each_position for each_position in range(min(first, second) + 1, max(first, second)))
+                       for second in range(length)) for first in range(length))
+
+
+def _build_move_data(player):
+    """ Returns, per square pair, the move distance data from the player's point of view:
+        (column distance, row distance, forward direction, side direction, diagonal direction).
+        Red moves forward towards row 10, blue towards row 1. Sides are from a top down perspective."""
+    move_data = []
+    for from_index in range(SQUARE_COUNT):
+        from_row, from_col = divmod(from_index, COL_COUNT)
+        for to_index in range(SQUARE_COUNT):
+            to_row, to_col = divmod(to_index, COL_COUNT)
+            col_dif = to_col - from_col
+            row_dif = to_row - from_row
+            if player == 'blue':
+                row_dif, col_dif = -row_dif, -col_dif  # Blue faces the other way.
+
+            if row_dif < 0:
+                forward_direction = 'backward'
+            elif row_dif == 0:
+                forward_direction = 'stay'
+            else:
+                forward_direction = 'forward'
+            if col_dif < 0:
+                side_direction = 'right'
+            elif col_dif == 0:
+                side_direction = 'stay'
+            else:
+                side_direction = 'left'
+
+            diag_direction = 'normal'  # Can be just a pure stay-stay or a normal non-diagonal movement.
+            if 'stay' not in [forward_direction, side_direction]:
+                diag_direction = 'diagonal'
+
+            move_data.append((abs(col_dif), abs(row_dif), forward_direction, side_direction, diag_direction))
+    return tuple(move_data)
+
+
+# Square tables
+PALACE_DIAGONAL_STEPS = _build_palace_diagonal_steps()
+PALACE_STEPS = _build_palace_steps(PALACE_DIAGONAL_STEPS)
+SOLDIER_STEPS = {player: _build_soldier_steps(player, PALACE_DIAGONAL_STEPS) for player in ['red', 'blue']}
+LINES = _build_lines()
+
+# Beast tables - the moves from a square, the legs of a square pair and the moves landing on a square.
+HORSE_MOVES = _build_beast_moves(HORSE_PATHS)
+ELEPHANT_MOVES = _build_beast_moves(ELEPHANT_PATHS)
+HORSE_LEGS = _build_beast_legs(HORSE_MOVES)
+ELEPHANT_LEGS = _build_beast_legs(ELEPHANT_MOVES)
+HORSE_ORIGINS = _build_beast_origins(HORSE_MOVES)
+ELEPHANT_ORIGINS = _build_beast_origins(ELEPHANT_MOVES)
+
+# Slide tables - occupancy-indexed lookups for the chariots and cannons, by slide line.
+# Looked up at [line][position][occupancy pattern] (see Board.get_line_occupancy). The rays and blockers hold
+# square indices, the reach masks hold position bits.
+SLIDE_LINES = _build_slide_lines()
+SQUARE_SLIDE_BITS = _build_square_slide_bits(SLIDE_LINES)
+SQUARE_RANK_LINES = SQUARE_ROWS
+SQUARE_FILE_LINES = tuple(ROW_COUNT + col for col in SQUARE_COLS)
+SQUARE_RANK_BITS = tuple(1 << col for col in SQUARE_COLS)
+SQUARE_FILE_BITS = tuple(1 << row for row in SQUARE_ROWS)
+SQUARE_DIAGONAL_BITS = _build_diagonal_slide_bits(SQUARE_SLIDE_BITS)
+PAIR_SLIDE_LINES = _build_pair_slide_lines(SLIDE_LINES)
+_slide_rays = {length: _build_slide_rays(length) for length in {len(squares) for squares in SLIDE_LINES}}
+_chariot_reach = {length: _build_reach_masks(slide_rays, 'chariot') for length, slide_rays in _slide_rays.items()}
+_cannon_reach = {length: _build_reach_masks(slide_rays, 'cannon') for length, slide_rays in _slide_rays.items()}
+SLIDE_RAYS = tuple(_build_line_table(squares, _slide_rays[len(squares)], 'rays') for squares in SLIDE_LINES)
+CHARIOT_REACH = tuple(_chariot_reach[len(squares)] for squares in SLIDE_LINES)
+CANNON_REACH = tuple(_cannon_reach[len(squares)] for squares in SLIDE_LINES)
+SLIDE_BLOCKERS = tuple(_build_line_table(squares, _slide_rays[len(squares)], 'blockers') for squares in SLIDE_LINES)
+BETWEEN_MASKS = _build_between_masks(max(len(squares) for squares in SLIDE_LINES))
+
+# Square pair tables
+MOVE_DATA = {'red': _build_move_data('red'), 'blue': _build_move_data('blue')}
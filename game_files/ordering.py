@@ -0,0 +1,109 @@
+# Move ordering that is used by the search code of the game of Janggi
+# The better moves are searched first so that alpha-beta cuts off the rest sooner:
+# the transposition table move, then captures by MVV-LVA, then killer moves, then the other moves by history.
+from game_files import board as bd
+
+# Ordering values by piece type code - the most valuable victim first, taken by the least valuable attacker.
+# The General is never a victim. As an attacker it counts as the cheapest: its captures are only legal on safe squares.
+ORDER_VALUES = (13, 7, 5, 3, 2, 3, 0)  # Chariot, Cannon, Horse, Elephant, Soldier, Guard, General
+
+MAX_PLY = 128          # The deepest ply that keeps killer moves.
+KILLER_SLOTS = 2       # Killer moves kept per ply.
+HISTORY_LIMIT = 1 << 16  # The history scores are halved once any reaches this.
+
+# Sort keys - every band stays above the one after it.
+TABLE_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+KILLER_SCORE = 1 << 20
+
+
+def mvv_lva(victim_code, attacker_code):
+    """ Returns the capture ordering score of a capture: the victim's value first, then the attacker's value reversed.
+        Parameters:
+            victim_code: The type code of the captured piece.
+            attacker_code: The type code of the capturing piece.
+        """
+    return ORDER_VALUES[victim_code] * 16 - ORDER_VALUES[attacker_code]
+
+
+class MoveOrderer:
+    """ Represents the move ordering state of a searcher: the killer moves per ply and the history table.
+        Moves are (from_index, to_index) tuples."""
+
+    def __init__(self):
+        """ Initializes empty killer and history tables.
+            Data members:
+                killers: Per ply, the last quiet moves that caused a beta cutoff, newest first.
+                history: Per square pair, a score of how often the quiet move caused a cutoff, weighted by depth."""
+        self._killers = [[None] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        self._history = [0] * (bd.SQUARE_COUNT * bd.SQUARE_COUNT)
+
+    def clear(self):
+        """ Empties the killer and history tables."""
+        self._killers = [[None] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        self._history = [0] * (bd.SQUARE_COUNT * bd.SQUARE_COUNT)
+
+    def new_search(self):
+        """ Starts a new search: the killer moves are dropped - their plies no longer match - and the history is aged."""
+        self._killers = [[None] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        self.age_history()
+
+    def age_history(self):
+        """ Halves every history score, so that newer cutoffs weigh more than older ones."""
+        self._history = [score >> 1 for score in self._history]
+
+    def get_killers(self, ply):
+        """ Returns the killer moves of a ply, newest first. Empty slots are None."""
+        if ply >= MAX_PLY:
+            return [None] * KILLER_SLOTS
+        return self._killers[ply]
+
+    def get_history(self, move):
+        """ Returns the history score of a move."""
+        return self._history[move[0] * bd.SQUARE_COUNT + move[1]]
+
+    def move_score(self, squares, move, ply, table_move=None):
+        """ Returns the sort key of a move - the higher, the earlier it is searched.
+            Parameters:
+                squares: The board list of squares the move is made on.
+                move: The (from_index, to_index) move.
+                ply: The distance from the root, for the killer moves.
+                table_move: Optional - the transposition table move of the position.
+            """
+        if move == table_move:
+            return TABLE_MOVE_SCORE
+        victim = squares[move[1]]
+        if victim is not None:
+            return CAPTURE_SCORE + mvv_lva(victim.get_code(), squares[move[0]].get_code())
+        if ply < MAX_PLY:
+            killers = self._killers[ply]
+            if move == killers[0]:
+                return KILLER_SCORE + 2
+            if move in killers:
+                return KILLER_SCORE + 1
+        return self._history[move[0] * bd.SQUARE_COUNT + move[1]]
+
+    def order_moves(self, squares, moves, ply, table_move=None):
+        """ Returns the moves in search order: the transposition table move, the captures by MVV-LVA,
+            the killer moves of the ply, then the quiet moves by history score. See move_score."""
+        return sorted(moves, key=lambda move: self.move_score(squares, move, ply, table_move), reverse=True)
+
+    def record_cutoff(self, squares, move, ply, depth):
+        """ Records a move that caused a beta cutoff. Captures are ordered by MVV-LVA already and are not recorded.
+            Parameters:
+                squares: The board list of squares before the move is made.
+                move: The (from_index, to_index) move.
+                ply: The distance from the root.
+                depth: The remaining depth of the cutoff - deeper cutoffs weigh more.
+            """
+        if squares[move[1]] is not None:
+            return
+        if ply < MAX_PLY:
+            killers = self._killers[ply]
+            if killers[0] != move:
+                killers[1:] = killers[:-1]
+                killers[0] = move
+        pair = move[0] * bd.SQUARE_COUNT + move[1]
+        self._history[pair] += depth * depth
+        if self._history[pair] >= HISTORY_LIMIT:
+            self.age_history()
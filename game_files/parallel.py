@@ -0,0 +1,98 @@
+# Parallel game tree search that is used to pick moves in the game of Janggi
+# Lazy SMP: worker processes search the same root position at once, each with an Engine of its own,
+# over one transposition table in shared memory - the results one worker stores guide the others.
+# Processes rather than threads, since the search is bound by the interpreter.
+import collections
+import concurrent.futures
+import os
+from game_files import engine
+from game_files import game as jg
+from game_files import transposition as tt
+
+_worker_engine = None  # The searcher of a worker process, over the shared table - see start_worker.
+
+
+def start_worker(table_name):
+    """ Initializes a worker process: attaches to the shared table and makes the searcher of the process.
+        Parameter:
+            table_name: The name of the shared memory of the table.
+        """
+    global _worker_engine
+    _worker_engine = engine.Engine(table=tt.SharedTranspositionTable(name=table_name))
+
+
+def search_worker(position, age, first_depth, max_depth, node_limit, time_limit):
+    """ Returns the result of one worker's search as (move, score, depth, nodes). Runs in a worker process.
+        Parameters:
+            position: The root position in position notation (see JanggiGame.load_position).
+            age: The search generation of the shared table before the search.
+            first_depth: The depth the worker's iterative deepening starts at.
+            max_depth: The deepest iteration searched.
+            node_limit: The node budget of the worker, or None.
+            time_limit: The time limit in seconds, or None.
+        """
+    game = jg.JanggiGame()
+    game.load_position(position)
+    _worker_engine.get_table().set_age(age)  # The search moves every worker on to the same generation.
+    move, score = _worker_engine.search_index(game, max_depth, node_limit, time_limit, first_depth)
+    return move, score, _worker_engine.get_depth(), _worker_engine.get_nodes()
+
+
+class ParallelEngine(engine.Engine):
+    """ Represents a move searcher that runs a search in several processes at once (lazy SMP).
+        Every worker searches the whole root position; half of them start one depth deeper, so that the workers
+        spread out over the tree rather than repeat each other. Searched like an Engine."""
+
+    def __init__(self, workers=None, table_size_mb=16):
+        """ Initializes the searcher. The worker processes are started by the first search.
+            Parameters:
+                workers: Optional - the number of worker processes. Defaults to the number of CPUs.
+                table_size_mb: Optional - the shared transposition table size in megabytes.
+            Data members:
+                workers: The number of worker processes.
+                pool: The process pool of the workers, or None until the first search.
+            The table is a SharedTranspositionTable the workers attach to. See Engine for the others."""
+        super().__init__(table=tt.SharedTranspositionTable(table_size_mb))
+        self._workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def get_workers(self):
+        """ Returns the number of worker processes."""
+        return self._workers
+
+    def search_index(self, game, max_depth=engine.MAX_DEPTH, node_limit=None, time_limit=None, first_depth=1):
+        """ Returns the best move as a (from_index, to_index) tuple and its score. See Engine.search.
+            The node limit applies per worker. The root results of the workers are aggregated:
+            the deepest finished iteration counts, then the move most workers agree on, then the score.
+            Afterwards, nodes is the total over the workers and depth the deepest finished iteration."""
+        game.start_game()
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(self._workers, initializer=start_worker,
+                                                                initargs=(self._table.get_name(),))
+        age = self._table.get_age()
+        self._table.new_search()  # Kept at the generation the workers move on to.
+        position = game.get_position()
+        futures = [self._pool.submit(search_worker, position, age, first_depth + worker % 2, max_depth,
+                                     node_limit, time_limit)
+                   for worker in range(self._workers)]
+        results = [each_future.result() for each_future in futures]
+
+        self._nodes = sum(nodes for move, score, depth, nodes in results)
+        self._depth = max(depth for move, score, depth, nodes in results)
+        finished = [(move, score) for move, score, depth, nodes in results if depth == self._depth]
+        votes = collections.Counter(move for move, score in finished)
+        return max(finished, key=lambda result: (votes[result[0]], result[1]))
+
+    def close(self):
+        """ Stops the worker processes and frees the shared table. The searcher is unusable afterwards."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._table.close()
+        self._table.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,9 +1,36 @@
 # All pieces that are used in the game of Janggi
+# Pieces are flyweights: one shared instance per player and piece type, except the General,
+# which carries its own check status.
+
+# Piece type codes - used to index the dispatch, mask and hash tables of the other modules.
+CHARIOT = 0
+CANNON = 1
+HORSE = 2
+ELEPHANT = 3
+SOLDIER = 4
+GUARD = 5
+GENERAL = 6
+PIECE_NAMES = ('Chariot', 'Cannon', 'Horse', 'Elephant', 'Soldier', 'Guard', 'General')  # By type code
 
 
 class Pieces:
     """ Represents the Janggi pieces.
-        Each piece will hold its individual information."""
+        Each piece will hold its individual information.
+        Constructing a piece returns the shared instance of its player and type, unless the type keeps state."""
+    __slots__ = ('_player',)
+    _shared = True  # Whether one instance is shared per player.
+    _instances = {}  # The shared instances, by (class, player).
+
+    def __new__(cls, player):
+        """ Returns the shared piece of the player, made on first use."""
+        if not cls._shared:
+            return super().__new__(cls)
+        key = (cls, player.lower())
+        piece = Pieces._instances.get(key)
+        if piece is None:
+            piece = super().__new__(cls)
+            Pieces._instances[key] = piece
+        return piece
 
     def __init__(self, player):
         """ Initializes the Janggi pieces.
@@ -11,59 +38,53 @@ class Pieces:
                 player: The player in which the piece will now belong to."""
         self._player = player.lower()
 
-    def get_player(self):
-        """ Returns the owner of the piece."""
-        return self._player
-
-
-class Chariot(Pieces):
-    """ Represents the Chariot piece."""
-
-    def __init__(self, player):
-        """ Initiates the piece's data accordingly.
-            Data members:
-                name: The name of the piece.
-                move: max movement limits."""
-        super().__init__(player)
-        self._name = 'Chariot'
-        self._move = 10  # Within the game limits
+    def __reduce__(self):
+        """ Copies and pickles of a shared piece resolve to the shared piece again."""
+        return self.__class__, (self._player,)
 
     def __repr__(self):
         """ Pretty print the name of the piece."""
         return self.get_player()[0].upper()+'.'+self._name[:3]
 
+    def get_player(self):
+        """ Returns the owner of the piece."""
+        return self._player
+
     def get_name(self):
         """ Returns the name of the piece."""
         return self._name
 
+    def get_code(self):
+        """ Returns the type code of the piece."""
+        return self._code
+
     def get_move(self):
         """ Returns the maximum movement square."""
         return self._move
 
 
-class Elephant(Pieces):
-    """ Represents the Elephant piece."""
-
-    def __init__(self, player):
-        """ Initiates the piece's data accordingly.
-            Data members:
-                name: The name of the piece.
-                move: max movement limits."""
-        super().__init__(player)
-        self._name = 'Elephant'
-        self._move = 5
+class Chariot(Pieces):
+    """ Represents the Chariot piece.
+        Class data members:
+            name: The name of the piece.
+            code: The type code of the piece.
+            move: max movement limits."""
+    __slots__ = ()
+    _name = 'Chariot'
+    _code = CHARIOT
+    _move = 10  # Within the game limits
 
-    def __repr__(self):
-        """ Pretty print the name of the piece."""
-        return self.get_player()[0].upper()+'.'+self._name[:3]
 
-    def get_name(self):
-        """ Returns the name of the piece."""
-        return self._name
-
-    def get_move(self):
-        """ Returns the maximum movement square."""
-        return self._move
+class Elephant(Pieces):
+    """ Represents the Elephant piece.
+        Class data members:
+            name: The name of the piece.
+            code: The type code of the piece.
+            move: max movement limits."""
+    __slots__ = ()
+    _name = 'Elephant'
+    _code = ELEPHANT
+    _move = 5
 
     def get_beast_num(self):
         """ Returns the beast number (Colloquial on diagonal move difference)."""
@@ -71,28 +92,15 @@ class Elephant(Pieces):
 
 
 class Horse(Pieces):
-    """ Represents the Horse piece."""
-
-    def __init__(self, player):
-        """ Initiates the piece's data accordingly.
-             Data members:
-                name: The name of the piece.
-                move: max movement limits."""
-        super().__init__(player)
-        self._name = 'Horse'
-        self._move = 3
-
-    def __repr__(self):
-        """ Pretty print the name of the piece."""
-        return self.get_player()[0].upper()+'.'+self._name[:3]
-
-    def get_name(self):
-        """ Returns the name of the piece."""
-        return self._name
-
-    def get_move(self):
-        """ Returns the maximum movement square."""
-        return self._move
+    """ Represents the Horse piece.
+        Class data members:
+            name: The name of the piece.
+            code: The type code of the piece.
+            move: max movement limits."""
+    __slots__ = ()
+    _name = 'Horse'
+    _code = HORSE
+    _move = 3
 
     def get_beast_num(self):
         """ Returns the beast number (Colloquial on diagonal move difference)."""
@@ -100,126 +108,72 @@ class Horse(Pieces):
 
 
 class Cannon(Pieces):
-    """ Represents the Cannon piece."""
-
-    def __init__(self, player):
-        """ Initiates the piece's data accordingly.
-            Data members:
-                name: The name of the piece.
-                move: max movement limits."""
-        super().__init__(player)
-        self._name = 'Cannon'
-        self._move = 10
-
-    def __repr__(self):
-        """ Pretty print the name of the piece."""
-        return self.get_player()[0].upper()+'.'+self._name[:3]
-
-    def get_name(self):
-        """ Returns the name of the piece."""
-        return self._name
-
-    def get_move(self):
-        """ Returns the maximum movement square."""
-        return self._move
+    """ Represents the Cannon piece.
+        Class data members:
+            name: The name of the piece.
+            code: The type code of the piece.
+            move: max movement limits."""
+    __slots__ = ()
+    _name = 'Cannon'
+    _code = CANNON
+    _move = 10
 
 
 class Soldier(Pieces):
-    """ Represents the Soldier piece."""
-
-    def __init__(self, player):
-        """ Initiates the piece's data accordingly.
-            Data members:
-                name: The name of the piece.
-                move: max movement limits."""
-        super().__init__(player)
-        self._name = 'Soldier'
-        self._move = 1
-
-    def __repr__(self):
-        """ Pretty print the name of the piece."""
-        return self.get_player()[0].upper()+'.'+self._name[:3]
-
-    def get_name(self):
-        """ Returns the name of the piece."""
-        return self._name
-
-    def get_move(self):
-        """ Returns the maximum movement square."""
-        return self._move
+    """ Represents the Soldier piece.
+        Class data members:
+            name: The name of the piece.
+            code: The type code of the piece.
+            move: max movement limits."""
+    __slots__ = ()
+    _name = 'Soldier'
+    _code = SOLDIER
+    _move = 1
 
 
 class Guard(Pieces):
-    """ Represents the Guard piece."""
-
-    def __init__(self, player):
-        """ Initiates the piece's data accordingly.
-            Data members:
-                name: The name of the piece.
-                move: max movement limits."""
-        super().__init__(player)
-        self._name = 'Guard'
-        self._move = 1
-
-    def __repr__(self):
-        """ Pretty print the name of the piece."""
-        return self.get_player()[0].upper()+'.'+self._name[:3]
-
-    def get_name(self):
-        """ Returns the name of the piece."""
-        return self._name
-
-    def get_move(self):
-        """ Returns the maximum movement square."""
-        return self._move
+    """ Represents the Guard piece.
+        Class data members:
+            name: The name of the piece.
+            code: The type code of the piece.
+            move: max movement limits."""
+    __slots__ = ()
+    _name = 'Guard'
+    _code = GUARD
+    _move = 1
 
 
 class General(Pieces):
-    """ Represents the General piece."""
+    """ Represents the General piece. Not shared - each General keeps its own check status.
+        Class data members:
+            name: The name of the piece.
+            code: The type code of the piece.
+            move: max movement limits."""
+    __slots__ = ('_check',)
+    _shared = False
+    _name = 'General'
+    _code = GENERAL
+    _move = 1
 
     def __init__(self, player):
         """ Initiates the piece's data accordingly.
-            Data members:
-                name: The name of the piece.
-                move: max movement limits.
-                check: The check status of the piece.
-                chk_count: The number of check have applied to the piece."""
+            Data member:
+                check: The check status of the piece."""
         super().__init__(player)
-        self._name = 'General'
-        self._move = 1
         self._check = False
-        self._chk_count = 0
 
-    def __repr__(self):
-        """ Pretty print the name of the piece."""
-        return self.get_player()[0].upper()+'.'+self._name[:3]
-
-    def get_name(self):
-        """ Returns the name of the piece."""
-        return self._name
-
-    def get_move(self):
-        """ Returns the maximum movement square."""
-        return self._move
+    def __reduce__(self):
+        """ Copies and pickles of a General keep its check status."""
+        return self.__class__, (self._player,), (None, {'_check': self._check})
 
     def get_check_status(self):
         """ Returns whether the piece is in check or not."""
         return self._check
 
-    def get_chk_count(self):
-        """ Returns the amount of checks imposed to the piece."""
-        return self._chk_count
-
     def set_check_status(self, boolean=False):
         """ Sets the check status of the piece."""
         self._check = boolean
 
-    def add_chk_count(self):
-        """ Adds a check count to the piece."""
-        self._chk_count += 1
 
-    def sub_chk_count(self):
-        """ Subtracts a check count to the piece."""
-        self._chk_count -= 1
-        if self._chk_count < 0:
-            self._chk_count = 0  # Negative check count is not possible.
+# Piece classes by type code
+PIECE_CLASSES = (Chariot, Cannon, Horse, Elephant, Soldier, Guard, General)
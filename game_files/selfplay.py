@@ -0,0 +1,198 @@
+# Self-play game generation that is used for regression testing and training data in the game of Janggi
+# Complete games between two move policies are played across a process pool and streamed to disk as JSON lines.
+# Run from the project root with:
+#   python -m game_files.selfplay --games 1000 --red engine:2 --blue random --output games.jsonl [--formations]
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+from game_files import board as bd
+from game_files import engine
+from game_files import game as jg
+
+MAX_PLIES = 300  # A game still unfinished after this many moves is recorded as 'UNFINISHED'.
+
+# Horse and Elephant formations, read from the left pair to the right pair of the back rank.
+# Each is made by swapping the pairs that differ from the set up (see JanggiGame.swap_piece).
+FORMATIONS = ('EHEH', 'HEEH', 'EHHE', 'HEHE')
+_FORMATION_SWAPS = {'EHEH': (), 'HEEH': (('b', 'c'),), 'EHHE': (('g', 'h'),), 'HEHE': (('b', 'c'), ('g', 'h'))}
+_BACK_RANKS = {'red': '1', 'blue': '10'}
+
+
+def formation_swaps(player, formation):
+    """ Returns the swap_piece square pairs that set up a formation of a player, as a list of (square, square) tuples.
+        Made on the player's first turn, before their first move.
+        Parameters:
+            player: The player of the formation, 'red' or 'blue'.
+            formation: One of FORMATIONS.
+        """
+    rank = _BACK_RANKS[player]
+    return [(left + rank, right + rank) for left, right in _FORMATION_SWAPS[formation]]
+
+
+class RandomPolicy:
+    """ Represents a move policy that plays a random legal move."""
+
+    def choose_move(self, game, rng):
+        """ Returns the (from_index, to_index) move of the player in turn, or None to pass the turn.
+            Parameters:
+                game: The JanggiGame position the move is chosen in.
+                rng: The random.Random generator of the game.
+            """
+        moves = game.generate_legal_moves()
+        if not moves:
+            return None
+        return rng.choice(moves)
+
+
+class GreedyCapturePolicy(RandomPolicy):
+    """ Represents a move policy that takes the most valuable piece it can, or plays a random legal move."""
+
+    def choose_move(self, game, rng):
+        """ Returns the (from_index, to_index) move of the player in turn, or None to pass the turn. See RandomPolicy."""
+        moves = game.generate_legal_moves()
+        squares = game.get_game().get_board()
+        captures = [move for move in moves if squares[move[1]] is not None]
+        if not captures:
+            return super().choose_move(game, rng)
+        best_value = max(engine.PIECE_VALUES[squares[move[1]].get_code()] for move in captures)
+        return rng.choice([move for move in captures if engine.PIECE_VALUES[squares[move[1]].get_code()] == best_value])
+
+
+class EnginePolicy:
+    """ Represents a move policy that plays the move of an Engine search to a fixed depth."""
+
+    def __init__(self, depth=2, table_size_mb=4):
+        """ Initializes the policy with a searcher of its own.
+            Parameters:
+                depth: Optional - the fixed search depth.
+                table_size_mb: Optional - the transposition table size of the searcher in megabytes.
+            Data members:
+                depth: The fixed search depth.
+                engine: The Engine searcher."""
+        self._depth = depth
+        self._engine = engine.Engine(table_size_mb)
+
+    def get_depth(self):
+        """ Returns the fixed search depth."""
+        return self._depth
+
+    def choose_move(self, game, rng):
+        """ Returns the (from_index, to_index) move of the player in turn, or None to pass the turn.
+            The search is deterministic - the random generator is not used."""
+        move, score = self._engine.search_index(game, max_depth=self._depth)
+        return move
+
+
+def make_policy(spec):
+    """ Returns a new move policy from its name: 'random', 'greedy', or 'engine:DEPTH' ('engine' searches depth 2).
+        Raises a ValueError for an unknown name.
+        Parameter:
+            spec: The policy name.
+        """
+    name, _, depth = spec.partition(':')
+    if name == 'random' and not depth:
+        return RandomPolicy()
+    if name == 'greedy' and not depth:
+        return GreedyCapturePolicy()
+    if name == 'engine' and (not depth or depth.isdigit()):
+        return EnginePolicy(int(depth or 2))
+    raise ValueError("Unknown policy: " + spec)
+
+
+def play_game(game_number, red='random', blue='random', seed=0, formations=False, max_plies=MAX_PLIES):
+    """ Returns the record of one complete game from the set up as a dictionary:
+            game: The game number.
+            red, blue: The policy names.
+            formations: Each player's Horse and Elephant formation (see FORMATIONS).
+            moves: The moves played as [move_from, move_to] coordinate pairs - a pass is a move onto its own square.
+            result: 'RED_WON', 'BLUE_WON', or 'UNFINISHED' if the game reached max_plies.
+            position: The final position in position notation.
+        The game is reproduced by its number and seed alone, whichever process plays it.
+        Parameters:
+            game_number: The number of the game - its random generator is seeded by it.
+            red: Optional - the policy name of red. See make_policy.
+            blue: Optional - the policy name of blue.
+            seed: Optional - the seed shared by every game of a run.
+            formations: Optional - whether each player starts from a random formation rather than the set up.
+            max_plies: Optional - the number of moves after which the game is stopped.
+        """
+    rng = random.Random(seed * 1000003 + game_number)
+    policies = {'red': make_policy(red), 'blue': make_policy(blue)}
+    chosen = {player: rng.choice(FORMATIONS) if formations else FORMATIONS[0] for player in ['blue', 'red']}
+    game = jg.JanggiGame()
+    game.start_game()
+    moves = []
+
+    while game.get_game_state() == 'UNFINISHED' and len(moves) < max_plies:
+        player = game.get_player_turn()
+        if game.get_move_counter()[player] == 0:  # The formation is set up on the player's first turn.
+            for first_square, second_square in formation_swaps(player, chosen[player]):
+                game.swap_piece(first_square, second_square)
+
+        move = policies[player].choose_move(game, rng)
+        if move is None:  # No legal move and not checkmated - the turn is passed.
+            general_index = game.get_game().get_general_index(player)
+            move = (general_index, general_index)
+        move_from, move_to = bd.index_to_square(move[0]), bd.index_to_square(move[1])
+        if not game.make_move(move_from, move_to):
+            raise RuntimeError("The " + player + " policy chose an illegal move: " + move_from + move_to)
+        moves.append([move_from, move_to])
+
+    return {'game': game_number, 'red': red, 'blue': blue, 'formations': chosen, 'moves': moves,
+            'result': game.get_game_state(), 'position': game.get_position()}
+
+
+def play_games(count, red='random', blue='random', workers=None, seed=0, formations=False, max_plies=MAX_PLIES):
+    """ Yields the records of a number of games (see play_game) as they finish, played across a process pool.
+        Parameters:
+            count: The number of games.
+            workers: Optional - the number of worker processes. Defaults to the number of CPUs.
+            The others are passed on to play_game.
+        """
+    with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(play_game, game_number, red, blue, seed, formations, max_plies)
+                   for game_number in range(count)]
+        for each_future in concurrent.futures.as_completed(futures):
+            yield each_future.result()
+
+
+def write_games(path, records):
+    """ Writes game records to a file as they arrive, one JSON object per line, and returns the tally of the results.
+        Parameters:
+            path: The file path - appended to, so that an interrupted run keeps the games it finished.
+            records: An iterable of game records, such as play_games.
+        """
+    tally = {'RED_WON': 0, 'BLUE_WON': 0, 'UNFINISHED': 0}
+    with open(path, 'a') as output:
+        for each_record in records:
+            output.write(json.dumps(each_record) + '\n')
+            output.flush()
+            tally[each_record['result']] += 1
+    return tally
+
+
+def main(argv=None):
+    """ Plays the games given on the command line, writes them to the output file and prints the tally."""
+    parser = argparse.ArgumentParser(description='Janggi self-play game generation.')
+    parser.add_argument('--games', type=int, default=100, help='number of games played')
+    parser.add_argument('--red', default='random', help="red's policy: random, greedy or engine:DEPTH")
+    parser.add_argument('--blue', default='random', help="blue's policy: random, greedy or engine:DEPTH")
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to the CPU count')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--formations', action='store_true', help='start from random Horse and Elephant formations')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES, help='moves before a game is stopped')
+    parser.add_argument('--output', default='selfplay.jsonl', help='JSON lines file the games are appended to')
+    args = parser.parse_args(argv)
+
+    for spec in (args.red, args.blue):
+        make_policy(spec)  # Fails before any process is started.
+    tally = write_games(args.output, play_games(args.games, args.red, args.blue, args.workers, args.seed,
+                                               args.formations, args.max_plies))
+    print('RED_WON: %(RED_WON)d | BLUE_WON: %(BLUE_WON)d | UNFINISHED: %(UNFINISHED)d' % tally)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,189 @@
+# Transposition table that is used by the search and analysis code of the game of Janggi
+# A fixed-size array of 64-bit words keyed by the board's Zobrist hash (see Board.get_hash).
+# Each bucket holds two entries: a depth-preferred entry and an always-replace entry.
+# Each entry is two words - the key XOR the data, then the data - so a torn or stale write never matches.
+# The words may be laid over shared memory, so that searches in several processes share one table without locks.
+from multiprocessing import shared_memory
+
+EXACT = 0  # The score is exact.
+LOWER = 1  # The score is a lower bound - the search failed high.
+UPPER = 2  # The score is an upper bound - the search failed low.
+
+ENTRY_WORDS = 2
+BUCKET_ENTRIES = 2
+BUCKET_WORDS = ENTRY_WORDS * BUCKET_ENTRIES
+BUCKET_BYTES = BUCKET_WORDS * 8
+
+# Data word layout, lowest bits first.
+_MOVE_BITS = 14   # from_index * 90 + to_index + 1 - zero is no move.
+_DEPTH_SHIFT = 14
+_BOUND_SHIFT = 22
+_AGE_SHIFT = 24
+_SCORE_SHIFT = 32
+_SCORE_OFFSET = 1 << 31
+_WORD_MASK = (1 << 64) - 1
+
+
+def _bucket_count(size_bytes):
+    """ Returns the largest power of two of buckets that fits in a number of bytes - at least one."""
+    bucket_count = 1
+    while bucket_count * 2 * BUCKET_BYTES <= size_bytes:
+        bucket_count *= 2
+    return bucket_count
+
+
+def _encode_move(move):
+    """ Returns the 14-bit code of a (from_index, to_index) move, or 0 for no move."""
+    if move is None:
+        return 0
+    return move[0] * 90 + move[1] + 1
+
+
+def _decode_move(code):
+    """ Returns the (from_index, to_index) move of a 14-bit code, or None for no move."""
+    if code == 0:
+        return None
+    return divmod(code - 1, 90)
+
+
+class TranspositionTable:
+    """ Represents a bounded store of search results keyed by position hash.
+        Memory use is fixed when the table is made and never grows, however many positions are stored."""
+
+    def __init__(self, size_mb=16, buffer=None):
+        """ Initializes an empty table.
+            Parameters:
+                size_mb: Optional - the table size in megabytes. Rounded down to a power of two of buckets.
+                buffer: Optional - a writable buffer the table is laid over instead of memory of its own,
+                        such as shared memory. Its entries are kept. The size is taken from the buffer.
+            Data members:
+                words: The table as a memoryview of unsigned 64-bit words.
+                bucket_mask: The number of buckets minus one - a hash is masked down to its bucket.
+                age: The search generation. Entries of older generations are replaced first."""
+        if buffer is None:
+            bucket_count = _bucket_count(size_mb * 1024 * 1024)
+            buffer = bytearray(bucket_count * BUCKET_BYTES)
+        else:
+            bucket_count = _bucket_count(memoryview(buffer).nbytes)
+        self._words = memoryview(buffer)[:bucket_count * BUCKET_BYTES].cast('Q')
+        self._bucket_mask = bucket_count - 1
+        self._age = 0
+
+    def clear(self):
+        """ Empties every entry and restarts the search generation."""
+        self._words.cast('B')[:] = bytes(self._words.nbytes)
+        self._age = 0
+
+    def new_search(self):
+        """ Starts a new search generation. Called once per search, before the root is searched."""
+        self._age = (self._age + 1) & 0xFF
+
+    def get_age(self):
+        """ Returns the current search generation."""
+        return self._age
+
+    def set_age(self, age):
+        """ Sets the search generation - tables over the same shared memory have to agree on it."""
+        self._age = age & 0xFF
+
+    def get_bucket_count(self):
+        """ Returns the number of buckets of the table."""
+        return self._bucket_mask + 1
+
+    def get_size_bytes(self):
+        """ Returns the memory size of the table in bytes."""
+        return self._words.nbytes
+
+    def probe(self, key):
+        """ Returns the stored (move, score, depth, bound) of a position, or None if it is not stored.
+            Parameter:
+                key: The 64-bit Zobrist hash of the position.
+            """
+        words = self._words
+        base = (key & self._bucket_mask) * BUCKET_WORDS
+        for entry in range(base, base + BUCKET_WORDS, ENTRY_WORDS):
+            data = words[entry + 1]
+            if data and words[entry] ^ data == key:
+                return (_decode_move(data & ((1 << _MOVE_BITS) - 1)),
+                        (data >> _SCORE_SHIFT) - _SCORE_OFFSET,
+                        (data >> _DEPTH_SHIFT) & 0xFF,
+                        (data >> _BOUND_SHIFT) & 0x3)
+        return None
+
+    def store(self, key, move, score, depth, bound):
+        """ Stores a search result. The depth-preferred entry of the bucket is taken if it holds the same position,
+            a shallower result or a result of an older search - the entry it held moves to the always-replace entry.
+            Otherwise the always-replace entry is overwritten.
+            Parameters:
+                key: The 64-bit Zobrist hash of the position.
+                move: The best (from_index, to_index) move found, or None.
+                score: The score of the position for the player in turn.
+                depth: The remaining depth searched, 0 to 255.
+                bound: EXACT, LOWER or UPPER.
+            """
+        words = self._words
+        base = (key & self._bucket_mask) * BUCKET_WORDS
+        data = (_encode_move(move)
+                | min(max(depth, 0), 0xFF) << _DEPTH_SHIFT
+                | bound << _BOUND_SHIFT
+                | self._age << _AGE_SHIFT
+                | (score + _SCORE_OFFSET) << _SCORE_SHIFT) & _WORD_MASK
+
+        stored = words[base + 1]
+        same_position = stored and words[base] ^ stored == key
+        if (not stored or same_position
+                or (stored >> _AGE_SHIFT) & 0xFF != self._age
+                or depth >= (stored >> _DEPTH_SHIFT) & 0xFF):
+            if same_position and move is None:  # Keep the known best move of the position.
+                data |= stored & ((1 << _MOVE_BITS) - 1)
+            elif stored and not same_position:  # The displaced entry moves down to the always-replace entry.
+                words[base + ENTRY_WORDS] = words[base]
+                words[base + ENTRY_WORDS + 1] = stored
+            entry = base
+        else:
+            entry = base + ENTRY_WORDS
+        words[entry] = key ^ data
+        words[entry + 1] = data
+
+    def hashfull(self):
+        """ Returns the per mille of the first thousand buckets' entries used by the current search generation."""
+        words = self._words
+        sample = min(1000, self._bucket_mask + 1)
+        used = 0
+        for entry in range(0, sample * BUCKET_WORDS, ENTRY_WORDS):
+            data = words[entry + 1]
+            if data and (data >> _AGE_SHIFT) & 0xFF == self._age:
+                used += 1
+        return used * 1000 // (sample * BUCKET_ENTRIES)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """ Represents a transposition table in named shared memory. Made once, then attached to by name
+        in other processes, so that every process reads and writes the same entries."""
+
+    def __init__(self, size_mb=16, name=None):
+        """ Initializes a table in new shared memory, or attaches to an existing one.
+            Parameters:
+                size_mb: Optional - the table size in megabytes when new shared memory is made.
+                name: Optional - the name of the shared memory to attach to. Defaults to None to make a new one.
+            Data members:
+                memory: The SharedMemory block the table words are laid over."""
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True,
+                                                      size=_bucket_count(size_mb * 1024 * 1024) * BUCKET_BYTES)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        super().__init__(buffer=self._memory.buf)
+
+    def get_name(self):
+        """ Returns the name other processes attach to the table by."""
+        return self._memory.name
+
+    def close(self):
+        """ Detaches this process from the shared memory. The table is unusable afterwards."""
+        self._words.release()
+        self._memory.close()
+
+    def unlink(self):
+        """ Frees the shared memory once every process has closed it. Called once, by the process that made it."""
+        self._memory.unlink()
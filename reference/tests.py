@@ -1,5 +1,24 @@
+import json
+import os
+import random
+import tempfile
 import unittest
 from game_files.game import JanggiGame
+from game_files import game as jg
+from game_files import board as bd
+from game_files import geometry as geo
+from game_files import pieces as pce
+from game_files import benchmark
+from game_files import transposition as tt
+from game_files import engine
+from game_files import evaluation as ev
+from game_files import ordering as mo
+from game_files import parallel
+from game_files import selfplay
+try:
+    from game_files import batch  # Needs numpy.
+except ImportError:
+    batch = None
 #from JanggiGame import JanggiGame
 
 class TestJanggiGame(unittest.TestCase):
@@ -1699,3 +1718,730 @@ class TestJanggiGame(unittest.TestCase):
         except:
             self.fail("Game state should be RED_WON when the BLUE general is checkmated")
 
+
+class TestBoard(unittest.TestCase):
+    def test_square_coordinates_map_to_flat_indices(self):
+        """BOARD: coordinates translate to the flat square index and back"""
+        self.assertEqual(bd.square_to_index('a1'), 0)
+        self.assertEqual(bd.square_to_index('i1'), 8)
+        self.assertEqual(bd.square_to_index('a2'), 9)
+        self.assertEqual(bd.square_to_index('i10'), 89)
+        self.assertIsNone(bd.square_to_index('j1'))
+        self.assertIsNone(bd.square_to_index('a11'))
+        self.assertIsNone(bd.square_to_index(['a1']))
+        for index in range(bd.SQUARE_COUNT):
+            self.assertEqual(bd.square_to_index(bd.index_to_square(index)), index)
+
+    def test_coordinate_and_index_access_agree(self):
+        """BOARD: the coordinate API is an adapter over the square index API"""
+        board = bd.Board()
+        board.setup_game()
+        self.assertIs(board.get_square('e9'), board.get_index(bd.square_to_index('e9')))
+        history = board.move_square('a7', 'a6')
+        self.assertIsNone(board.get_index(bd.square_to_index('a7')))
+        self.assertEqual(board.get_index(bd.square_to_index('a6')).get_name(), 'Soldier')
+        board.undo_move_sq(*history)
+        self.assertEqual(board.get_square('a7').get_name(), 'Soldier')
+        self.assertIsNone(board.get_square('a6'))
+
+    def test_piece_index_follows_board_changes(self):
+        """BOARD: the piece-location index is kept up to date without rescanning the board"""
+        board = bd.Board()
+        board.setup_game()
+        self.assertEqual(len(board.get_pieces('red')), 16)
+        self.assertEqual(len(board.get_pieces('blue')), 16)
+        self.assertEqual(board.get_general_index('blue'), bd.square_to_index('e9'))
+
+        history = board.move_square('a7', 'a4')  # capture a red soldier
+        self.assertEqual(len(board.get_pieces('red')), 15)
+        self.assertIn(bd.square_to_index('a4'), board.get_pieces('blue'))
+        self.assertNotIn(bd.square_to_index('a7'), board.get_pieces('blue'))
+        board.undo_move_sq(*history)
+        self.assertEqual(len(board.get_pieces('red')), 16)
+        self.assertIn(bd.square_to_index('a4'), board.get_pieces('red'))
+
+        board.move_square('e9', 'e8')
+        self.assertEqual(board.get_general_index('blue'), bd.square_to_index('e8'))
+        board.set_square('e8')
+        self.assertIsNone(board.get_general_index('blue'))
+
+        copy = bd.Board()
+        copy.load_board(board.get_board())
+        self.assertEqual(copy.get_pieces('red'), board.get_pieces('red'))
+        self.assertEqual(copy.get_pieces('blue'), board.get_pieces('blue'))
+
+    def test_move_stack_takes_back_any_number_of_moves(self):
+        """BOARD: moves pushed on the move stack are popped back in order, check status included"""
+        g = JanggiGame()
+        g.load_position('4K4/3G5/9/9/9/4h4/9/2R6/4k4/5g2S red 40 40')
+        board = g.get_game()
+        start = board.get_placement()
+        pieces = {player: dict(board.get_pieces(player)) for player in ['red', 'blue']}
+
+        moves = [('c8', 'e8'), ('e9', 'd9'), ('e8', 'f8'), ('d9', 'd8'), ('f8', 'f10')]  # a check, a capture
+        for move_from, move_to in moves:
+            board.push_move(bd.square_to_index(move_from), bd.square_to_index(move_to))
+        self.assertEqual(len(board.get_history()), len(moves))
+        g.check_moves_in_check()
+        self.assertIs(g.is_in_check('red'), False)
+
+        board.push_move(bd.square_to_index('e6'), bd.square_to_index('g2'))  # a check by the horse
+        g.check_moves_in_check()
+        self.assertIs(g.is_in_check('red'), True)
+        for each_move in range(len(moves) + 1):
+            board.pop_move()
+
+        self.assertEqual(board.get_placement(), start)
+        self.assertEqual(board.get_history(), [])
+        self.assertIs(g.is_in_check('red'), False)
+        for player in ['red', 'blue']:
+            self.assertEqual(board.get_pieces(player), pieces[player])
+
+    def test_position_hash_follows_moves_and_transpositions(self):
+        """BOARD: the incremental position hash is restored on take back and equal for transposed move orders"""
+        g = JanggiGame()
+        start = g.position_hash()
+        self.assertEqual(start, g.get_game().compute_hash())
+
+        for move_from, move_to in [('c7', 'c6'), ('c4', 'c5'), ('e7', 'e6'), ('e4', 'e5')]:
+            g.make_move(move_from, move_to)
+            self.assertEqual(g.position_hash(), g.get_game().compute_hash())
+        transposed = JanggiGame()
+        for move_from, move_to in [('e7', 'e6'), ('e4', 'e5'), ('c7', 'c6'), ('c4', 'c5')]:
+            transposed.make_move(move_from, move_to)
+        self.assertEqual(g.position_hash(), transposed.position_hash())
+
+        g.push_move(bd.square_to_index('c6'), bd.square_to_index('c5'))  # a capture
+        self.assertNotEqual(g.position_hash(), transposed.position_hash())
+        g.pop_move()
+        self.assertEqual(g.position_hash(), transposed.position_hash())
+
+        # The same placement with the other player in turn is another position.
+        other_side = JanggiGame()
+        other_side.load_position(g.get_position().replace(' blue ', ' red '))
+        self.assertNotEqual(other_side.position_hash(), g.position_hash())
+
+
+    def test_geometry_pair_tables(self):
+        """BOARD: the square pair tables hold the move data"""
+        def pair(from_square, to_square):
+            return geo.pair_index(bd.square_to_index(from_square), bd.square_to_index(to_square))
+
+        self.assertEqual(geo.MOVE_DATA['red'][pair('c4', 'b6')], (1, 2, 'forward', 'right', 'diagonal'))
+        self.assertEqual(geo.MOVE_DATA['blue'][pair('c4', 'b6')], (1, 2, 'backward', 'left', 'diagonal'))
+        self.assertEqual(geo.MOVE_DATA['blue'][pair('a7', 'a6')], (0, 1, 'forward', 'stay', 'normal'))
+
+    def test_geometry_beast_leg_tables(self):
+        """BOARD: the horse and elephant tables hold the leg squares of every move"""
+        def index(square):
+            return bd.square_to_index(square)
+
+        self.assertEqual(geo.HORSE_LEGS[geo.pair_index(index('b1'), index('c3'))], (index('b2'),))
+        self.assertEqual(geo.ELEPHANT_LEGS[geo.pair_index(index('c1'), index('e4'))], (index('c2'), index('d3')))
+        self.assertIsNone(geo.HORSE_LEGS[geo.pair_index(index('b1'), index('b3'))])
+        self.assertIn((index('b1'), (index('b2'),)), geo.HORSE_ORIGINS[index('c3')])
+        self.assertEqual(len(geo.HORSE_MOVES[index('e5')]), 8)
+        self.assertEqual(len(geo.ELEPHANT_MOVES[index('a1')]), 2)
+
+    def test_slide_line_occupancy_and_lookups(self):
+        """BOARD: the slide line occupancy follows every change and indexes the chariot and cannon lookups"""
+        def index(square):
+            return bd.square_to_index(square)
+
+        board = bd.Board()
+        board.setup_game()
+        rank = geo.SQUARE_RANK_LINES[index('a1')]
+        self.assertEqual(board.get_line_occupancy(rank), 0b111101111)  # Red first rank: r h e g _ g e h r
+        line, from_position, to_position = geo.PAIR_SLIDE_LINES[geo.pair_index(index('d1'), index('f3'))]
+        self.assertEqual(geo.SLIDE_LINES[line], (index('d1'), index('e2'), index('f3')))
+        self.assertIsNone(geo.PAIR_SLIDE_LINES[geo.pair_index(index('d2'), index('e1'))])
+
+        file_line = geo.SQUARE_FILE_LINES[index('b3')]
+        occupancy = board.get_line_occupancy(file_line)  # b1 horse, b3 cannon, b8 cannon, b10 horse
+        self.assertEqual(occupancy, 0b1010000101)
+        position = geo.SQUARE_ROWS[index('b3')]
+        self.assertEqual(geo.CHARIOT_REACH[file_line][position][occupancy], 0b0011111011)  # b1, b2, b4 - b8
+        self.assertEqual(geo.CANNON_REACH[file_line][position][occupancy], 0b1100000000)  # b9, b10 past b8
+
+        board.push_move(index('a1'), index('a2'))
+        board.push_move(index('i10'), index('i8'))
+        self.assertEqual(board.get_line_occupancy(rank), 0b111101110)
+        board.pop_move()
+        board.pop_move()
+        self.assertEqual(board.get_line_occupancy(rank), 0b111101111)
+        copy = bd.Board()
+        copy.load_board(board.get_board())
+        self.assertEqual(copy.get_occupancy(), board.get_occupancy())
+
+    def test_pieces_are_shared_flyweights(self):
+        """PIECES: one shared slotted piece per player and type, except the stateful general"""
+        g = JanggiGame()
+        g.start_game()
+        board = g.get_game()
+        self.assertIs(board.get_square('a1'), board.get_square('i1'))
+        self.assertIs(board.get_square('a1'), pce.Chariot('red'))
+        self.assertIsNot(board.get_square('a1'), board.get_square('a10'))
+        self.assertIsNot(pce.General('red'), pce.General('red'))
+        with self.assertRaises(AttributeError):
+            pce.Soldier('blue').extra = 1  # No per-instance dictionary.
+
+        for code, piece_class in enumerate(pce.PIECE_CLASSES):
+            self.assertEqual(piece_class('red').get_code(), code)
+            self.assertEqual(piece_class('red').get_name(), pce.PIECE_NAMES[code])
+            self.assertEqual(jg.MOVEMENT_HANDLERS[code].__name__, pce.PIECE_NAMES[code].lower() + '_movement')
+
+
+class TestBitboardBackend(unittest.TestCase):
+    def test_bitboard_backend_agrees_with_array_backend(self):
+        """BITBOARD: every from/to pair validates and every check is detected the same way on both backends"""
+        rng = random.Random(3)
+        array_game = JanggiGame()
+        bitboard_game = JanggiGame('bitboard')
+        array_game.start_game()
+        bitboard_game.start_game()
+        for ply in range(30):
+            valid_moves = []
+            for from_index in range(bd.SQUARE_COUNT):
+                for to_index in range(bd.SQUARE_COUNT):
+                    array_valid = array_game.index_to_board_selector(from_index, to_index)
+                    self.assertIs(bitboard_game.index_to_board_selector(from_index, to_index), array_valid)
+                    if array_valid and from_index != to_index:
+                        valid_moves.append((bd.index_to_square(from_index), bd.index_to_square(to_index)))
+            for player in ['red', 'blue']:
+                self.assertIs(bitboard_game.is_in_check(player), array_game.is_in_check(player))
+
+            rng.shuffle(valid_moves)
+            for move_from, move_to in valid_moves:
+                moved = array_game.make_move(move_from, move_to)
+                self.assertIs(bitboard_game.make_move(move_from, move_to), moved)
+                if moved:
+                    break
+
+    def test_cannon_diagonal_follows_palace_lines(self):
+        """CANNON: a cannon may only jump diagonally along a palace line"""
+        for backend in ['array', 'bitboard']:
+            g = JanggiGame(backend)
+            g.start_game()
+            board = g.get_game()
+            board.load_board([None] * bd.SQUARE_COUNT)
+            board.set_square('e2', pce.General('red'))
+            board.set_square('e8', pce.General('blue'))
+            board.set_square('d3', pce.Cannon('red'))
+            board.set_square('e4', pce.Soldier('blue'))
+            board.set_square('f10', pce.Cannon('blue'))
+            board.set_square('d8', pce.Guard('red'))
+            g.set_player_turn('blue')
+            g.get_move_counter()['blue'] = 1
+            self.assertIs(g.piece_to_board_selector('f10', 'd8'), False)  # no screen on the palace center
+            board.set_square('e9', pce.Horse('blue'))
+            self.assertIs(g.piece_to_board_selector('f10', 'd8'), True)
+            g.set_player_turn('red')
+            g.get_move_counter()['red'] = 1
+            self.assertIs(g.piece_to_board_selector('d3', 'f5'), False)  # leaves the palace diagonally
+
+    def test_outward_attack_lookup_agrees_with_move_validators(self):
+        """CHECK: attacks looked up outward from a square match the attacker's validated moves onto it"""
+        rng = random.Random(10)
+        g = JanggiGame()
+        g.start_game()
+        board = g.get_game()
+        for ply in range(40):
+            position = (g.get_player_turn(), g.position_hash())
+            for attacker in ['red', 'blue']:
+                defender_squares = list(board.get_pieces(g.get_opponent_turn(attacker)))
+                attacked = {target: g.is_square_attacked(target, attacker) for target in defender_squares}
+                self.assertEqual((g.get_player_turn(), g.position_hash()), position)  # Nothing was moved.
+
+                g.set_player_turn(attacker)
+                general_index = board.get_general_index(attacker)
+                for target in defender_squares:
+                    # The general's own moves are trial moves, so its attacks are its palace steps.
+                    validated = target in geo.PALACE_STEPS[general_index] or any(
+                        g.index_to_board_selector(origin, target) for origin in list(board.get_pieces(attacker))
+                        if origin != general_index)
+                    self.assertIs(attacked[target], validated)
+                g.set_player_turn(position[0])
+            g.make_move(*rng.choice(g.legal_moves()))
+
+
+class TestLegalMoves(unittest.TestCase):
+    def test_legal_moves_from_the_initial_setup(self):
+        """MOVES: blue's opening moves are listed and the cannons cannot move on the first turn"""
+        g = JanggiGame()
+        moves = g.legal_moves()
+        self.assertEqual(len(moves), len(set(moves)))
+        self.assertIn(('c7', 'c6'), moves)
+        self.assertIn(('c10', 'd8'), moves)
+        self.assertNotIn(('c7', 'c8'), moves)  # soldiers do not move backwards
+        self.assertEqual(g.legal_moves_from('b8'), [])  # cannon on the first turn
+        self.assertEqual(g.legal_moves_from('a4'), [])  # not blue's piece
+        self.assertEqual(sorted(g.legal_moves_from('a10')), ['a8', 'a9'])
+
+    def test_legal_moves_match_make_move(self):
+        """MOVES: the generated moves are exactly the moves make_move accepts"""
+        rng = random.Random(7)
+        g = JanggiGame()
+        for ply in range(25):
+            moves = set(g.legal_moves())
+            for from_index in range(bd.SQUARE_COUNT):
+                for to_index in range(bd.SQUARE_COUNT):
+                    move = (bd.index_to_square(from_index), bd.index_to_square(to_index))
+                    if from_index != to_index and g.index_to_board_selector(from_index, to_index):
+                        g.get_game().push_move(from_index, to_index)
+                        leaves_check = g.is_general_attacked(g.get_player_turn())
+                        g.get_game().pop_move()
+                        self.assertEqual(move in moves, not leaves_check, move)
+                    else:
+                        self.assertNotIn(move, moves)
+            self.assertTrue(g.make_move(*rng.choice(sorted(moves))))
+
+    def test_legal_moves_escape_check(self):
+        """MOVES: a general in check is only offered moves that lift the check"""
+        g = JanggiGame()
+        g.start_game()
+        board = g.get_game()
+        board.load_board([None] * bd.SQUARE_COUNT)
+        board.set_square('e2', pce.General('red'))
+        board.set_square('e9', pce.General('blue'))
+        board.set_square('e5', pce.Chariot('red'))
+        board.set_square('a5', pce.Chariot('blue'))
+        g.get_move_counter().update({'red': 1, 'blue': 1})
+        self.assertEqual(sorted(g.legal_moves()), [('a5', 'e5'), ('e9', 'd10'), ('e9', 'd8'), ('e9', 'd9'),
+                                                   ('e9', 'f10'), ('e9', 'f8'), ('e9', 'f9')])
+
+    def test_is_legal_matches_generated_moves_without_changing_the_game(self):
+        """MOVES: is_legal accepts exactly the generated moves and leaves the game untouched"""
+        for backend in ['array', 'bitboard']:
+            rng = random.Random(11)
+            g = JanggiGame(backend)
+            board = g.get_game()
+            for ply in range(20):
+                moves = set(g.legal_moves())
+                snapshot = (g.get_player_turn(), g.position_hash(), len(board.get_history()),
+                            g.is_in_check('red'), g.is_in_check('blue'))
+                pairs = [(from_square, to_square) for from_square in bd.SQUARE_NAMES for to_square in bd.SQUARE_NAMES
+                         if from_square != to_square]
+                self.assertEqual(g.are_legal(pairs), [pair in moves for pair in pairs])
+                self.assertEqual((g.get_player_turn(), g.position_hash(), len(board.get_history()),
+                                  g.is_in_check('red'), g.is_in_check('blue')), snapshot)
+                g.make_move(*rng.choice(sorted(moves)))
+
+    def test_is_legal_passing(self):
+        """MOVES: passing is legal unless in check"""
+        g = JanggiGame()
+        g.load_position('9/4K4/9/9/9/9/9/9/4k4/9 blue 1 1')
+        self.assertIs(g.is_legal('e9', 'e9'), True)
+        g.load_position('9/4K4/9/9/4R4/9/9/9/9/3gk4 blue 1 1')
+        self.assertIs(g.is_legal('e9', 'e9'), False)  # nothing on e9
+        self.assertIs(g.is_legal('e10', 'e10'), False)  # in check
+        self.assertIs(g.is_legal('d10', 'd10'), False)
+        self.assertIs(g.is_legal('z1', 'a1'), False)
+
+    def test_evasions_are_tried_cheapest_first(self):
+        """MOVES: the evasions of a check are general moves, then captures of the checker, then blocks"""
+        g = JanggiGame()
+        g.load_position('r2K5/9/2H6/9/R8/9/9/9/4k4/9 red 10 10')
+        evasions = [(bd.index_to_square(from_index), bd.index_to_square(to_index))
+                    for from_index, to_index in g.generate_evasions()]
+        self.assertEqual(evasions, [('d1', 'd2'), ('d1', 'e2'), ('a5', 'a1'), ('c3', 'b1')])
+        self.assertEqual(sorted(evasions), sorted(g.legal_moves()))
+        self.assertIs(g.is_checkmated(), False)
+        self.assertIs(g.make_move('d1', 'd1'), False)  # No passing while in check.
+
+    def test_pinned_pieces_and_cannon_screens(self):
+        """MOVES: pieces pinned to the general, by a chariot or as a cannon's screens, keep to the line"""
+        g = JanggiGame()
+        g.load_position('9/cSS1K4/9/4H4/9/9/9/4r4/3k5/9 red 10 10')
+        pinned, screens = g.find_pins('red')
+        self.assertEqual(sorted(bd.index_to_square(index) for index in pinned), ['b2', 'c2', 'e4'])
+        self.assertEqual(sorted(bd.index_to_square(index) for index in screens), ['a2', 'b2', 'c2', 'd2'])
+        self.assertEqual(g.legal_moves_from('e4'), [])
+        self.assertEqual(g.legal_moves_from('c2'), ['d2'])
+        self.assertEqual(g.legal_moves_from('b2'), ['a2'])
+
+    def test_capturing_a_cannon_screens_the_cannon_behind(self):
+        """MOVES: a piece taking a cannon in front of another cannon becomes its screen and cannot take it"""
+        for backend in ['array', 'bitboard']:
+            g = JanggiGame(backend)
+            g.load_position('9/4K4/9/9/4C4/9/r3C4/9/4k4/9 blue 5 5')
+            self.assertNotIn(('a7', 'e7'), g.legal_moves())
+            self.assertFalse(g.is_legal('a7', 'e7'))
+            self.assertEqual(g.perft(1), 20)
+
+    def test_generated_moves_match_is_legal_on_random_placements(self):
+        """MOVES: on random cannon heavy placements, the generated moves are exactly the pairs is_legal accepts"""
+        rng = random.Random(12)
+        red_palace = sorted(index for index in geo.PALACE_INDICES if index < bd.SQUARE_COUNT // 2)
+        blue_palace = sorted(index for index in geo.PALACE_INDICES if index > bd.SQUARE_COUNT // 2)
+        tested = 0
+        while tested < 150:
+            squares = [None] * bd.SQUARE_COUNT
+            squares[rng.choice(red_palace)] = pce.General('red')
+            squares[rng.choice(blue_palace)] = pce.General('blue')
+            for each_piece in range(rng.randint(3, 16)):
+                index = rng.randrange(bd.SQUARE_COUNT)
+                if squares[index] is None:
+                    squares[index] = bd.LETTER_PIECES[rng.choice('ccrhesg')](rng.choice(['red', 'blue']))
+            g = JanggiGame(rng.choice(['array', 'bitboard']))
+            g.get_game().load_board(squares)
+            try:
+                g.load_position(g.get_game().get_placement() + ' ' + rng.choice(['red', 'blue']) + ' 5 5')
+            except ValueError:
+                continue  # The player who just moved is in check.
+            tested += 1
+            pieces = list(g.get_game().get_pieces(g.get_player_turn()))
+            expected = {(from_index, to_index) for from_index in pieces for to_index in range(bd.SQUARE_COUNT)
+                        if from_index != to_index and g.is_legal_index(from_index, to_index)}
+            self.assertEqual(set(g.generate_legal_moves()), expected, g.get_position())
+
+    def test_attack_map_queries(self):
+        """MOVES: the attack map counts the attackers of every square and is cached until the position changes"""
+        g = JanggiGame()
+        g.load_position('9/cSS1K4/9/4H4/9/9/9/4r4/3k5/9 red 10 10')
+        self.assertEqual(g.attackers_of('c2', 'blue'), ['a2'])  # Over the b2 screen.
+        self.assertEqual(g.attackers_of('e2', 'blue'), [])
+        attacked = g.attacked_squares('blue')
+        self.assertEqual(attacked['e4'], 1)
+        self.assertEqual(attacked['e9'], 2)  # The chariot and the general.
+        self.assertNotIn('b2', attacked)
+        self.assertIs(g.attack_map('blue'), g.attack_map('blue'))
+
+        for index in range(bd.SQUARE_COUNT):
+            self.assertEqual(bool(g.attack_map('red')[index]), g.is_square_attacked(index, 'red'))
+        cached = g.attack_map('blue')
+        self.assertIs(g.make_move('e4', 'c5'), False)  # The horse is pinned.
+        self.assertIs(g.attack_map('blue'), cached)
+        self.assertIs(g.make_move('c2', 'd2'), True)
+        self.assertIsNot(g.attack_map('blue'), cached)
+        self.assertEqual(g.attackers_of('d2', 'blue'), ['a2'])
+
+    def test_checkmate_ends_the_game_on_the_move(self):
+        """MOVES: the game is won on the move that leaves the opponent without a legal evasion"""
+        g = JanggiGame()
+        g.load_position('3K5/r8/9/9/9/9/9/9/4k4/1r7 blue 10 10')
+        self.assertIs(g.make_move('b10', 'b1'), True)
+        self.assertIs(g.is_checkmated(), True)
+        self.assertEqual(g.get_game_state(), 'BLUE_WON')
+        self.assertEqual(g.generate_legal_moves(), [])
+
+        g.load_position(g.get_position())
+        self.assertEqual(g.get_game_state(), 'BLUE_WON')
+
+
+class TestPerft(unittest.TestCase):
+    def test_perft_matches_reference_counts(self):
+        """PERFT: the stored positions reproduce their reference node counts"""
+        for name, depth, nodes, reference, seconds in benchmark.run_benchmark(max_depth=2):
+            self.assertEqual(nodes, reference, name + ' depth ' + str(depth))
+
+    def test_divide_splits_the_perft_count(self):
+        """PERFT: divide reports one count per legal move that adds up to the perft count"""
+        g = JanggiGame()
+        g.load_position(benchmark.BENCHMARK_POSITIONS['endgame_check'][0])
+        counts = g.divide(2)
+        self.assertEqual(sorted(counts), sorted(g.legal_moves()))
+        self.assertEqual(sum(counts.values()), g.perft(2))
+        self.assertEqual(g.get_position(), benchmark.BENCHMARK_POSITIONS['endgame_check'][0])  # Nothing moved
+
+    def test_load_position_round_trip_and_errors(self):
+        """PERFT: positions are loaded and written back in position notation"""
+        g = JanggiGame()
+        initial = g.get_position()
+        self.assertEqual(initial, benchmark.BENCHMARK_POSITIONS['initial'][0])
+        g.make_move('c7', 'c6')
+        other = JanggiGame()
+        other.load_position(g.get_position())
+        self.assertEqual(other.get_position(), g.get_position())
+        self.assertEqual(other.get_player_turn(), 'red')
+        with self.assertRaises(ValueError):
+            other.load_position('9/9/9 blue 0 0')
+        with self.assertRaises(ValueError):
+            other.load_position('4K4/9/9/9/9/9/9/9/9/9 blue 0 0')  # no blue general
+        with self.assertRaises(ValueError):
+            other.load_position('4K4/9/9/9/9/9/9/9/4k4/4R4 red 1 1')  # blue in check, red to move
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_entries_are_stored_and_probed_by_hash(self):
+        """TRANSPOSITION: a stored result is probed back by its position hash and its size never grows"""
+        table = tt.TranspositionTable(0.25)
+        size = table.get_size_bytes()
+        self.assertLessEqual(size, 256 * 1024)
+
+        g = JanggiGame()
+        key = g.position_hash()
+        self.assertIsNone(table.probe(key))
+        table.store(key, (bd.square_to_index('c7'), bd.square_to_index('c6')), -125, 3, tt.LOWER)
+        self.assertEqual(table.probe(key), ((56, 47), -125, 3, tt.LOWER))
+
+        rng = random.Random(8)
+        for each_entry in range(20000):
+            table.store(rng.getrandbits(64), None, 0, 1, tt.EXACT)
+        self.assertEqual(table.get_size_bytes(), size)
+        self.assertGreater(table.hashfull(), 700)
+
+    def test_replacement_prefers_depth_then_age(self):
+        """TRANSPOSITION: deep results are kept over shallow ones until a newer search replaces them"""
+        table = tt.TranspositionTable(1)
+        buckets = table.get_bucket_count()
+        deep, shallow, newer = 5, 5 + buckets, 5 + 2 * buckets  # All three share one bucket.
+
+        table.store(deep, None, 10, 8, tt.EXACT)
+        table.store(shallow, None, 20, 2, tt.EXACT)
+        self.assertEqual(table.probe(deep)[2], 8)
+        self.assertEqual(table.probe(shallow)[2], 2)
+
+        table.store(newer, None, 30, 1, tt.EXACT)  # Only the always-replace entry gives way.
+        self.assertIsNotNone(table.probe(deep))
+        self.assertIsNone(table.probe(shallow))
+
+        table.new_search()
+        table.store(shallow, None, 20, 2, tt.UPPER)  # The deep entry is stale now and moves down.
+        self.assertEqual(table.probe(shallow), (None, 20, 2, tt.UPPER))
+        self.assertIsNotNone(table.probe(deep))
+        table.store(newer, None, 30, 1, tt.EXACT)
+        self.assertIsNone(table.probe(deep))
+
+    def test_shared_table_is_attached_by_name(self):
+        """TRANSPOSITION: a table attached to shared memory by name sees the entries of the table that made it"""
+        table = tt.SharedTranspositionTable(0.25)
+        attached = tt.SharedTranspositionTable(name=table.get_name())
+        try:
+            self.assertEqual(attached.get_bucket_count(), table.get_bucket_count())
+            table.store(12345, (1, 2), 40, 3, tt.EXACT)
+            self.assertEqual(attached.probe(12345), ((1, 2), 40, 3, tt.EXACT))
+        finally:
+            attached.close()
+            table.close()
+            table.unlink()
+
+
+class TestMoveOrdering(unittest.TestCase):
+    def test_mvv_lva_prefers_valuable_victims_then_cheap_attackers(self):
+        """ORDERING: captures are ranked by the victim's value first, then by the attacker's value reversed"""
+        self.assertGreater(mo.mvv_lva(pce.CHARIOT, pce.CHARIOT), mo.mvv_lva(pce.CANNON, pce.SOLDIER))
+        self.assertGreater(mo.mvv_lva(pce.CANNON, pce.SOLDIER), mo.mvv_lva(pce.CANNON, pce.CHARIOT))
+        self.assertGreater(mo.mvv_lva(pce.HORSE, pce.GENERAL), mo.mvv_lva(pce.HORSE, pce.GUARD))
+
+    def test_table_move_captures_killers_then_history(self):
+        """ORDERING: the table move leads, then captures, killer moves and quiet moves by history"""
+        g = JanggiGame()
+        g.load_position('R3K4/9/9/9/r2Sc4/9/9/9/4k4/9 red 10 10')
+        squares = g.get_game().get_board()
+
+        def move(from_square, to_square):
+            return bd.square_to_index(from_square), bd.square_to_index(to_square)
+
+        orderer = mo.MoveOrderer()
+        orderer.record_cutoff(squares, move('a1', 'b1'), 3, 2)
+        orderer.record_cutoff(squares, move('d5', 'd6'), 5, 4)
+        orderer.record_cutoff(squares, move('a1', 'a5'), 3, 4)  # Captures are not recorded.
+        self.assertEqual(orderer.get_killers(3), [move('a1', 'b1'), None])
+        self.assertEqual(orderer.get_history(move('d5', 'd6')), 16)
+        self.assertEqual(orderer.get_history(move('a1', 'a5')), 0)
+
+        moves = [move('a1', 'a2'), move('d5', 'd6'), move('d5', 'e5'), move('a1', 'a5'), move('a1', 'b1')]
+        self.assertEqual(orderer.order_moves(squares, moves, 3, move('a1', 'a2')),
+                         [move('a1', 'a2'), move('a1', 'a5'), move('d5', 'e5'), move('a1', 'b1'), move('d5', 'd6')])
+        orderer.new_search()
+        self.assertEqual(orderer.get_killers(3), [None, None])
+        self.assertEqual(orderer.get_history(move('d5', 'd6')), 8)
+
+
+class TestEngine(unittest.TestCase):
+    def test_search_finds_a_checkmate_in_one(self):
+        """ENGINE: the search plays the checkmate and scores it as a win"""
+        g = JanggiGame()
+        g.load_position('3K5/r8/9/9/9/9/9/9/4k4/1r7 blue 10 10')
+        move, score = engine.Engine(1).search(g, max_depth=4)
+        self.assertEqual(move, ('b10', 'b1'))
+        self.assertEqual(score, engine.MATE_SCORE - 1)
+
+    def test_search_stays_within_its_budget(self):
+        """ENGINE: node and time limited searches return a legal move and leave the game as it was"""
+        g = JanggiGame()
+        g.load_position(benchmark.BENCHMARK_POSITIONS['middlegame'][0])
+        position, position_hash = g.get_position(), g.position_hash()
+        searcher = engine.Engine(1)
+
+        move, score = searcher.search(g, node_limit=300)
+        self.assertIn(move, g.legal_moves())
+        self.assertLessEqual(searcher.get_nodes(), 300)
+
+        move, score = searcher.search(g, time_limit=0.05)
+        self.assertIn(move, g.legal_moves())
+        self.assertGreaterEqual(searcher.get_depth(), 1)
+        self.assertEqual(g.get_position(), position)
+        self.assertEqual(g.position_hash(), position_hash)
+
+    def test_static_exchange_follows_cannon_screens(self):
+        """ENGINE: the exchange evaluation looks the attackers up again as screens leave and join the line"""
+        searcher = engine.Engine(1)
+        for position, move_from, expected in (
+                ('4K4/9/R8/9/h8/9/9/9/4k4/c8 red 10 10', 'a3', 500),   # No screen - the cannon cannot recapture.
+                ('4K4/9/R8/9/h8/9/9/s8/4k4/c8 red 10 10', 'a3', -800),  # The soldier screens the recapture.
+                ('4K4/9/9/9/h8/9/R8/9/4k4/c8 red 10 10', 'a7', 500),   # The capturing chariot was the screen.
+                ('C3K4/S8/R8/9/h8/9/9/9/4k4/r8 red 10 10', 'a3', 500)):  # The chariot leaves the soldier as the screen.
+            g = JanggiGame()
+            g.load_position(position)
+            self.assertEqual(searcher.static_exchange(g, bd.square_to_index(move_from), bd.square_to_index('a5')),
+                             expected)
+            self.assertEqual(g.get_position(), position)
+
+    def test_quiescence_sees_past_the_horizon(self):
+        """ENGINE: a one ply search does not take a horse defended by a screened cannon"""
+        g = JanggiGame()
+        g.load_position('4K4/9/R8/9/h8/9/9/s8/4k4/c8 red 10 10')
+        move, score = engine.Engine(1).search(g, max_depth=1)
+        self.assertEqual(move, ('e1', 'e2'))
+        quiet = JanggiGame()
+        quiet.load_position(g.get_position())
+        quiet.make_move('e1', 'e2')
+        self.assertEqual(score, ev.evaluate(quiet.get_game(), 'red'))  # The quiet move's own score, not a horse up.
+        self.assertEqual(score, 40)
+
+    def test_parallel_search_shares_its_table(self):
+        """ENGINE: worker processes find the checkmate and leave their results in the shared table"""
+        g = JanggiGame()
+        g.load_position('3K5/r8/9/9/9/9/9/9/4k4/1r7 blue 10 10')
+        with parallel.ParallelEngine(2, 1) as searcher:
+            move, score = searcher.search(g, max_depth=4)
+            self.assertEqual(move, ('b10', 'b1'))
+            self.assertEqual(score, engine.MATE_SCORE - 1)
+            self.assertEqual(searcher.get_table().probe(g.position_hash())[0],
+                             (bd.square_to_index('b10'), bd.square_to_index('b1')))
+
+
+class TestSelfPlay(unittest.TestCase):
+    def test_game_records_replay_from_their_formations(self):
+        """SELF-PLAY: a record is reproduced by its seed and replays move for move from its formations"""
+        record = selfplay.play_game(3, 'greedy', 'random', seed=5, formations=True, max_plies=60)
+        self.assertEqual(selfplay.play_game(3, 'greedy', 'random', seed=5, formations=True, max_plies=60), record)
+
+        g = JanggiGame()
+        for move_from, move_to in record['moves']:
+            player = g.get_player_turn()
+            if g.get_move_counter()[player] == 0:
+                for first_square, second_square in selfplay.formation_swaps(player, record['formations'][player]):
+                    g.swap_piece(first_square, second_square)
+            self.assertTrue(g.make_move(move_from, move_to))
+        self.assertEqual(g.get_position(), record['position'])
+        self.assertEqual(g.get_game_state(), record['result'])
+
+    def test_games_are_played_across_processes_and_streamed(self):
+        """SELF-PLAY: games played by a process pool are written to disk one JSON line each"""
+        with self.assertRaises(ValueError):
+            selfplay.make_policy('engine:deep')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.jsonl')
+            tally = selfplay.write_games(path, selfplay.play_games(3, 'engine:1', 'greedy', workers=2, max_plies=20))
+            with open(path) as games:
+                records = [json.loads(line) for line in games]
+        self.assertEqual(sum(tally.values()), 3)
+        self.assertEqual(sorted(each_record['game'] for each_record in records), [0, 1, 2])
+        self.assertEqual(records[0]['red'], 'engine:1')
+
+
+@unittest.skipIf(batch is None, "numpy is not installed")
+class TestBoardBatch(unittest.TestCase):
+    def test_positions_convert_in_bulk_both_ways(self):
+        """BATCH: positions, boards and games convert to a batch and back with the same hashes"""
+        positions = [position for position, counts in benchmark.BENCHMARK_POSITIONS.values()]
+        games = []
+        for each_position in positions:
+            games.append(JanggiGame())
+            games[-1].load_position(each_position)
+
+        positions_batch = batch.BoardBatch.from_positions(positions)
+        self.assertEqual(positions_batch.get_squares().shape, (5, 10, 9))
+        self.assertEqual(positions_batch.to_positions(), positions)
+        self.assertEqual(positions_batch.get_hashes().tolist(), [g.position_hash() for g in games])
+        self.assertEqual(batch.BoardBatch.from_games(games).to_positions(), positions)
+        self.assertEqual([each_board.get_hash() for each_board in positions_batch.to_boards()],
+                         [g.position_hash() for g in games])
+        self.assertEqual([g.get_position() for g in positions_batch.to_games()], positions)
+        self.assertEqual(len(batch.BoardBatch.from_positions([])), 0)
+        with self.assertRaises(ValueError):
+            batch.BoardBatch.from_positions(['REHG1GEHR/4K4 blue 0 0'])
+
+    def test_analytics_are_array_operations(self):
+        """BATCH: material, piece counts, placement and palace occupancy are counted over the whole batch"""
+        positions_batch = batch.BoardBatch.from_positions([benchmark.BENCHMARK_POSITIONS['initial'][0],
+                                                           benchmark.BENCHMARK_POSITIONS['endgame'][0]])
+        self.assertEqual(positions_batch.material().tolist(), [0, 1000])
+        self.assertEqual(positions_batch.piece_counts()[1].tolist(), [[1, 0, 0, 0, 1, 1, 1], [0, 0, 1, 0, 0, 1, 1]])
+        self.assertEqual(positions_batch.palace_occupancy().tolist(), [[3, 3], [2, 2]])
+        placement = positions_batch.placement_counts()
+        self.assertEqual(placement[0, pce.CHARIOT, 0].tolist(), [1, 0, 0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(placement.sum(), 32 + 7)
+        self.assertEqual(positions_batch.select(positions_batch.material() > 0).to_positions(),
+                         [benchmark.BENCHMARK_POSITIONS['endgame'][0]])
+
+    def test_batch_check_detection_matches_the_game(self):
+        """BATCH: check status of every position of a batch is the same as JanggiGame.is_in_check"""
+        rng = random.Random(4)
+        positions, expected = [], []
+        for each_game in range(4):
+            g = JanggiGame()
+            g.load_position(benchmark.BENCHMARK_POSITIONS[['middlegame_check', 'endgame_check', 'middlegame',
+                                                            'endgame'][each_game]][0])
+            for each_ply in range(40):
+                positions.append(g.get_position())
+                expected.append([g.is_in_check('red'), g.is_in_check('blue')])
+                moves = g.legal_moves()
+                if not moves:
+                    break
+                g.make_move(*rng.choice(moves))
+        # Cannon checks wait for the cannon's first turn; a missing General is never in check.
+        positions += ['3K5/4C4/4S4/9/9/9/9/9/4k4/9 blue 0 1', '3K5/4C4/4S4/9/9/9/9/9/4k4/9 blue 1 1',
+                      '3K5/4C4/4S4/9/9/9/9/9/9/9 blue 1 1']
+        expected += [[False, False], [False, True], [False, False]]
+
+        status = batch.BoardBatch.from_positions(positions).check_status()
+        self.assertEqual(status.tolist(), expected)
+        self.assertGreater(status.sum(), 3)
+
+    def test_batch_from_boards_takes_the_move_counts(self):
+        """BATCH: a batch of boards sees cannon checks once it is given the move counts"""
+        g = JanggiGame()
+        g.load_position('4K4/9/4S4/9/4c4/9/9/9/9/3k5 red 5 5')
+        self.assertIs(g.is_in_check('red'), True)
+        self.assertEqual(batch.BoardBatch.from_games([g]).in_check('red').tolist(), [True])
+        self.assertEqual(batch.BoardBatch.from_boards([g.get_game()], [(5, 5)]).in_check('red').tolist(), [True])
+        self.assertEqual(batch.BoardBatch.from_boards([g.get_game()]).get_move_counts().tolist(), [[0, 0]])
+        self.assertEqual(batch.BoardBatch.from_boards([g.get_game()]).in_check('red').tolist(), [False])
+
+
+class TestEvaluation(unittest.TestCase):
+    def test_evaluation_is_kept_on_every_move(self):
+        """EVALUATION: the board's tallies match a full re-sum after every move and take back"""
+        g = JanggiGame()
+        board = g.get_game()
+        g.start_game()
+        self.assertEqual(ev.evaluate(board, 'red'), ev.KOMI)  # Even material - red moves second.
+        self.assertEqual(g.get_evaluation('blue'), -1.5)
+
+        rng = random.Random(6)
+        for each_move in range(60):
+            moves = g.generate_legal_moves()
+            if not moves:
+                break
+            before = ev.evaluate(board, 'red')
+            g.push_move(*rng.choice(moves))
+            for player in ['red', 'blue']:
+                self.assertEqual(ev.evaluate(board, player), ev.evaluate_from_scratch(board, player))
+            g.pop_move()
+            self.assertEqual(ev.evaluate(board, 'red'), before)
+            g.push_move(*rng.choice(moves))
+
+        g.load_position(benchmark.BENCHMARK_POSITIONS['endgame'][0])
+        self.assertEqual(board.get_material('red') - board.get_material('blue'), 1000)
+        self.assertEqual(ev.evaluate(board, 'red'), ev.evaluate_from_scratch(board, 'red'))
+
+    def test_piece_square_tables_mirror_for_blue(self):
+        """EVALUATION: a soldier scores more as it advances, the same for either player"""
+        soldier = ev.PIECE_SQUARE_TABLES['red'][pce.SOLDIER]
+        self.assertLess(soldier[bd.square_to_index('e4')], soldier[bd.square_to_index('e7')])
+        self.assertLess(soldier[bd.square_to_index('e7')], soldier[bd.square_to_index('e9')])
+        self.assertEqual(ev.PIECE_SQUARE_TABLES['blue'][pce.SOLDIER][bd.square_to_index('e2')],
+                         soldier[bd.square_to_index('e9')])